@@ -29,18 +29,13 @@ from flask.helpers import make_response
 
 
 from prometheus_client import CONTENT_TYPE_LATEST
-from prometheus_client import Counter
-from prometheus_client import Histogram
 from prometheus_client import core
 from prometheus_client import generate_latest
 
 import thoth_dependency_monkey
 from thoth_dependency_monkey.apis import api
-
-FLASK_REQUEST_LATENCY = Histogram('flask_request_latency_seconds', 'Flask Request Latency',
-                                  ['method'])
-FLASK_REQUEST_COUNT = Counter('flask_request_count', 'Flask Request Count',
-                              ['method', 'http_status'])
+from thoth_dependency_monkey.compression import gzip_response
+from thoth_dependency_monkey.metrics import FLASK_REQUEST_LATENCY, FLASK_REQUEST_COUNT
 
 DEBUG = bool(os.getenv('DEBUG', False))
 
@@ -60,18 +55,23 @@ app.logger.setLevel(logging.DEBUG)
 api.init_app(app)
 
 
+@app.before_request
 def before_request():
     request.start_time = time.time()
 
 
+@app.after_request
 def after_request(response):
+    # the endpoint, not the path, so there is one series per route and not one per Validation id
+    _endpoint = request.endpoint or 'unknown'
+
     request_latency = time.time() - request.start_time
     FLASK_REQUEST_LATENCY.labels(
-        request.method).observe(request_latency)
+        request.method, _endpoint).observe(request_latency)
     FLASK_REQUEST_COUNT.labels(
-        request.method, response.status_code).inc()
+        request.method, _endpoint, response.status_code).inc()
 
-    return response
+    return gzip_response(request, response)
 
 
 @app.route('/')
@@ -95,7 +95,4 @@ def print_api_schema():
 
 
 if __name__ == "__main__":
-    app.before_request(before_request)
-    app.after_request(after_request)
-
     app.run(host='0.0.0.0', port=8080, debug=DEBUG)
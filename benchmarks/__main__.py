@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#   thoth-dependency-monkey
+#   Copyright(C) 2018 Christoph Görn
+#
+#   This program is free software: you can redistribute it and / or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Thoth: Dependency Monkey Benchmarks
+
+Measures the ValidationDAO, the Kubernetes executor and the REST API against a fake Kubernetes API:
+python -m benchmarks --jobs 10000 --latency 0.002
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import tempfile
+
+from collections import Counter
+
+from thoth_dependency_monkey import kubernetes_executor
+from thoth_dependency_monkey.archive import Archive
+from thoth_dependency_monkey.kubernetes_executor import KubernetesExecutor
+from thoth_dependency_monkey.validation_dao import ValidationDAO
+
+from .fake_kubernetes import FakeCluster, FakeKubernetesClient, seed
+
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+class Benchmark():
+    """Runs one operation many times, recording its latencies and the calls it made to the Kubernetes API."""
+
+    def __init__(self, name, cluster, operation, setup=None):
+        self.name = name
+        self.cluster = cluster
+        self.operation = operation
+        self.setup = setup
+
+    def run(self, requests):
+        if self.setup is not None:
+            self.setup()
+
+        _calls = Counter(self.cluster.calls)
+        _latencies = []
+        _started = time.perf_counter()
+
+        for i in range(requests):
+            _request_started = time.perf_counter()
+            self.operation(i)
+            _latencies.append(time.perf_counter() - _request_started)
+
+        _duration = time.perf_counter() - _started
+        _calls = Counter({op: count - _calls[op] for op, count in self.cluster.calls.items()
+                          if count - _calls[op] and not op.startswith('watch_')})
+        _latencies.sort()
+
+        return {
+            'requests_per_second': round(requests / _duration, 1),
+            'p50_ms': round(_latencies[len(_latencies) // 2] * 1000, 3),
+            'p99_ms': round(_latencies[min(len(_latencies) - 1, int(len(_latencies) * 0.99))] * 1000, 3),
+            'api_calls_per_request': round(sum(_calls.values()) / requests, 3),
+            'api_calls': {op: round(count / requests, 3) for op, count in sorted(_calls.items())}
+        }
+
+
+def _benchmarks(cluster, ids, cached, directory):
+    """The benchmarks of one configuration, against a cluster seeded with `ids`, files go to `directory`."""
+    from app import app
+    from thoth_dependency_monkey.apis import validations
+
+    # nothing is archived while benchmarking, an empty archive is still asked for archived Validations
+    executor = KubernetesExecutor(FakeKubernetesClient(cluster), retention_ttl=0,
+                                  archive=Archive(os.path.join(directory, 'archive-{}.sqlite'.format(cached))))
+    # Validation jobs are created right away, instead of waiting for the seeded ones to finish
+    executor._scheduler.max_running = len(ids) + 2000000
+    dao = ValidationDAO(executor=executor)
+
+    # the REST API serves from our DAO instead of one talking to a real cluster
+    validations.DAO = dao
+    _client = app.test_client()
+
+    _random = random.Random(1)
+    _succeeded = [id for id, phase in ids if phase == 'succeeded']
+    _specs = ['benchmark-{}-{}'.format('cached' if cached else 'uncached', i) for i in range(1000000)]
+
+    def _sync():
+        kubernetes_executor.JOB_CACHE = cached
+        kubernetes_executor.POD_CACHE = cached
+
+        if cached:
+            for informer in (executor._jobs, executor._pods.informer, executor._specifications.informer):
+                informer.start()
+
+            for informer in (executor._jobs, executor._pods.informer, executor._specifications.informer):
+                informer.wait_for_sync()
+
+    def _job_of(id):
+        return executor._find_validation_job(id)
+
+    _prefix = 'cached' if cached else 'uncached'
+
+    return [
+        Benchmark(_prefix + ' dao.get', cluster, lambda i: dao.get(_random.choice(_succeeded)), setup=_sync),
+        # the same few finished Validations again and again, they are read back from where they were recorded
+        Benchmark(_prefix + ' dao.get finished again', cluster, lambda i: dao.get(_succeeded[i % 10])),
+        Benchmark(_prefix + ' dao.get raw_log', cluster, lambda i: dao.get(_random.choice(_succeeded), raw_log=True)),
+        Benchmark(_prefix + ' dao.get_all limit=100', cluster, lambda i: dao.get_all(limit=100)),
+        Benchmark(_prefix + ' dao.get_all phase=failed limit=100', cluster,
+                  lambda i: dao.get_all(limit=100, phase='failed')),
+        Benchmark(_prefix + ' dao.create', cluster,
+                  lambda i: dao.create({'stack_specification': _specs[i], 'ecosystem': 'pypi'})),
+        Benchmark(_prefix + ' executor._pods.log', cluster,
+                  lambda i: executor._pods.log(_job_of(_random.choice(_succeeded)))),
+        Benchmark(_prefix + ' GET /validations/<id>', cluster,
+                  lambda i: _client.get('/api/v0alpha0/validations/' + _random.choice(_succeeded))),
+        Benchmark(_prefix + ' GET /validations/?limit=100', cluster,
+                  lambda i: _client.get('/api/v0alpha0/validations/?limit=100')),
+        Benchmark(_prefix + ' POST /validations/', cluster,
+                  lambda i: _client.post('/api/v0alpha0/validations/', headers={'content-type': 'application/json'},
+                                         data=json.dumps({'stack_specification': _specs[i + 500000],
+                                                          'ecosystem': 'pypi'})))
+    ]
+
+
+def run(jobs, requests, latency, directory):
+    results = {}
+
+    for cached in (False, True):
+        cluster = FakeCluster(latency=latency)
+        ids = seed(cluster, jobs)
+
+        for benchmark in _benchmarks(cluster, ids, cached, directory):
+            # listing all Jobs without a cache is what we want to get rid of, a few runs tell enough
+            _requests = requests if cached or 'get_all' not in benchmark.name else max(1, requests // 100)
+
+            results[benchmark.name] = benchmark.run(_requests)
+
+            print('{:<45} {:>10.1f} req/s  p50 {:>9.3f} ms  p99 {:>9.3f} ms  {:>7.3f} API calls/request'.format(
+                benchmark.name, results[benchmark.name]['requests_per_second'], results[benchmark.name]['p50_ms'],
+                results[benchmark.name]['p99_ms'], results[benchmark.name]['api_calls_per_request']))
+
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return the regressions of results compared to a baseline.
+
+    More API calls per request are always a regression, latencies only if they grew by more than `tolerance`.
+    """
+    regressions = []
+
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+
+        if result['api_calls_per_request'] > baseline[name]['api_calls_per_request']:
+            regressions.append('{}: {} API calls per request, baseline {}'.format(
+                name, result['api_calls_per_request'], baseline[name]['api_calls_per_request']))
+
+        if tolerance is not None and result['p99_ms'] > baseline[name]['p99_ms'] * (1 + tolerance):
+            regressions.append('{}: p99 {} ms, baseline {} ms'.format(name, result['p99_ms'], baseline[name]['p99_ms']))
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=10000, help='number of Validation jobs to seed, default: 10000')
+    parser.add_argument('--requests', type=int, default=200, help='requests per benchmark, default: 200')
+    parser.add_argument('--latency', type=float, default=0.001,
+                        help='seconds each call to the fake Kubernetes API takes, default: 0.001')
+    parser.add_argument('--baseline', default=BASELINE, help='baseline file, default: benchmarks/baseline.json')
+    parser.add_argument('--save-baseline', action='store_true', help='save the results as the new baseline')
+    parser.add_argument('--latency-tolerance', type=float, default=None,
+                        help='fail if a p99 latency grew by more than this share of the baseline, e.g. 0.5')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.ERROR)
+    logging.getLogger().setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = run(args.jobs, args.requests, args.latency, directory)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+        print('saved baseline to {}'.format(args.baseline))
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print('no baseline at {}, run with --save-baseline first'.format(args.baseline))
+        return 0
+
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.latency_tolerance)
+
+    for regression in regressions:
+        print('REGRESSION ' + regression)
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
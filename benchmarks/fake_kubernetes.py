@@ -0,0 +1,499 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#   thoth-dependency-monkey
+#   Copyright(C) 2018 Christoph Görn
+#
+#   This program is free software: you can redistribute it and / or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Thoth: Dependency Monkey Benchmarks"""
+
+import re
+import json
+import time
+import uuid
+import base64
+import random
+import threading
+
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from kubernetes import client
+
+from thoth_dependency_monkey.validation_job import VALIDATION_JOB_PREFIX
+from thoth_dependency_monkey.specification_config_maps import SPECIFICATION_CONFIG_MAP_PREFIX, \
+    SPECIFICATION_CONFIG_MAP_KEY, SPECIFICATIONS_MOUNT_PATH, encode_specification
+from thoth_dependency_monkey.result import RESULT_TAG
+from thoth_dependency_monkey.specification import specification_hash
+
+
+SELECTOR_RE = re.compile(r'^\s*(?P<not>!)?\s*(?P<key>[A-Za-z0-9./_-]+)\s*'
+                         r'(?:(?P<op>==|=|!=|\s+in\s+|\s+notin\s+)\s*(?P<value>\([^)]*\)|[A-Za-z0-9._-]*))?\s*$')
+
+
+def _split_selector(selector):
+    """Split a label selector at the commas that are not within parentheses."""
+    parts, depth, current = [], 0, ''
+
+    for char in selector:
+        if char == ',' and depth == 0:
+            parts.append(current)
+            current = ''
+            continue
+
+        depth += {'(': 1, ')': -1}.get(char, 0)
+        current += char
+
+    if current.strip():
+        parts.append(current)
+
+    return parts
+
+
+def label_selector_matcher(selector):
+    """Return a function checking labels against a Kubernetes label selector."""
+    if not selector:
+        return lambda labels: True
+
+    requirements = []
+
+    for part in _split_selector(selector):
+        match = SELECTOR_RE.match(part)
+
+        if match is None:
+            raise client.rest.ApiException(status=400, reason='invalid label selector {}'.format(selector))
+
+        op = (match.group('op') or '').strip()
+        value = match.group('value')
+        values = [v.strip() for v in value.strip('()').split(',')] if value is not None else []
+
+        requirements.append((bool(match.group('not')), match.group('key'), op, values))
+
+    def _matches(labels):
+        for negated, key, op, values in requirements:
+            if not op:
+                if (key in labels) == negated:
+                    return False
+            elif op in ('=', '=='):
+                if labels.get(key) != values[0]:
+                    return False
+            elif op == '!=':
+                if labels.get(key) == values[0]:
+                    return False
+            elif op == 'in':
+                if labels.get(key) not in values:
+                    return False
+            elif op == 'notin':
+                if labels.get(key) in values:
+                    return False
+
+        return True
+
+    return _matches
+
+
+class FakeWatchResponse():
+    """The streaming response of a watch, it delivers events as JSON lines like the API server does."""
+
+    def __init__(self, cluster, kind, resource_version, label_selector, timeout_seconds):
+        self._cluster = cluster
+        self._kind = kind
+        self._resource_version = int(resource_version or 0)
+        self._matches = label_selector_matcher(label_selector)
+        self._deadline = time.time() + (timeout_seconds or 60)
+        self._closed = False
+
+    def read_chunked(self, decode_content=False):
+        while not self._closed and time.time() < self._deadline:
+            for event_type, obj in self._cluster.events_since(self._kind, self._resource_version,
+                                                             self._deadline - time.time()):
+                self._resource_version = int(obj.metadata.resource_version)
+
+                if self._matches(obj.metadata.labels or {}):
+                    yield json.dumps({
+                        'type': event_type,
+                        'object': self._cluster.serializer.sanitize_for_serialization(obj)
+                    }) + '\n'
+
+    def close(self):
+        self._closed = True
+
+    def release_conn(self):
+        pass
+
+
+class FakeCluster():
+    """An in-process stand-in for the Jobs, Pods, Pod logs and ConfigMaps of a namespace.
+
+    Every call is counted by operation within `calls`, and takes `latency` seconds.
+    """
+
+    def __init__(self, latency=0):
+        self.latency = latency
+        self.calls = Counter()
+        self.serializer = client.ApiClient()
+
+        self._lock = threading.Condition()
+        self._resource_version = 0
+        self._objects = {'jobs': {}, 'pods': {}, 'configmaps': {}}
+        self._events = {'jobs': [], 'pods': [], 'configmaps': []}
+        self._logs = {}
+
+    def call(self, operation):
+        self.calls[operation] += 1
+
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _next_resource_version(self):
+        self._resource_version += 1
+
+        return str(self._resource_version)
+
+    def store(self, kind, obj, event_type='ADDED', log=None):
+        with self._lock:
+            obj.metadata.resource_version = self._next_resource_version()
+            self._objects[kind][obj.metadata.name] = obj
+
+            if log is not None:
+                self._logs[obj.metadata.name] = log
+
+            # events are only kept for objects changing after seeding
+            if event_type is not None:
+                self._events[kind].append((event_type, obj))
+                self._lock.notify_all()
+
+    def remove(self, kind, name):
+        with self._lock:
+            obj = self._objects[kind].pop(name)
+            obj.metadata.resource_version = self._next_resource_version()
+            self._events[kind].append(('DELETED', obj))
+            self._lock.notify_all()
+
+    def list(self, kind, label_selector=None, limit=None, _continue=None):
+        _matches = label_selector_matcher(label_selector)
+
+        with self._lock:
+            _resource_version = str(self._resource_version)
+            _names = sorted(self._objects[kind])
+
+            if _continue is not None:
+                _after = base64.b64decode(_continue.encode()).decode()
+                _names = [name for name in _names if name > _after]
+
+            _items = []
+            _next = None
+
+            for name in _names:
+                obj = self._objects[kind][name]
+
+                if not _matches(obj.metadata.labels or {}):
+                    continue
+
+                if limit and len(_items) == limit:
+                    _next = base64.b64encode(_items[-1].metadata.name.encode()).decode()
+                    break
+
+                _items.append(obj)
+
+        return _items, _resource_version, _next
+
+    def events_since(self, kind, resource_version, timeout):
+        with self._lock:
+            _events = [(t, o) for t, o in self._events[kind] if int(o.metadata.resource_version) > resource_version]
+
+            if not _events and timeout > 0:
+                self._lock.wait(min(timeout, 1))
+
+                _events = [(t, o) for t, o in self._events[kind]
+                           if int(o.metadata.resource_version) > resource_version]
+
+        return _events
+
+    def get(self, kind, name):
+        with self._lock:
+            return self._objects[kind].get(name)
+
+    def log(self, name):
+        with self._lock:
+            return self._logs.get(name)
+
+
+class FakeBatchV1Api():
+    def __init__(self, cluster):
+        self._cluster = cluster
+
+    def list_namespaced_job(self, namespace, label_selector=None, limit=None, _continue=None, watch=False,
+                            resource_version=None, timeout_seconds=None, **kwargs):
+        if watch:
+            self._cluster.call('watch_jobs')
+
+            return FakeWatchResponse(self._cluster, 'jobs', resource_version, label_selector, timeout_seconds)
+
+        self._cluster.call('list_jobs')
+
+        items, resource_version, _next = self._cluster.list('jobs', label_selector, limit, _continue)
+
+        return client.V1JobList(items=items, metadata=client.V1ListMeta(
+            resource_version=resource_version, _continue=_next))
+
+    def create_namespaced_job(self, namespace, body, **kwargs):
+        self._cluster.call('create_job')
+
+        job = self._cluster.serializer.deserialize(_Response(body), 'V1Job')
+        job.metadata.namespace = namespace
+        job.metadata.uid = str(uuid.uuid4())
+        job.metadata.creation_timestamp = datetime.now(timezone.utc)
+        job.status = client.V1JobStatus()
+
+        if self._cluster.get('jobs', job.metadata.name) is not None:
+            raise client.rest.ApiException(status=409, reason='AlreadyExists')
+
+        self._cluster.store('jobs', job)
+
+        return job
+
+    def patch_namespaced_job(self, name, namespace, body, **kwargs):
+        self._cluster.call('patch_job')
+
+        job = self._cluster.get('jobs', name)
+
+        if job is None:
+            raise client.rest.ApiException(status=404, reason='NotFound')
+
+        job.metadata.labels = dict(job.metadata.labels or {}, **body.get('metadata', {}).get('labels', {}))
+        self._cluster.store('jobs', job, 'MODIFIED')
+
+        return job
+
+    def delete_namespaced_job(self, name, namespace, body=None, **kwargs):
+        self._cluster.call('delete_job')
+
+        if self._cluster.get('jobs', name) is None:
+            raise client.rest.ApiException(status=404, reason='NotFound')
+
+        self._cluster.remove('jobs', name)
+
+        # what the garbage collector does
+        for pod in self._cluster.list('pods', 'job-name=' + name)[0]:
+            self._cluster.remove('pods', pod.metadata.name)
+
+        for config_map in self._cluster.list('configmaps')[0]:
+            _owners = [owner for owner in config_map.metadata.owner_references or [] if owner.name != name]
+
+            if not _owners:
+                self._cluster.remove('configmaps', config_map.metadata.name)
+            else:
+                config_map.metadata.owner_references = _owners
+
+
+class FakeCoreV1Api():
+    def __init__(self, cluster):
+        self._cluster = cluster
+
+    def list_namespaced_pod(self, namespace, label_selector=None, limit=None, _continue=None, watch=False,
+                            resource_version=None, timeout_seconds=None, **kwargs):
+        if watch:
+            self._cluster.call('watch_pods')
+
+            return FakeWatchResponse(self._cluster, 'pods', resource_version, label_selector, timeout_seconds)
+
+        self._cluster.call('list_pods')
+
+        items, resource_version, _next = self._cluster.list('pods', label_selector, limit, _continue)
+
+        return client.V1PodList(items=items, metadata=client.V1ListMeta(
+            resource_version=resource_version, _continue=_next))
+
+    def read_namespaced_pod_log(self, name, namespace, **kwargs):
+        self._cluster.call('read_pod_log')
+
+        log = self._cluster.log(name)
+
+        if log is None:
+            raise client.rest.ApiException(status=404, reason='NotFound')
+
+        return log
+
+    def list_namespaced_config_map(self, namespace, label_selector=None, limit=None, _continue=None, watch=False,
+                                   resource_version=None, timeout_seconds=None, **kwargs):
+        if watch:
+            self._cluster.call('watch_config_maps')
+
+            return FakeWatchResponse(self._cluster, 'configmaps', resource_version, label_selector, timeout_seconds)
+
+        self._cluster.call('list_config_maps')
+
+        items, resource_version, _next = self._cluster.list('configmaps', label_selector, limit, _continue)
+
+        return client.V1ConfigMapList(items=items, metadata=client.V1ListMeta(
+            resource_version=resource_version, _continue=_next))
+
+    def create_namespaced_config_map(self, namespace, body, **kwargs):
+        self._cluster.call('create_config_map')
+
+        config_map = self._cluster.serializer.deserialize(_Response(body), 'V1ConfigMap')
+
+        if self._cluster.get('configmaps', config_map.metadata.name) is not None:
+            raise client.rest.ApiException(status=409, reason='AlreadyExists')
+
+        self._cluster.store('configmaps', config_map)
+
+        return config_map
+
+    def patch_namespaced_config_map(self, name, namespace, body, **kwargs):
+        self._cluster.call('patch_config_map')
+
+        config_map = self._cluster.get('configmaps', name)
+
+        if config_map is None:
+            raise client.rest.ApiException(status=404, reason='NotFound')
+
+        # owner references are merged by uid
+        _owners = {owner.uid: owner for owner in config_map.metadata.owner_references or []}
+        _patch = self._cluster.serializer.deserialize(_Response(body.get('metadata', {})), 'V1ObjectMeta')
+
+        _owners.update({owner.uid: owner for owner in _patch.owner_references or []})
+        config_map.metadata.owner_references = list(_owners.values())
+        self._cluster.store('configmaps', config_map, 'MODIFIED')
+
+        return config_map
+
+    def read_namespaced_config_map(self, name, namespace, **kwargs):
+        self._cluster.call('read_config_map')
+
+        config_map = self._cluster.get('configmaps', name)
+
+        if config_map is None:
+            raise client.rest.ApiException(status=404, reason='NotFound')
+
+        return config_map
+
+
+class _Response():
+    """What ApiClient.deserialize() expects."""
+
+    def __init__(self, body):
+        self.data = json.dumps(body)
+
+
+class FakeKubernetesClient():
+    """Stands in for a KubernetesClientManager, the API groups are backed by a FakeCluster."""
+
+    def __init__(self, cluster, request_timeout=30):
+        self.request_timeout = request_timeout
+
+        self.batch_v1 = FakeBatchV1Api(cluster)
+        self.core_v1 = FakeCoreV1Api(cluster)
+
+
+def _job(id, spec_hash, ecosystem, phase, validity, created):
+    _name = VALIDATION_JOB_PREFIX + id
+    _labels = {'validation-id': id, 'spec-hash': spec_hash, 'ecosystem': ecosystem,
+               'phase': phase, 'created-day': created.strftime('%Y-%m-%d')}
+
+    if validity is not None:
+        _labels['validity'] = validity
+
+    _status = {
+        'succeeded': client.V1JobStatus(succeeded=1, start_time=created,
+                                        completion_time=created + timedelta(minutes=2)),
+        'failed': client.V1JobStatus(failed=1, start_time=created),
+        'running': client.V1JobStatus(active=1, start_time=created),
+        'pending': client.V1JobStatus()
+    }[phase]
+
+    return client.V1Job(
+        metadata=client.V1ObjectMeta(name=_name, labels=_labels, annotations={}, uid=str(uuid.uuid4()),
+                                     creation_timestamp=created),
+        spec=client.V1JobSpec(template=client.V1PodTemplateSpec(spec=client.V1PodSpec(containers=[
+            client.V1Container(name=_name, image='pypi-validator', env=[
+                client.V1EnvVar(name='STACK_SPECIFICATION_FILE', value=SPECIFICATIONS_MOUNT_PATH + '/' + spec_hash),
+                client.V1EnvVar(name='ECOSYSTEM', value=ecosystem)
+            ])
+        ]))),
+        status=_status)
+
+
+def _config_map(spec, spec_hash, owners):
+    _owners = [client.V1OwnerReference(api_version='batch/v1', kind='Job', name=job.metadata.name, uid=job.metadata.uid,
+                                       block_owner_deletion=False) for job in owners]
+
+    return client.V1ConfigMap(
+        metadata=client.V1ObjectMeta(name=SPECIFICATION_CONFIG_MAP_PREFIX + spec_hash, labels={'spec-hash': spec_hash},
+                                     owner_references=_owners),
+        data={SPECIFICATION_CONFIG_MAP_KEY: encode_specification(spec)})
+
+
+def _pod(job, phase, record):
+    _name = job.metadata.name + '-' + uuid.uuid4().hex[:5]
+    _terminated = None
+
+    if record is not None:
+        _terminated = client.V1ContainerState(terminated=client.V1ContainerStateTerminated(
+            exit_code=0, message=json.dumps(record, sort_keys=True)))
+
+    return client.V1Pod(
+        metadata=client.V1ObjectMeta(name=_name, labels={'job-name': job.metadata.name}, uid=str(uuid.uuid4()),
+                                     creation_timestamp=job.metadata.creation_timestamp),
+        status=client.V1PodStatus(
+            phase=phase, start_time=job.status.start_time,
+            container_statuses=[client.V1ContainerStatus(
+                name=job.metadata.name, image='pypi-validator', image_id='', ready=False, restart_count=0,
+                state=_terminated)] if _terminated else None))
+
+
+def seed(cluster, jobs, seed=0):
+    """Seed the cluster with `jobs` Validation jobs, their Pods and the ConfigMaps of their stack specifications, most
+    of them succeeded. Returns their ids."""
+    _random = random.Random(seed)
+    _now = datetime.now(timezone.utc)
+    _ids = []
+    _specs = {}
+
+    for i in range(jobs):
+        _id = str(uuid.UUID(int=_random.getrandbits(128)))
+        _spec = 'package-{}=={}.{}'.format(i % 997, i % 13, i % 7)
+        _created = _now - timedelta(seconds=_random.randint(60, 30 * 24 * 3600))
+        _phase = _random.choices(['succeeded', 'failed', 'running', 'pending'], [90, 4, 4, 2])[0]
+        _valid = _random.random() < 0.8
+        _record = None
+
+        if _phase == 'succeeded':
+            _record = {'valid': _valid, 'failure': None if _valid else 'distribution_not_found',
+                       'pins': {'package-{}'.format(i % 997): '{}.{}'.format(i % 13, i % 7)} if _valid else None,
+                       'timings': {'resolve': 10.0, 'total': 10.5}}
+
+        _spec_hash = specification_hash(_spec, 'pypi')
+        _job_object = _job(_id, _spec_hash, 'pypi', _phase, (('valid' if _valid else 'invalid') if _record else None),
+                           _created)
+        cluster.store('jobs', _job_object, event_type=None)
+        _specs.setdefault(_spec_hash, (_spec, []))[1].append(_job_object)
+
+        if _phase != 'pending':
+            _pod_phase = {'succeeded': 'Succeeded', 'failed': 'Failed', 'running': 'Running'}[_phase]
+            _pod_object = _pod(_job_object, _pod_phase, _record)
+            _log = None
+
+            if _record is not None:
+                _log = '{}\n{}{}\n'.format(_spec, RESULT_TAG, json.dumps(_record, sort_keys=True))
+
+            cluster.store('pods', _pod_object, event_type=None, log=_log)
+
+        _ids.append((_id, _phase))
+
+    for spec_hash, (spec, owners) in _specs.items():
+        cluster.store('configmaps', _config_map(spec, spec_hash, owners), event_type=None)
+
+    return _ids
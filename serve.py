@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#   thoth-dependency-monkey
+#   Copyright(C) 2018 Christoph Görn
+#
+#   This program is free software: you can redistribute it and / or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Thoth: Dependency Monkey API
+
+Serves the API with gevent: each request is handled by a greenlet, so a request waiting on the Kubernetes API
+does not pin an OS thread.
+"""
+
+from gevent import monkey
+
+# sockets, ssl and threads have to be patched before anything else imports them
+monkey.patch_all()
+
+import os  # noqa: E402
+import logging  # noqa: E402
+
+from gevent.pool import Pool  # noqa: E402
+from gevent.pywsgi import WSGIServer  # noqa: E402
+
+from app import app, DEBUG  # noqa: E402
+from thoth_dependency_monkey.validation_dao import EXECUTION_MODE  # noqa: E402
+
+
+PORT = int(os.getenv('THOTH_DEPENDENCY_MONKEY_PORT', 8080))
+MAX_CONNECTIONS = int(os.getenv('THOTH_DEPENDENCY_MONKEY_MAX_CONNECTIONS', 10000))
+
+logger = logging.getLogger(__file__)
+
+
+def main():
+    if EXECUTION_MODE == 'local':
+        # the process pool of the LocalExecutor does not get along with patched threads
+        raise SystemExit('local execution mode is served by app.py, not by serve.py')
+
+    logger.info('serving on port {} with at most {} concurrent connections'.format(PORT, MAX_CONNECTIONS))
+
+    server = WSGIServer(('0.0.0.0', PORT), app, spawn=Pool(MAX_CONNECTIONS), log=logger if DEBUG else None)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
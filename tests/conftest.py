@@ -1,4 +1,5 @@
 import json
+import time
 import pytest
 
 from flask import Flask, Blueprint
@@ -6,6 +7,8 @@ from flask.testing import FlaskClient
 
 import flask_restplus as restplus
 
+from thoth_dependency_monkey.executor import Executor
+
 
 class TestClient(FlaskClient):
     def get_json(self, url, status=200, **kwargs):
@@ -26,6 +29,67 @@ class TestClient(FlaskClient):
         return self.get_json('{0}/swagger.json'.format(prefix), status=status, **kwargs)
 
 
+class FakeExecutor(Executor):
+    """Keeps Validations in memory, they stay pending until the test finishes them. Its listeners are told if
+    `listening`; unless `findable`, Validations are never found by spec hash, as if their Jobs were just created."""
+
+    def __init__(self, listening=True, findable=True):
+        self.listening = listening
+        self.findable = findable
+
+        self.validations = {}
+        self.logs = {}
+        self.listeners = []
+        self.submitted = []
+        self.reads = 0
+
+    def submit(self, validations, jobs=None):
+        self.submitted.append(([v['id'] for v in validations], jobs))
+
+        for v in validations:
+            self.validations[v['id']] = dict(v, phase='pending', created=time.time(), finished=None)
+
+    def finish(self, id, valid=True):
+        self.validations[id].update(phase='succeeded', finished=time.time(), result={'valid': valid, 'failure': None})
+
+        for listener in self.listeners:
+            listener(id, 'succeeded')
+
+    def get(self, id):
+        self.reads += 1
+        v = self.validations.get(id)
+
+        return None if v is None else dict(v)
+
+    def log(self, id):
+        return self.logs.get(id)
+
+    def find(self, spec_hash):
+        if not self.findable:
+            return []
+
+        return [v for v in self.validations.values() if v['spec_hash'] == spec_hash]
+
+    def delete(self, id):
+        return self.validations.pop(id, None) is not None
+
+    def version(self, id):
+        v = self.validations.get(id)
+
+        return None if v is None else v['phase']
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+        return self.listening
+
+
+@pytest.fixture
+def fake_executor():
+    """Returns a factory of FakeExecutors."""
+    return FakeExecutor
+
+
 @pytest.fixture
 def app():
     app = Flask(__name__)
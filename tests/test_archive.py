@@ -0,0 +1,70 @@
+import pytest
+
+from thoth_dependency_monkey.archive import Archive
+
+
+@pytest.fixture
+def archive(tmpdir):
+    return Archive(str(tmpdir.join('archive.sqlite')))
+
+
+def _validation(id, phase='succeeded', valid=True, created=100.0):
+    return {
+        'id': id,
+        'stack_specification': 'six',
+        'ecosystem': 'pypi',
+        'spec_hash': 'abc',
+        'phase': phase,
+        'result': {'valid': valid, 'failure': None, 'pins': {'six': '1.11.0'}, 'timings': {}} if phase == 'succeeded'
+        else None,
+        'log': 'six==1.11.0\n' * 100,
+        'created': created,
+        'finished': created + 60
+    }
+
+
+class ArchiveTest(object):
+    def test_put_and_get(self, archive):
+        archive.put([_validation('1'), _validation('2', phase='failed')])
+
+        v = archive.get('1')
+
+        assert v['phase'] == 'succeeded'
+        assert v['result']['pins'] == {'six': '1.11.0'}
+        assert v['finished'] == 160.0
+        assert 'log' not in v
+        assert archive.log('1') == 'six==1.11.0\n' * 100
+        assert archive.get('2')['result'] is None
+        assert archive.get('3') is None
+        assert [v['id'] for v in archive.find('abc')] == ['1', '2']
+
+    def test_list(self, archive):
+        archive.put([_validation('1'), _validation('2', valid=False), _validation('3', phase='failed', created=200.0)])
+
+        assert [v['id'] for v in archive.list(limit=2)] == ['1', '2']
+        assert [v['id'] for v in archive.list(after='2')] == ['3']
+        assert [v['id'] for v in archive.list(valid=False)] == ['2']
+        assert [v['id'] for v in archive.list(phase='failed')] == ['3']
+        assert [v['id'] for v in archive.list(created_after=150.0)] == ['3']
+        assert [v['id'] for v in archive.list(created_before=150.0)] == ['1', '2']
+
+    def test_delete(self, archive):
+        archive.put([_validation('1')])
+
+        assert archive.delete('1')
+        assert not archive.delete('1')
+        assert archive.ids() == []
+
+    def test_recorded_before_archived(self, archive):
+        archive.put([dict(_validation('1'), log=None, job='validation-job-1'), _validation('2')])
+
+        assert archive.get('1')['job'] == 'validation-job-1'
+        assert archive.log('1') is None
+        assert archive.ids() == ['1', '2']
+        assert archive.ids(archived=True) == ['2']
+        assert [v['id'] for v in archive.list(archived=True)] == ['2']
+
+        archive.put([dict(_validation('1'), job=None)])
+
+        assert archive.ids(archived=True) == ['1', '2']
+        assert archive.log('1') == 'six==1.11.0\n' * 100
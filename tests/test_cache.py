@@ -0,0 +1,26 @@
+from thoth_dependency_monkey.cache import LRUCache
+
+
+class LRUCacheTest(object):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_size=6)
+
+        cache.put('a', 'aa')
+        cache.put('b', 'bb')
+        cache.put('c', 'cc')
+
+        assert cache.get('a') == 'aa'
+
+        cache.put('d', 'dd')
+
+        assert 'b' not in cache
+        assert cache.get('a') == 'aa'
+        assert cache.size == 6
+
+    def test_does_not_cache_oversized_values(self):
+        cache = LRUCache(max_size=2)
+
+        cache.put('a', 'aaa')
+
+        assert cache.get('a') is None
+        assert cache.size == 0
@@ -0,0 +1,43 @@
+from thoth_dependency_monkey.ecosystem import Validator, VALIDATORS, ECOSYSTEM, VALIDATOR_DEADLINE, \
+    VALIDATOR_MIN_DEADLINE
+from thoth_dependency_monkey.specification import specification_size
+
+
+class ValidatorTest(object):
+    def test_registry(self):
+        assert ECOSYSTEM == ['pypi']
+        assert VALIDATORS['pypi'].image == 'pypi-validator'
+
+    def test_defaults_until_profiled(self):
+        validator = Validator('pypi-validator')
+
+        for i in range(19):
+            validator.record(3, 'hash-{}'.format(i), 100, 512 * 1024 ** 2, 50)
+
+        resources, deadline = validator.resources([(3, 'unknown'), (2, 'unknown too')])
+
+        assert resources == {'requests': {'memory': str(256 * 1024 ** 2), 'cpu': '250m'},
+                             'limits': {'memory': str(2 * 1024 ** 3), 'cpu': '2000m'}}
+        assert deadline == 2 * VALIDATOR_DEADLINE
+
+    def test_resources_of_profiled_sizes(self):
+        validator = Validator('pypi-validator')
+
+        for i in range(100):
+            validator.record(2 + i % 2, 'hash-{}'.format(i), 10 + i, (100 + i) * 1024 ** 2, (10 + i) / 2)
+
+        resources, deadline = validator.resources([(2, 'unknown'), (3, 'unknown too')])
+
+        assert resources == {'requests': {'memory': str(190 * 1024 ** 2), 'cpu': '500m'},
+                             'limits': {'memory': str(int(199 * 1024 ** 2 * 1.5)), 'cpu': '750m'}}
+        assert deadline == max(VALIDATOR_MIN_DEADLINE, int(2 * 109 * 1.5))
+
+        # a stack validated before gets what it took, whatever its size
+        resources, deadline = validator.resources([(20, 'hash-0')])
+
+        assert resources['requests']['memory'] == str(100 * 1024 ** 2)
+        assert resources['limits']['memory'] == str(150 * 1024 ** 2)
+        assert deadline == VALIDATOR_MIN_DEADLINE
+
+    def test_specification_size(self):
+        assert specification_size('flask\\nsix  # compat\\n\\n-i https://pypi.org/simple\\nSix') == 2
@@ -0,0 +1,88 @@
+import time
+
+import pytest
+
+from thoth_dependency_monkey.executor import LocalExecutor
+
+
+VALIDATOR = '''
+import time
+
+
+def validate(stack_specification):
+    if stack_specification == 'slow':
+        time.sleep(10)
+
+    print(stack_specification.upper())
+'''
+
+
+@pytest.fixture
+def local_executor(tmpdir):
+    validator = tmpdir.join('validate')
+    validator.write(VALIDATOR)
+
+    executor = LocalExecutor(max_workers=1, max_pending=1, timeout=1, validator_path=str(validator))
+
+    yield executor
+
+    executor.shutdown()
+
+
+def _wait(executor, id):
+    for _ in range(100):
+        v = executor.get(id)
+
+        if v['phase'] in ('succeeded', 'failed'):
+            return v
+
+        time.sleep(0.1)
+
+
+class LocalExecutorTest(object):
+    def test_validate(self, local_executor):
+        local_executor.submit([{'id': '1', 'stack_specification': 'six', 'ecosystem': 'pypi', 'spec_hash': 'abc'}])
+
+        v = _wait(local_executor, '1')
+
+        assert v['phase'] == 'succeeded'
+        assert v['result']['valid']
+        assert 'raw_log' not in v
+        assert local_executor.log('1') == 'SIX\n'
+        assert local_executor.ids() == ['1']
+        assert [v['id'] for v in local_executor.find('abc')] == ['1']
+        assert local_executor.delete('1')
+        assert local_executor.get('1') is None
+
+    def test_timeout(self, local_executor):
+        local_executor.submit([{'id': '1', 'stack_specification': 'slow', 'ecosystem': 'pypi', 'spec_hash': 'abc'}])
+
+        v = _wait(local_executor, '1')
+
+        assert v['phase'] == 'failed'
+        assert 'raw_log' not in v
+
+    def test_retention(self, local_executor):
+        local_executor.retention = 0
+        local_executor.submit([{'id': '1', 'stack_specification': 'six', 'ecosystem': 'pypi', 'spec_hash': 'abc'}])
+
+        _wait(local_executor, '1')
+        time.sleep(0.01)
+
+        assert local_executor.ids() == []
+
+    def test_list(self, local_executor):
+        local_executor.max_pending = 3
+        local_executor.submit([{'id': str(i), 'stack_specification': 'six', 'ecosystem': 'pypi', 'spec_hash': 'abc'}
+                               for i in range(3)])
+
+        for i in range(3):
+            _wait(local_executor, str(i))
+
+        items, continue_token = local_executor.list(limit=2)
+
+        assert items == [{'id': '0'}, {'id': '1'}]
+        assert local_executor.list(limit=2, continue_token=continue_token) == ([{'id': '2'}], None)
+        assert len(local_executor.list(phase='succeeded', valid=True)[0]) == 3
+        assert local_executor.list(valid=False) == ([], None)
+        assert local_executor.list(created_before=0) == ([], None)
@@ -0,0 +1,106 @@
+import pkg_resources
+import pytest
+
+from werkzeug.exceptions import BadRequest
+
+from thoth_dependency_monkey.exploration import explored_requirements, candidate_versions, count_combinations, \
+    combinations, pinned_requirement
+from thoth_dependency_monkey.validation_dao import ValidationDAO
+
+
+@pytest.fixture
+def executor(fake_executor):
+    return fake_executor()
+
+
+@pytest.fixture
+def dao(executor):
+    return ValidationDAO(executor=executor)
+
+
+def _exploration(**kwargs):
+    _spec = 'flask>=0.12\nrequests[security]<2.20; python_version>"3"\n-i https://pypi.org/simple'
+    _versions = {'Flask': ['0.11', '0.12.4', '1.0.2', '1.1.0rc1'], 'requests': ['2.18.4', '2.19.1', '2.20.0']}
+
+    return dict({'stack_specification': _spec, 'ecosystem': 'pypi', 'versions': _versions}, **kwargs)
+
+
+class ExplorationTest(object):
+    def test_explored_requirements(self):
+        _lines = explored_requirements('flask>=0.12  # web\\n-i https://pypi.org/simple\\nsix===1.11.0')
+
+        assert [line for line, _ in _lines] == ['flask>=0.12', '-i https://pypi.org/simple', 'six===1.11.0']
+        assert [requirement is not None for _, requirement in _lines] == [True, False, False]
+
+    def test_candidate_versions(self):
+        _requirement = pkg_resources.Requirement.parse('flask>=0.12')
+
+        assert candidate_versions(_requirement, ['1.0.2', '0.11', '0.12.10', '0.12.4', '1.1.0rc1'], 2) == \
+            ['0.12.10', '1.0.2']
+        assert candidate_versions(_requirement, ['1.0.2', '0.12.10', '0.12.4'], None) == ['0.12.4', '0.12.10', '1.0.2']
+
+    def test_strategies(self):
+        _candidates = [['1', '2', '3'], ['a', 'b']]
+
+        assert list(combinations(_candidates)) == [('3', 'b'), ('3', 'a'), ('2', 'b'), ('2', 'a'), ('1', 'b'),
+                                                   ('1', 'a')]
+        assert list(combinations(_candidates, limit=2)) == [('3', 'b'), ('3', 'a')]
+        assert count_combinations(_candidates, 'boundary') == 4
+        assert set(combinations(_candidates, 'boundary')) == {('1', 'a'), ('1', 'b'), ('3', 'a'), ('3', 'b')}
+
+        _sample = list(combinations(_candidates, 'random', limit=4, seed=1))
+
+        assert len(set(_sample)) == 4
+        assert _sample == list(combinations(_candidates, 'random', limit=4, seed=1))
+        assert sorted(combinations(_candidates, 'random', limit=6, seed=1)) == sorted(combinations(_candidates))
+
+    def test_pinned_requirement(self):
+        _requirement = pkg_resources.Requirement.parse('requests[socks,security]<2.20; python_version > "3"')
+
+        assert pinned_requirement(_requirement, '2.19.1') == 'requests[security,socks]==2.19.1; python_version > "3"'
+
+    def test_create_exploration(self, dao, executor):
+        exploration = dao.create_exploration(_exploration(max_versions=2), client='ci')
+
+        assert exploration['total'] == 4
+        assert [c['pins'] for c in exploration['combinations']][:2] == [{'flask': '1.0.2', 'requests': '2.19.1'},
+                                                                        {'flask': '1.0.2', 'requests': '2.18.4'}]
+        assert [(len(ids), jobs) for ids, jobs in executor.submitted] == [(4, 1)]
+
+        _first = executor.get(exploration['combinations'][0]['id'])
+
+        assert _first['stack_specification'] == \
+            'flask==1.0.2\nrequests[security]==2.19.1; python_version > "3"\n-i https://pypi.org/simple'
+        assert _first['priority'] == 'bulk'
+
+        executor.finish(exploration['combinations'][0]['id'], True)
+        executor.finish(exploration['combinations'][1]['id'], False)
+        exploration = dao.get_exploration(exploration['id'])
+
+        assert not exploration['finished']
+        assert exploration['versions'] == {'flask': {'1.0.2': {'valid': 1, 'invalid': 1}},
+                                           'requests': {'2.19.1': {'valid': 1, 'invalid': 0},
+                                                        '2.18.4': {'valid': 0, 'invalid': 1}}}
+        assert [c['id'] for c in dao.get_exploration_results(exploration['id'], timeout=0)] == \
+            [c['id'] for c in exploration['combinations'][:2]]
+
+    def test_known_failures_are_pruned(self, dao, executor):
+        _explored = dao.create_exploration(_exploration(max_versions=2))
+        executor.finish(_explored['combinations'][1]['id'], False)
+
+        exploration = dao.create_exploration(_exploration(strategy='boundary'))
+
+        assert exploration['total'] == 4
+        assert [c['pruned'] for c in exploration['combinations']] == [False, True, False, False]
+        # the others are still being validated
+        assert [c['id'] for c in exploration['combinations']] == [c['id'] for c in _explored['combinations']]
+        assert [(len(ids), jobs) for ids, jobs in executor.submitted] == [(4, 1)]
+
+    def test_too_many_combinations(self, dao):
+        with pytest.raises(BadRequest):
+            dao.create_exploration(_exploration(max_combinations=2))
+
+        assert len(dao.create_exploration(_exploration(max_combinations=2, strategy='random'))['combinations']) == 2
+
+        with pytest.raises(BadRequest):
+            dao.create_exploration(_exploration(stack_specification='flask>2'))
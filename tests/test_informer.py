@@ -0,0 +1,115 @@
+import time
+import uuid
+
+from datetime import datetime, timezone
+
+from kubernetes import client
+
+from thoth_dependency_monkey.informer import Informer, label_indexer
+
+from benchmarks.fake_kubernetes import FakeCluster, FakeBatchV1Api, _job
+
+
+def _store_job(cluster, phase='pending'):
+    _id = str(uuid.uuid4())
+    cluster.store('jobs', _job(_id, 'abc', 'pypi', phase, None, datetime.now(timezone.utc)))
+
+    return _id
+
+
+def _informer(list_func, **kwargs):
+    return Informer('test-jobs', list_func, 'V1Job', key_func=lambda job: job.metadata.labels['validation-id'],
+                    label_selector='validation-id', indexers={'phase': label_indexer('phase')}, retry_interval=0.1,
+                    **kwargs)
+
+
+def _wait_for(condition, timeout=5):
+    _deadline = time.time() + timeout
+
+    while time.time() < _deadline:
+        if condition():
+            return True
+
+        time.sleep(0.05)
+
+    return False
+
+
+class InformerTest(object):
+    def test_resumes_from_resource_version(self):
+        cluster = FakeCluster()
+        _first = _store_job(cluster)
+        _api = FakeBatchV1Api(cluster)
+        informer = _informer(lambda **kwargs: _api.list_namespaced_job('test', **kwargs), watch_timeout=1)
+        _events = []
+        informer.add_handler(lambda event_type, job: _events.append((event_type, job.metadata.labels['phase'])))
+
+        informer.start()
+
+        try:
+            assert informer.wait_for_sync(5)
+            assert informer.get(_first) is not None
+
+            _second = _store_job(cluster, 'running')
+
+            assert _wait_for(lambda: informer.get(_second) is not None)
+            assert informer.count('phase', 'running') == 1
+
+            # the watch timed out on the server side meanwhile, it is resumed without listing again
+            assert _wait_for(lambda: cluster.calls['watch_jobs'] >= 2)
+
+            _third = _store_job(cluster)
+
+            assert _wait_for(lambda: informer.get(_third) is not None)
+            assert cluster.calls['list_jobs'] == 1
+            assert _events == [('ADDED', 'pending'), ('ADDED', 'running'), ('ADDED', 'pending')]
+
+            cluster.remove('jobs', informer.get(_first).metadata.name)
+
+            assert _wait_for(lambda: informer.get(_first) is None)
+        finally:
+            informer.stop()
+
+    def test_relists_on_gone(self):
+        cluster = FakeCluster()
+        _api = FakeBatchV1Api(cluster)
+        _gone = []
+
+        def _list_func(**kwargs):
+            # the resourceVersion of the first list expired before the watch started
+            if kwargs.get('watch') and not _gone:
+                _gone.append(True)
+                raise client.rest.ApiException(status=410, reason='Gone')
+
+            return _api.list_namespaced_job('test', **kwargs)
+
+        _first = _store_job(cluster)
+        informer = _informer(_list_func)
+
+        informer.start()
+
+        try:
+            assert _wait_for(lambda: cluster.calls['list_jobs'] == 2)
+            assert informer.wait_for_sync(5)
+
+            _second = _store_job(cluster)
+
+            assert _wait_for(lambda: informer.get(_second) is not None)
+            assert informer.get(_first) is not None
+            assert cluster.calls['list_jobs'] == 2
+        finally:
+            informer.stop()
+
+    def test_add_and_discard(self):
+        informer = _informer(None)
+        _id = str(uuid.uuid4())
+        job = _job(_id, 'abc', 'pypi', 'failed', None, datetime.now(timezone.utc))
+
+        informer.add(job)
+
+        assert informer.by_index('phase', 'failed') == [job]
+
+        informer.discard(_id)
+
+        assert informer.get(_id) is None
+        assert informer.index_values('phase') == []
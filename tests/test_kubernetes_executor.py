@@ -0,0 +1,226 @@
+import json
+import uuid
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from werkzeug.exceptions import BadRequest
+
+from thoth_dependency_monkey import kubernetes_executor
+from thoth_dependency_monkey.archive import Archive
+from thoth_dependency_monkey.kubernetes_executor import KubernetesExecutor
+from thoth_dependency_monkey.validation_job import VALIDATION_JOB_PREFIX
+from thoth_dependency_monkey.specification_config_maps import SPECIFICATION_CONFIG_MAP_PREFIX, \
+    SPECIFICATION_CONFIG_MAP_KEY, decode_specification
+from thoth_dependency_monkey.result import RESULT_TAG
+from thoth_dependency_monkey.specification import specification_hash
+from thoth_dependency_monkey.store import InProcessStore, SQLiteStore
+
+from benchmarks.fake_kubernetes import FakeCluster, FakeKubernetesClient, _job, _pod, _config_map
+
+
+@pytest.fixture
+def cluster():
+    return FakeCluster()
+
+
+@pytest.fixture
+def executors(cluster, tmpdir, monkeypatch):
+    """Creates executors sharing an archive, without the caches of Jobs and Pods unless the test turns them on."""
+    monkeypatch.setattr(kubernetes_executor, 'JOB_CACHE', False)
+    monkeypatch.setattr(kubernetes_executor, 'POD_CACHE', False)
+
+    _executors = []
+
+    def _executor(**kwargs):
+        kwargs.setdefault('store', InProcessStore())
+        _executors.append(KubernetesExecutor(FakeKubernetesClient(cluster),
+                                             archive=Archive(str(tmpdir.join('archive.sqlite'))), **kwargs))
+
+        return _executors[-1]
+
+    yield _executor
+
+    for executor in _executors:
+        executor._leader.stop()
+
+
+def _validation(cluster, phase='succeeded', valid=True, spec='six', age=timedelta(hours=1)):
+    """Store a Job validating `spec`, along with its Pod and ConfigMap, return the id of the Validation."""
+    _id = str(uuid.uuid4())
+    _spec_hash = specification_hash(spec, 'pypi')
+    _record = {'valid': valid, 'failure': None if valid else 'distribution_not_found', 'pins': None,
+               'timings': None} if phase == 'succeeded' else None
+    job = _job(_id, _spec_hash, 'pypi', phase, None, datetime.now(timezone.utc) - age)
+
+    cluster.store('jobs', job)
+    cluster.store('configmaps', _config_map(spec, _spec_hash, [job]))
+
+    if phase != 'pending':
+        _log = None if _record is None else '{}\n{}{}\n'.format(spec, RESULT_TAG, json.dumps(_record))
+        cluster.store('pods', _pod(job, {'succeeded': 'Succeeded', 'failed': 'Failed'}.get(phase, 'Running'),
+                                   _record), log=_log)
+
+    return _id
+
+
+def _list_all(executor, limit, **filters):
+    _ids, _tokens, _token = [], [], None
+
+    while True:
+        _items, _token = executor.list(limit=limit, continue_token=_token, **filters)
+        _ids += [v['id'] for v in _items]
+
+        if _token is None:
+            return _ids, _tokens
+
+        _tokens.append(_token[:2])
+
+
+class KubernetesExecutorTest(object):
+    def test_get(self, cluster, executors):
+        _id = _validation(cluster)
+        executor = executors()
+
+        v = executor.get(_id)
+
+        assert v['stack_specification'] == 'six'
+        assert v['phase'] == 'succeeded'
+        assert v['result']['valid']
+        assert executor.get(str(uuid.uuid4())) is None
+
+        # recorded once it finished, read back without asking the Kubernetes API
+        _calls = sum(cluster.calls.values())
+
+        assert executor.get(_id)['result']['valid']
+        assert executor.version(_id) == 'finished'
+        assert sum(cluster.calls.values()) == _calls
+
+    def test_retried_job_picks_latest_terminated_pod(self, cluster, executors):
+        _id = _validation(cluster, phase='failed')
+        job = cluster.get('jobs', VALIDATION_JOB_PREFIX + _id)
+        _started = job.metadata.creation_timestamp
+
+        # the first Pod failed, the Job was retried and succeeded, another Pod was started meanwhile
+        for pod in cluster.list('pods', 'job-name=' + job.metadata.name)[0]:
+            pod.status.start_time = _started
+
+        _record = {'valid': False, 'failure': 'resolution_error', 'pins': None, 'timings': None}
+        _retried = _pod(job, 'Succeeded', _record)
+        _retried.status.start_time = _started + timedelta(minutes=1)
+        cluster.store('pods', _retried, log='retried\n{}{}\n'.format(RESULT_TAG, json.dumps(_record)))
+        _pending = _pod(job, 'Pending', None)
+        _pending.status.start_time = _started + timedelta(minutes=2)
+        cluster.store('pods', _pending)
+        job.status.succeeded = 1
+
+        executor = executors()
+
+        assert executor._pods.pod(job) is _retried
+        assert executor.log(_id).startswith('retried\n')
+        assert executor.get(_id)['result']['failure'] == 'resolution_error'
+
+    def test_list_pages(self, cluster, executors):
+        _ids = [_validation(cluster, valid=i % 2 == 0) for i in range(5)]
+        executor = executors()
+        executor._archive.put([{'id': 'archived', 'stack_specification': 'six', 'ecosystem': 'pypi',
+                                'spec_hash': 'abc', 'phase': 'failed', 'created': 0, 'finished': 1}])
+
+        _listed, _tokens = _list_all(executor, 2)
+
+        assert _listed == sorted(_ids) + ['archived']
+        assert _tokens == ['k:', 'k:', 'a:']
+        assert _list_all(executor, 2, phase='failed') == (['archived'], [])
+
+        with pytest.raises(BadRequest):
+            executor.list(limit=2, continue_token='x:abc')
+
+        # the continue token of a cache that is not in sync any more cannot be followed
+        with pytest.raises(BadRequest):
+            executor.list(limit=2, continue_token='c:' + VALIDATION_JOB_PREFIX)
+
+    def test_list_pages_of_cache(self, cluster, executors, monkeypatch):
+        _ids = [_validation(cluster, valid=i % 2 == 0) for i in range(5)]
+        monkeypatch.setattr(kubernetes_executor, 'JOB_CACHE', True)
+        executor = executors()
+        executor._jobs.start()
+
+        assert executor._jobs.wait_for_sync(5)
+
+        _listed, _tokens = _list_all(executor, 2)
+
+        assert _listed == sorted(_ids)
+        assert _tokens == ['c:', 'c:']
+        assert sorted(_list_all(executor, 2, valid=True)[0]) == sorted(_ids[0::2])
+
+    def test_retention(self, cluster, executors):
+        _expired = [_validation(cluster, age=timedelta(days=2)), _validation(cluster, valid=False,
+                                                                           age=timedelta(days=2))]
+        _recent = _validation(cluster)
+        _running = _validation(cluster, phase='running', age=timedelta(days=2))
+        executor = executors(retention_ttl=3600)
+
+        assert executor._retention.archive_finished_jobs() == 2
+        assert executor._retention.archive_finished_jobs() == 0
+
+        for id in _expired:
+            assert cluster.get('jobs', VALIDATION_JOB_PREFIX + id) is None
+            assert not cluster.list('pods', 'job-name=' + VALIDATION_JOB_PREFIX + id)[0]
+
+        assert cluster.get('jobs', VALIDATION_JOB_PREFIX + _recent) is not None
+        assert cluster.get('jobs', VALIDATION_JOB_PREFIX + _running) is not None
+
+        # archived Validations are read from the archive only
+        _calls = sum(cluster.calls.values())
+        _archived = executors()
+
+        assert _archived.get(_expired[0])['result']['valid']
+        assert not _archived.get(_expired[1])['result']['valid']
+        assert RESULT_TAG in _archived.log(_expired[0])
+        assert sum(cluster.calls.values()) == _calls
+        assert sorted(_archived.ids()) == sorted(_expired + [_recent, _running])
+
+    def test_specification_config_maps(self, cluster, executors):
+        _spec = 'six\nflask>=1.0'
+        _spec_hash = specification_hash(_spec, 'pypi')
+        executor = executors()
+
+        executor.submit([{'id': 'one', 'stack_specification': _spec, 'ecosystem': 'pypi', 'spec_hash': _spec_hash}])
+        executor.submit([{'id': 'two', 'stack_specification': _spec, 'ecosystem': 'pypi', 'spec_hash': _spec_hash}])
+
+        job = cluster.get('jobs', VALIDATION_JOB_PREFIX + 'one')
+        _env = {env.name: env.value for env in job.spec.template.spec.containers[0].env}
+        config_map = cluster.get('configmaps', SPECIFICATION_CONFIG_MAP_PREFIX + _spec_hash)
+
+        # the Job carries the path of its stack specification, the ConfigMap the specification
+        assert 'STACK_SPECIFICATION' not in _env
+        assert _env['STACK_SPECIFICATION_FILE'].endswith('/' + _spec_hash)
+        assert decode_specification(config_map.data[SPECIFICATION_CONFIG_MAP_KEY]) == _spec
+        assert len(config_map.metadata.owner_references) == 2
+
+        # read back from the ConfigMap
+        assert executors().get('one')['stack_specification'] == _spec
+        assert cluster.calls['read_config_map'] == 1
+
+        # the ConfigMap is gone with the last Job owning it
+        executor.delete('one')
+
+        assert cluster.get('configmaps', SPECIFICATION_CONFIG_MAP_PREFIX + _spec_hash) is not None
+
+        executor.delete('two')
+
+        assert cluster.get('configmaps', SPECIFICATION_CONFIG_MAP_PREFIX + _spec_hash) is None
+
+    def test_deleted_on_another_replica(self, cluster, executors, tmpdir):
+        _id = _validation(cluster)
+        one, two = [executors(store=SQLiteStore(str(tmpdir.join('store.sqlite')))) for _ in range(2)]
+
+        assert one.get(_id)['result']['valid']
+        assert two.get(_id)['result']['valid']
+        assert one.delete(_id)
+
+        # not read back from what the other replica remembers
+        assert two.get(_id) is None
+        assert two.version(_id) is None
+        assert not two.delete(_id)
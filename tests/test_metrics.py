@@ -0,0 +1,34 @@
+import pytest
+
+from prometheus_client import REGISTRY
+
+from thoth_dependency_monkey.metrics import CacheStats, kubernetes_api_call
+
+
+class ApiException(Exception):
+    def __init__(self, status):
+        self.status = status
+
+
+class MetricsTest(object):
+    def test_kubernetes_api_call(self):
+        with kubernetes_api_call('test_read'):
+            pass
+
+        with pytest.raises(ApiException):
+            with kubernetes_api_call('test_read'):
+                raise ApiException(403)
+
+        assert REGISTRY.get_sample_value('thoth_dependency_monkey_kubernetes_api_latency_seconds_count',
+                                         {'operation': 'test_read'}) == 2
+        assert REGISTRY.get_sample_value('thoth_dependency_monkey_kubernetes_api_errors_total',
+                                         {'operation': 'test_read', 'status': '403'}) == 1
+
+    def test_cache_stats(self):
+        stats = CacheStats('test')
+
+        assert stats.record(True)
+        assert not stats.record(False)
+        stats.hit()
+
+        assert REGISTRY.get_sample_value('thoth_dependency_monkey_cache_hit_ratio', {'cache': 'test'}) == 2 / 3
@@ -0,0 +1,144 @@
+import json
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from werkzeug.exceptions import BadRequest
+
+from thoth_dependency_monkey import notification
+from thoth_dependency_monkey.notification import Notifier, check_callback_url
+from thoth_dependency_monkey.validation_dao import ValidationDAO
+
+
+class _Webhook(BaseHTTPRequestHandler):
+    posted = []
+
+    def do_POST(self):
+        _Webhook.posted.append(json.loads(self.rfile.read(int(self.headers['Content-Length'])).decode()))
+
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def webhook():
+    server = HTTPServer(('127.0.0.1', 0), _Webhook)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _Webhook.posted = []
+
+    yield 'http://127.0.0.1:{}/'.format(server.server_address[1])
+
+    server.shutdown()
+
+
+def _later(func, *args):
+    _timer = threading.Timer(0.2, func, args)
+    _timer.start()
+
+    return _timer
+
+
+def _wait_for(condition):
+    for _ in range(50):
+        if condition():
+            return True
+
+        time.sleep(0.1)
+
+    return False
+
+
+class NotificationTest(object):
+    def test_subscriptions(self):
+        notifier = Notifier(lambda id: None, lambda id: {'id': id})
+        notifier.listening = True
+
+        with notifier.subscribe(['1']) as one, notifier.subscribe() as all:
+            notifier.publish('2', 'running')
+            notifier.publish('1', 'succeeded')
+
+            assert one.get(0) == ('1', 'succeeded')
+            assert one.get(0) is None
+            assert [all.get(0), all.get(0)] == [('2', 'running'), ('1', 'succeeded')]
+
+        assert not notifier._subscriptions
+
+    def test_polling(self):
+        _phases = {'1': 'pending'}
+        notifier = Notifier(_phases.get, lambda id: {'id': id})
+
+        with pytest.raises(ValueError):
+            notifier.subscribe()
+
+        with notifier.subscribe(['1']) as subscription:
+            notifier.poll()
+            _phases['1'] = 'running'
+            notifier.poll()
+            notifier.poll()
+
+            assert [subscription.get(0), subscription.get(0), subscription.get(0)] == \
+                [('1', 'pending'), ('1', 'running'), None]
+
+    def test_long_poll(self, fake_executor):
+        executor = fake_executor()
+        dao = ValidationDAO(executor=executor)
+        v = dao.create({'stack_specification': 'six', 'ecosystem': 'pypi'})
+
+        _started = time.time()
+        _later(executor.finish, v['id'])
+
+        assert dao.get(v['id'], wait=10)['phase'] == 'succeeded'
+        assert time.time() - _started < 5
+        assert dao.get(v['id'], wait=10)['valid']
+
+    def test_events(self, fake_executor):
+        executor = fake_executor()
+        dao = ValidationDAO(executor=executor)
+        v = dao.create({'stack_specification': 'six', 'ecosystem': 'pypi'})
+
+        _later(executor.finish, v['id'])
+
+        assert list(dao.events([v['id']], heartbeat=10)) == [{'id': v['id'], 'phase': 'pending'},
+                                                             {'id': v['id'], 'phase': 'succeeded'}]
+        assert set(dao.events(timeout=0.2, heartbeat=0.1)) == {None}
+
+    def test_webhooks(self, webhook, monkeypatch, fake_executor):
+        monkeypatch.setattr(notification, 'WEBHOOK_ALLOWED_HOSTS', ['127.0.0.1'])
+        executor = fake_executor(listening=False)
+        dao = ValidationDAO(executor=executor)
+        dao._notifier.poll_interval = 0.1
+
+        with pytest.raises(BadRequest):
+            dao.create({'stack_specification': 'six', 'ecosystem': 'pypi', 'callback_url': 'file:///etc/passwd'})
+
+        v = dao.create({'stack_specification': 'six', 'ecosystem': 'pypi', 'callback_url': webhook})
+        executor.finish(v['id'])
+
+        assert _wait_for(lambda: _Webhook.posted)
+        assert _Webhook.posted[0]['id'] == v['id']
+        assert _Webhook.posted[0]['valid']
+
+        # attached to a Validation that finished already
+        dao.create({'stack_specification': 'six', 'ecosystem': 'pypi', 'callback_url': webhook})
+
+        assert _wait_for(lambda: len(_Webhook.posted) == 2)
+        assert check_callback_url(None) is None
+
+    def test_callback_urls(self):
+        for url in ('http://10.0.0.1/', 'http://127.0.0.1:8080/', 'http://169.254.169.254/latest/meta-data/',
+                    'http://[::1]/', 'http://[::ffff:192.168.0.1]/', 'https:///'):
+            with pytest.raises(BadRequest):
+                check_callback_url(url, allowed_hosts=[])
+
+        assert check_callback_url('https://8.8.8.8/hooks', allowed_hosts=[]) == 'https://8.8.8.8/hooks'
+        assert check_callback_url('https://ci.example.com/', allowed_hosts=['.example.com']) == \
+            'https://ci.example.com/'
+
+        with pytest.raises(BadRequest):
+            check_callback_url('https://8.8.8.8/hooks', allowed_hosts=['ci.example.com'])
@@ -0,0 +1,96 @@
+import os
+import time
+
+import pytest
+
+from thoth_dependency_monkey.replication import Replication, SUBMISSIONS_QUEUE
+from thoth_dependency_monkey.scheduler import Scheduler
+from thoth_dependency_monkey.store import InProcessStore, SQLiteStore
+
+
+@pytest.fixture
+def path(tmpdir):
+    return os.path.join(str(tmpdir), 'store.sqlite')
+
+
+def _replica(store, leading, delete_func=None, max_queued=10):
+    """A replica whose Scheduler never has room to dispatch what it queued."""
+    scheduler = Scheduler('test', lambda work: None, lambda: 1, max_running=1, max_queued=max_queued,
+                          max_queued_per_client=10, interactive_reserve=0, interval=3600)
+
+    return Replication(store, scheduler, lambda: leading, delete_func, poll_interval=0.05)
+
+
+def _validation(id):
+    return [{'id': id, 'stack_specification': 'six', 'ecosystem': 'pypi'}]
+
+
+def _wait_for(condition, timeout=5):
+    _deadline = time.time() + timeout
+
+    while time.time() < _deadline:
+        if condition():
+            return True
+
+        time.sleep(0.05)
+
+    return False
+
+
+class ReplicationTest(object):
+    def test_handed_validations_keep_their_order(self, path):
+        _deleted = []
+        leader = _replica(SQLiteStore(path), True, _deleted.append, max_queued=1)
+        follower = _replica(SQLiteStore(path), False)
+
+        for id in ('1', '2', '3'):
+            follower.hand_over([_validation(id)], 'ci', 'interactive')
+
+        follower.hand_deletion('4')
+
+        # there is room for one, the others wait for it in line
+        assert leader.take_handed_validations() == 1
+        assert leader._scheduler.get('1') is not None
+        assert SQLiteStore(path).size(SUBMISSIONS_QUEUE) == 2
+        assert follower.get_handed('2')['phase'] == 'pending'
+        assert _deleted == ['4']
+
+        for id in ('2', '3'):
+            leader._scheduler.remove(str(int(id) - 1))
+
+            assert leader.take_handed_validations() == 1
+            assert leader._scheduler.get(id) is not None
+
+        assert SQLiteStore(path).size(SUBMISSIONS_QUEUE) == 0
+
+    def test_transitions_are_told_to_the_other_replicas(self, path):
+        leader = _replica(SQLiteStore(path), True)
+        follower = _replica(SQLiteStore(path), False)
+        _told, _told_leader = [], []
+
+        leader.publish_transition('1', 'pending')
+        follower.follow_transitions(lambda id, phase: _told.append((id, phase)))
+        leader.follow_transitions(lambda id, phase: _told_leader.append((id, phase)))
+
+        leader.publish_transition('1', 'running')
+        leader.publish_transition('1', 'succeeded')
+
+        assert _wait_for(lambda: len(_told) == 2)
+        assert _told == [('1', 'running'), ('1', 'succeeded')]
+
+        # the leader tells its own listeners
+        time.sleep(0.2)
+
+        assert _told_leader == []
+
+    def test_deletions_are_told_to_the_other_replicas(self, path):
+        _replica(SQLiteStore(path), True).tell_deleted('1')
+
+        assert _replica(SQLiteStore(path), False).deleted('1')
+        assert not _replica(SQLiteStore(path), False).deleted('2')
+
+        # without other replicas there is nobody to tell
+        replica = _replica(InProcessStore(), True)
+        replica.tell_deleted('1')
+
+        assert not replica.deleted('1')
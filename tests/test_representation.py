@@ -0,0 +1,115 @@
+import gzip
+import json
+
+import pytest
+
+import app as service
+
+from thoth_dependency_monkey.apis import validations
+from thoth_dependency_monkey.compression import gzip_response
+from thoth_dependency_monkey.validation_dao import ValidationDAO
+
+URL = '/api/v0alpha0/validations/'
+
+
+@pytest.fixture
+def executor(monkeypatch, fake_executor):
+    _executor = fake_executor()
+    monkeypatch.setattr(validations, 'DAO', ValidationDAO(executor=_executor))
+
+    return _executor
+
+
+@pytest.fixture
+def client(executor):
+    return service.app.test_client()
+
+
+def _create(client):
+    _response = client.post(URL, headers={'content-type': 'application/json'},
+                            data=json.dumps({'stack_specification': 'six', 'ecosystem': 'pypi'}))
+
+    return json.loads(_response.data.decode())['id']
+
+
+class RepresentationTest(object):
+    def test_conditional_get(self, client, executor):
+        id = _create(client)
+        _response = client.get(URL + id)
+        _etag = _response.headers['ETag']
+
+        assert _etag.startswith('W/"')
+        assert 'raw_log' not in json.loads(_response.data.decode())
+
+        _reads = executor.reads
+        _response = client.get(URL + id, headers={'If-None-Match': _etag})
+
+        assert _response.status_code == 304
+        assert _response.headers['ETag'] == _etag
+        # answered from the version alone
+        assert executor.reads == _reads
+
+        executor.validations[id]['phase'] = 'running'
+
+        assert client.get(URL + id, headers={'If-None-Match': _etag}).status_code == 200
+        assert client.get(URL + id + '?fields=phase', headers={'If-None-Match': _etag}).status_code == 200
+
+    def test_fields(self, client, executor):
+        id = _create(client)
+        executor.logs[id] = 'resolving six'
+
+        assert json.loads(client.get(URL + id + '?fields=id,phase').data.decode()) == {'id': id, 'phase': 'pending'}
+        assert json.loads(client.get(URL + id + '?fields=raw_log').data.decode()) == {'raw_log': 'resolving six'}
+        assert json.loads(client.get(URL + id + '?raw_log=true').data.decode())['raw_log'] == 'resolving six'
+        assert client.get(URL + id + '?fields=id,env').status_code == 400
+
+        # without a version the ETag is of the representation
+        _etag = client.get(URL + id + '?fields=raw_log').headers['ETag']
+
+        assert client.get(URL + id + '?fields=raw_log', headers={'If-None-Match': _etag}).status_code == 304
+
+        executor.logs[id] += '\nresolved six'
+
+        assert client.get(URL + id + '?fields=raw_log', headers={'If-None-Match': _etag}).status_code == 200
+
+    def test_raw_log(self, client, executor):
+        id = _create(client)
+
+        assert client.get(URL + id + '/raw_log').data == b''
+        assert client.get(URL + 'unknown/raw_log').status_code == 404
+
+        executor.logs[id] = 'resolving six\nresolved six\n'
+        _response = client.get(URL + id + '/raw_log')
+
+        assert _response.mimetype == 'text/plain'
+        assert _response.headers['Accept-Ranges'] == 'bytes'
+        assert client.get(URL + id + '/raw_log',
+                          headers={'If-None-Match': _response.headers['ETag']}).status_code == 304
+
+        # only what was added since
+        _response = client.get(URL + id + '/raw_log', headers={'Range': 'bytes=14-'})
+
+        assert _response.status_code == 206
+        assert _response.data == b'resolved six\n'
+        assert _response.headers['Content-Range'] == 'bytes 14-26/27'
+
+    def test_gzip(self, client, executor):
+        id = _create(client)
+        executor.logs[id] = 'resolving six\n' * 1000
+
+        _response = client.get(URL + id + '/raw_log', headers={'Accept-Encoding': 'gzip'})
+
+        assert _response.headers['Content-Encoding'] == 'gzip'
+        assert _response.headers['ETag'].startswith('W/')
+        assert 'Accept-Ranges' not in _response.headers
+        assert gzip.decompress(_response.data) == executor.logs[id].encode()
+
+        assert 'Content-Encoding' not in client.get(URL + id + '/raw_log').headers
+        # too small to be worth it
+        assert 'Content-Encoding' not in client.get(URL + id, headers={'Accept-Encoding': 'gzip'}).headers
+
+    def test_gzip_streamed(self):
+        _response = service.app.response_class(iter([b'data: x\n\n'] * 1000))
+
+        with service.app.test_request_context(headers={'Accept-Encoding': 'gzip'}) as context:
+            assert 'Content-Encoding' not in gzip_response(context.request, _response, min_size=1).headers
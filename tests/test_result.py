@@ -0,0 +1,30 @@
+import json
+
+from thoth_dependency_monkey.result import RESULT_TAG, parse_result, parse_termination_message
+
+
+RECORD = {'valid': True, 'failure': None, 'pins': {'six': '1.11.0'}, 'timings': {'resolve': 1.5, 'total': 1.6}}
+
+
+class ResultTest(object):
+    def test_parse_result(self):
+        log = 'six==1.11.0\n' + RESULT_TAG + json.dumps(RECORD) + '\n'
+
+        assert parse_result(log) == RECORD
+
+    def test_parse_result_of_legacy_validator(self):
+        assert parse_result('six==1.11.0\n')['valid']
+
+        # both messages mark a Validation as not valid, not just the latter one
+        assert parse_result('No matching distribution found for foo\n')['failure'] == 'distribution_not_found'
+        assert not parse_result('The Software Stack Specification could not be validated, '
+                                'most probably a syntax error in the spec!')['valid']
+
+    def test_parse_termination_message(self):
+        assert parse_termination_message(json.dumps(RECORD)) == RECORD
+        assert parse_termination_message(json.dumps({'1': RECORD}), id='1') == RECORD
+        assert parse_termination_message(json.dumps({'1': RECORD}), id='2') is None
+        assert parse_termination_message('') is None
+
+        # a record without pins was shortened, the complete one is within the log
+        assert parse_termination_message(json.dumps({'valid': True, 'failure': None})) is None
@@ -0,0 +1,124 @@
+import pytest
+
+from thoth_dependency_monkey.scheduler import Scheduler, QueueFullError
+
+
+class _Cluster(object):
+    """Records the work dispatched to it, `running` of it counts as running."""
+
+    def __init__(self):
+        self.dispatched = []
+        self.running = 0
+        self.failing = False
+
+    def dispatch(self, work):
+        if self.failing:
+            raise RuntimeError('API server not available')
+
+        self.dispatched.append(work)
+        self.running += 1
+
+
+@pytest.fixture
+def cluster():
+    return _Cluster()
+
+
+@pytest.fixture
+def scheduler(cluster):
+    return Scheduler('test', cluster.dispatch, lambda: cluster.running, max_running=1, max_queued=4,
+                     max_queued_per_client=4, interactive_reserve=1, interval=3600)
+
+
+class SchedulerTest(object):
+    def test_dispatches_right_away_if_there_is_capacity(self, scheduler, cluster):
+        scheduler.enqueue(['1'], 'one', 'ci')
+
+        assert cluster.dispatched == ['one']
+        assert scheduler.get('1') is None
+        assert len(scheduler) == 0
+
+    def test_interactive_before_bulk_and_clients_take_turns(self, scheduler, cluster):
+        cluster.running = 1
+
+        scheduler.enqueue(['1'], 'bulk-1', 'nightly', 'bulk')
+        scheduler.enqueue(['2'], 'ci-1', 'ci')
+        scheduler.enqueue(['3'], 'ci-2', 'ci')
+        scheduler.enqueue(['4'], 'dev-1', 'dev')
+
+        assert [scheduler.get(id)['position'] for id in ('2', '4', '3', '1')] == [1, 2, 3, 4]
+
+        for _ in range(4):
+            cluster.running = 0
+            scheduler.dispatch()
+
+        assert cluster.dispatched == ['ci-1', 'dev-1', 'ci-2', 'bulk-1']
+
+    def test_full_queue_is_rejected_with_retry_after(self, scheduler, cluster):
+        cluster.running = 1
+
+        for id in range(4):
+            scheduler.enqueue([str(id)], id, 'ci')
+
+        with pytest.raises(QueueFullError) as e:
+            scheduler.enqueue(['4'], 4, 'ci')
+
+        assert e.value.code == 429
+        assert ('Retry-After', '60') in e.value.get_headers()
+
+        with pytest.raises(QueueFullError):
+            scheduler.ensure_room(1)
+
+    def test_failed_dispatch_is_retried_first(self, scheduler, cluster):
+        cluster.failing = True
+        scheduler.enqueue(['1'], 'ci-1', 'ci')
+        scheduler.enqueue(['2'], 'dev-1', 'dev')
+
+        assert cluster.dispatched == []
+        assert scheduler.get('1')['position'] == 1
+
+        cluster.failing = False
+        scheduler.dispatch()
+
+        assert cluster.dispatched == ['ci-1']
+
+    def test_admission_per_client_and_priority(self, cluster):
+        scheduler = Scheduler('test', cluster.dispatch, lambda: cluster.running, max_running=1, max_queued=6,
+                              max_queued_per_client=3, interactive_reserve=2, interval=3600)
+        cluster.running = 1
+
+        for id in range(3):
+            scheduler.enqueue([str(id)], id, 'nightly', 'bulk')
+
+        # a client cannot take more than its share
+        with pytest.raises(QueueFullError):
+            scheduler.enqueue(['3'], 3, 'nightly', 'bulk')
+
+        scheduler.enqueue(['3'], 3, 'weekly', 'bulk')
+
+        # the rest is reserved to interactive work
+        with pytest.raises(QueueFullError):
+            scheduler.enqueue(['4'], 4, 'weekly', 'bulk')
+
+        with pytest.raises(QueueFullError):
+            scheduler.ensure_room(3, 'ci')
+
+        scheduler.ensure_room(2, 'ci')
+        scheduler.enqueue(['4'], 4, 'ci')
+        scheduler.enqueue(['5'], 5, 'dev')
+
+        assert scheduler.usage() == {'total': 6, 'bulk': 4, 'clients': {'nightly': 3, 'weekly': 1, 'ci': 1, 'dev': 1}}
+
+        # as told by the Scheduler of another replica
+        with pytest.raises(QueueFullError):
+            Scheduler('other', cluster.dispatch, lambda: 0, max_queued=6, max_queued_per_client=3).ensure_room(
+                1, 'nightly', 'bulk', usage={'total': 3, 'bulk': 3, 'clients': {'nightly': 3}})
+
+        # work admitted by another replica is only refused once the queue is full
+        with pytest.raises(QueueFullError):
+            scheduler.enqueue(['6'], 6, 'nightly', 'bulk', admitted=True)
+
+        scheduler.remove('0')
+        scheduler.enqueue(['6'], 6, 'nightly', 'bulk', admitted=True)
+
+        assert scheduler.usage()['clients']['nightly'] == 3
@@ -0,0 +1,71 @@
+import io
+
+import pytest
+
+from thoth_dependency_monkey.specification import SpecificationSyntaxError, check_specification, \
+    normalize_specification, specification_errors, specification_hash, specification_size
+
+
+class SpecificationTest(object):
+    def test_normalize_specification(self):
+        spec = 'numpy >= 1.11.0, <2  # we need 1.11\\n\\n# comment\\nPandas\nScikit_Learn[Alldeps]'
+
+        assert normalize_specification(spec) == 'numpy<2,>=1.11.0\npandas\nscikit-learn[alldeps]'
+
+    def test_equivalent_specifications_share_a_hash(self):
+        assert specification_hash('pandas\nnumpy>=1.11.0', 'pypi') == \
+            specification_hash('numpy >= 1.11.0\\nPandas  # data frames', 'PyPI')
+        assert specification_hash('pandas', 'pypi') != specification_hash('pandas==0.23.0', 'pypi')
+
+    @pytest.mark.parametrize('spec', [
+        'pandas\\nnumpy>=1.11.0',
+        'numpy >= 1.11.0, <2  # we need 1.11\n--index-url https://pypi.org/simple',
+        'six==1.*\nfoo (>=1.0,<2)\nbar==1.0a1.dev2+local.1 --hash=sha256:abc',
+        'scikit-learn[alldeps]>=0.19; python_version < "3.6" and os_name == \'posix\'',
+        'git+https://github.com/thoth-station/dependency-monkey#egg=dependency-monkey\n'
+        'six @ https://example.com/six.tar.gz'
+    ])
+    def test_wellformed_specification(self, spec):
+        assert list(specification_errors(spec)) == []
+
+    @pytest.mark.parametrize('spec,line,column', [
+        ('pandas\\nnumpy>=', 2, 8),
+        ('six>=1.*', 1, 7),
+        ('foo => 1', 1, 5),
+        ('foo bar', 1, 5),
+        ('foo; pyversion == "3"', 1, 6),
+        ('-r other.txt', 1, 1),
+        ('[foo]', 1, 1),
+        ('# nothing but a comment', 1, 1)
+    ])
+    def test_malformed_specification(self, spec, line, column):
+        with pytest.raises(SpecificationSyntaxError) as e:
+            check_specification(spec)
+
+        assert (e.value.errors[0]['line'], e.value.errors[0]['column']) == (line, column)
+
+    @pytest.mark.parametrize('spec', [
+        # as generated by pip-compile --generate-hashes
+        'six==1.11.0 \\\n    --hash=sha256:70e8a77b \\\n    --hash sha256:832dc0e1\n# via flask\nclick==6.7 \\',
+        '-e git+https://github.com/thoth-station/dependency-monkey#egg=dependency-monkey',
+        '--index-url https://pypi.org/simple\n--editable=git+https://example.com/six.git#egg=six'
+    ])
+    def test_wellformed_pip_specification(self, spec):
+        assert list(specification_errors(spec)) == []
+
+    def test_continued_lines(self):
+        errors = list(specification_errors('pandas\nsix==1.11.0 \\\n  --hash=sha256:abc \\\n  --md5=abc\n'))
+
+        assert errors == [{'line': 2, 'column': 35, 'message': 'unknown option --md5'}]
+
+        # a comment line ends the continuation
+        assert list(specification_errors('six==1.11.0 \\\n# the hash follows\n--hash=sha256:abc')) == \
+            [{'line': 3, 'column': 1, 'message': 'unknown option --hash'}]
+
+    def test_editable_requirements_count(self):
+        assert specification_size('-e git+https://example.com/six.git#egg=six\n--pre\nflask') == 2
+
+    def test_specification_stream(self):
+        errors = list(specification_errors(io.StringIO('pandas\nnumpy>=1.11.0,\nsix\n')))
+
+        assert errors == [{'line': 2, 'column': 15, 'message': 'expected a version specifier after ,'}]
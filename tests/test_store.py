@@ -0,0 +1,186 @@
+import os
+import sys
+import time
+import subprocess
+
+import pytest
+
+from thoth_dependency_monkey.leader import LeaderElector
+from thoth_dependency_monkey.specification import specification_hash
+from thoth_dependency_monkey.store import InProcessStore, SQLiteStore, store_from_url
+from thoth_dependency_monkey.validation_dao import ValidationDAO, DEDUPLICATION_KEY
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmpdir):
+    if request.param == 'memory':
+        return InProcessStore()
+
+    return SQLiteStore(os.path.join(str(tmpdir), 'store.sqlite'))
+
+
+class StoreTest(object):
+    def test_values(self, store):
+        store.put('a', {'phase': 'pending'})
+
+        assert store.get('a') == {'phase': 'pending'}
+        assert not store.add('a', {'phase': 'running'})
+        assert store.get('b') is None
+
+        store.put('b', 1, ttl=0.1)
+        time.sleep(0.2)
+
+        assert store.get('b') is None
+        assert store.add('b', 2)
+
+        store.delete('a')
+
+        assert store.get('a') is None
+
+    def test_queues(self, store):
+        store.push('submissions', {'id': 1})
+        store.push('submissions', {'id': 2})
+
+        assert store.size('submissions') == 2
+        assert store.peek('submissions') == {'id': 1}
+        assert [store.pop('submissions'), store.pop('submissions'), store.pop('submissions')] == \
+            [{'id': 1}, {'id': 2}, None]
+        assert store.peek('submissions') is None
+
+    def test_channels(self, store, monkeypatch):
+        store.publish('transitions', {'id': 1})
+        _, _position = store.published('transitions')
+
+        assert store.published('transitions', _position) == ([], _position)
+
+        store.publish('transitions', {'id': 2})
+        store.publish('deletions', {'id': 3})
+        store.publish('transitions', {'id': 4})
+        _values, _last = store.published('transitions', _position)
+
+        assert _values == [{'id': 2}, {'id': 4}]
+        assert store.published('transitions', _last) == ([], _last)
+
+        # values are kept for a while only, their positions are not reused
+        _now = time.time()
+        monkeypatch.setattr(time, 'time', lambda: _now + 3600)
+        store.publish('transitions', {'id': 5})
+
+        assert store.published('transitions', _position) == ([{'id': 5}], _last + 1)
+
+    def test_leases(self, store):
+        assert store.acquire('election', 'one', 10)
+        assert not store.acquire('election', 'two', 10)
+        assert store.acquire('election', 'one', 10)
+
+        store.release('election', 'two')
+
+        assert not store.acquire('election', 'two', 10)
+
+        store.release('election', 'one')
+
+        assert store.acquire('election', 'two', 10)
+
+    def test_store_from_url(self, tmpdir):
+        assert not store_from_url('memory://').shared
+        assert store_from_url('sqlite:///' + os.path.join(str(tmpdir), 'store.sqlite')).shared
+
+        with pytest.raises(ValueError):
+            store_from_url('redis://localhost')
+
+    def test_archive_is_shared(self, tmpdir):
+        _path = os.path.join(str(tmpdir), 'store.sqlite')
+
+        SQLiteStore(_path).archive().put([{'id': '1', 'stack_specification': 'six', 'ecosystem': 'pypi',
+                                           'spec_hash': 'abc', 'phase': 'failed', 'created': 0, 'finished': 1}])
+
+        assert SQLiteStore(_path).archive().get('1')['phase'] == 'failed'
+
+    def test_waiting_for_a_lock_yields_to_greenlets(self, tmpdir):
+        # gevent patches the whole process, the check runs in one of its own
+        _script = """
+import sqlite3, sys, time
+from gevent import monkey
+monkey.patch_all()
+import gevent
+from thoth_dependency_monkey.store import SQLiteStore
+
+store = SQLiteStore(sys.argv[1])
+other = sqlite3.connect(sys.argv[1], isolation_level=None)
+other.execute('BEGIN IMMEDIATE')
+_adding = gevent.spawn(store.add, 'key', 'value')
+_ticks = []
+for _ in range(10):
+    gevent.sleep(0.02)
+    _ticks.append(time.time())
+other.execute('COMMIT')
+assert len(_ticks) == 10 and not _adding.ready() and _adding.get(timeout=5)
+"""
+
+        assert subprocess.run([sys.executable, '-c', _script, str(tmpdir.join('store.sqlite'))],
+                              cwd=os.path.dirname(os.path.dirname(__file__))).returncode == 0
+
+    def test_leader_election(self, tmpdir):
+        _path = os.path.join(str(tmpdir), 'store.sqlite')
+        _transitions = []
+
+        one = LeaderElector(SQLiteStore(_path), 'test', identity='one', lease_duration=1, renew_interval=0.1,
+                            on_started_leading=lambda: _transitions.append('one started'),
+                            on_stopped_leading=lambda: _transitions.append('one stopped'))
+        two = LeaderElector(SQLiteStore(_path), 'test', identity='two', lease_duration=1, renew_interval=0.1,
+                            on_started_leading=lambda: _transitions.append('two started'))
+
+        one.start()
+        two.start()
+
+        assert one.is_leader()
+        assert not two.is_leader()
+
+        one.stop()
+
+        for _ in range(20):
+            if two.is_leader():
+                break
+
+            time.sleep(0.1)
+
+        assert two.is_leader()
+        assert _transitions == ['one started', 'one stopped', 'two started']
+
+        two.stop()
+
+    def test_replicas_share_deduplication(self, tmpdir, fake_executor):
+        _path = os.path.join(str(tmpdir), 'store.sqlite')
+        executor = fake_executor(findable=False)
+        one = ValidationDAO(executor=executor, store=SQLiteStore(_path))
+        two = ValidationDAO(executor=executor, store=SQLiteStore(_path))
+
+        v = one.create({'stack_specification': 'six', 'ecosystem': 'pypi'})
+
+        assert two.create({'stack_specification': 'six', 'ecosystem': 'pypi'})['id'] == v['id']
+        assert two.create_batch({'stack_specifications': ['six', 'flask'], 'ecosystem': 'pypi'})[0]['id'] == v['id']
+        assert sum(len(ids) for ids, jobs in executor.submitted) == 2
+
+        # a stack whose Validation failed is validated again
+        executor.validations[v['id']]['phase'] = 'failed'
+
+        v = two.create({'stack_specification': 'six', 'ecosystem': 'pypi'})
+
+        assert v['id'] != executor.submitted[0][0][0]
+
+        # a stack whose Validation was deleted is validated again, on any replica
+        one.delete(v['id'])
+
+        assert SQLiteStore(_path).get(DEDUPLICATION_KEY.format(specification_hash('six', 'pypi'))) is None
+        assert two.create({'stack_specification': 'six', 'ecosystem': 'pypi'})['id'] != v['id']
+
+    def test_replicas_share_explorations(self, tmpdir, fake_executor):
+        _path = os.path.join(str(tmpdir), 'store.sqlite')
+        executor = fake_executor(findable=False)
+        one = ValidationDAO(executor=executor, store=SQLiteStore(_path))
+        two = ValidationDAO(executor=executor, store=SQLiteStore(_path))
+
+        exploration = one.create_exploration({'stack_specification': 'six>=1.10', 'ecosystem': 'pypi',
+                                              'versions': {'six': ['1.10.0', '1.11.0']}})
+
+        assert two.get_exploration(exploration['id'])['combinations'] == exploration['combinations']
@@ -0,0 +1,108 @@
+import json
+import types
+
+import pytest
+
+from thoth_dependency_monkey.result import RESULT_TAG
+from thoth_dependency_monkey.work_queue import InProcessWorkQueue, SQLiteWorkQueue
+from thoth_dependency_monkey.worker import ValidatorWorker
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def work_queue(request, tmpdir):
+    if request.param == 'memory':
+        return InProcessWorkQueue()
+
+    return SQLiteWorkQueue(str(tmpdir.join('queue.sqlite')))
+
+
+class WorkQueueTest(object):
+    def test_take_and_complete(self, work_queue):
+        work_queue.put('1', 'pandas', 'pypi', 'abc')
+        work_queue.put('2', 'six', 'pypi', 'def')
+
+        v = work_queue.take('test', timeout=0)
+
+        assert v['id'] == '1'
+        assert work_queue.get('1')['phase'] == 'running'
+
+        work_queue.complete('1', 'succeeded', 'pandas==0.23.3')
+
+        assert work_queue.get('1')['raw_log'] == 'pandas==0.23.3'
+        assert work_queue.take('test', timeout=0)['id'] == '2'
+        assert work_queue.take('test', timeout=0) is None
+        assert [v['id'] for v in work_queue.find('def')] == ['2']
+
+    def test_expired_lease_is_handed_out_again(self, work_queue):
+        work_queue.lease = 0
+        work_queue.put('1', 'pandas', 'pypi', 'abc')
+
+        assert work_queue.take('test', timeout=0)['id'] == '1'
+        assert work_queue.take('test', timeout=0)['id'] == '1'
+
+    def test_worker_posts_results(self, work_queue):
+        validator = types.SimpleNamespace(validate=lambda spec: print(spec.upper()))
+        worker = ValidatorWorker(work_queue, validator, 'test')
+
+        work_queue.put('1', 'six', 'pypi', 'abc')
+
+        assert worker.run_once(timeout=0)
+        assert not worker.run_once(timeout=0)
+        assert work_queue.get('1')['phase'] == 'succeeded'
+        assert work_queue.get('1')['raw_log'] == 'SIX\n'
+
+    def test_worker_forks(self, work_queue):
+        validator = types.SimpleNamespace(validate=None, validate_forked=lambda spec: print('forked ' + spec))
+        worker = ValidatorWorker(work_queue, validator, 'test', fork=True)
+
+        work_queue.put('1', 'six', 'pypi', 'abc')
+
+        assert worker.run_once(timeout=0)
+        assert work_queue.get('1')['raw_log'] == 'forked six\n'
+
+    def test_list(self, work_queue):
+        work_queue.put('1', 'pandas', 'pypi', 'abc')
+        work_queue.put('2', 'six', 'pypi', 'def')
+        work_queue.put('3', 'numpy', 'pypi', 'ghi')
+        work_queue.take('test', timeout=0)
+
+        assert [v['id'] for v in work_queue.list(limit=2)] == ['1', '2']
+        assert [v['id'] for v in work_queue.list(after='2', limit=2)] == ['3']
+        assert [v['id'] for v in work_queue.list(phase='pending')] == ['2', '3']
+        assert work_queue.list(ecosystem='npm') == []
+
+    def test_list_valid(self, work_queue):
+        for id in ('1', '2', '3'):
+            work_queue.put(id, 'six', 'pypi', 'abc')
+            work_queue.take('test', timeout=0)
+
+        work_queue.complete('1', 'succeeded', RESULT_TAG + json.dumps({'valid': False, 'failure': None}))
+        work_queue.complete('2', 'succeeded', RESULT_TAG + json.dumps({'valid': True, 'failure': None}))
+        work_queue.complete('3', 'failed', 'killed')
+
+        # filtered before the page is cut
+        assert [v['id'] for v in work_queue.list(valid=True, limit=1)] == ['2']
+        assert [v['id'] for v in work_queue.list(valid=False)] == ['1']
+        assert work_queue.get('3')['valid'] is None
+
+    def test_delete(self, work_queue):
+        work_queue.put('1', 'pandas', 'pypi', 'abc')
+        work_queue.put('2', 'six', 'pypi', 'def')
+        work_queue.put('3', 'numpy', 'pypi', 'ghi')
+        work_queue.take('test', timeout=0)
+
+        assert work_queue.delete('1')
+        assert work_queue.delete('2')
+        assert not work_queue.delete('1')
+        assert work_queue.get('1') is None
+        assert work_queue.ids() == ['3']
+        assert work_queue.find('abc') == []
+
+        # the running Validation is not handed out again, its result is dropped
+        assert work_queue.take('test', timeout=0)['id'] == '3'
+        assert work_queue.take('test', timeout=0) is None
+
+        work_queue.complete('1', 'succeeded', 'pandas==0.23.3')
+
+        assert work_queue.get('1') is None
+        assert not work_queue.delete('1')
@@ -18,67 +18,245 @@
 
 """Thoth: Dependency Monkey API"""
 
-from werkzeug.exceptions import BadRequest, ServiceUnavailable
-from flask import request
-from flask_restplus import Namespace, Resource, fields
+import json
+import hashlib
+
+from collections import OrderedDict
+
+from werkzeug.exceptions import BadRequest, Conflict, ServiceUnavailable, NotImplemented
+from werkzeug.http import quote_etag
+from flask import request, Response
+from flask_restplus import Namespace, Resource, fields, inputs, marshal
+
+import thoth_dependency_monkey
 
 from thoth_dependency_monkey.validation_dao import ValidationDAO, NotFoundError
 from thoth_dependency_monkey.ecosystem import ECOSYSTEM, EcosystemNotSupportedError
+from thoth_dependency_monkey.specification import SpecificationSyntaxError
+from thoth_dependency_monkey.scheduler import PRIORITIES
+from thoth_dependency_monkey.exploration import STRATEGIES
+from thoth_dependency_monkey.result import FAILURE_SPEC_PARSE_ERROR, FAILURE_DISTRIBUTION_NOT_FOUND, \
+    FAILURE_RESOLUTION_ERROR
 
 
 ns = Namespace('validations', description='Validations')  # pragma: no cover
 
 validation_request = ns.model('ValidationRequest', {
-    'stack_specification': fields.String(required=True, example='pandas\\nnumpy>=1.11.0', description='Specification of the Software Stack'),
-    'ecosystem': fields.String(required=True, default='pypi', description='In which ecosystem is the stack specification to be validated: [pypi]')
+    'stack_specification': fields.String(required=True, example='pandas\\nnumpy>=1.11.0',
+                                         description='Specification of the Software Stack'),
+    'ecosystem': fields.String(required=True, default='pypi',
+                               description='In which ecosystem is the stack specification to be validated: [pypi]'),
+    'priority': fields.String(enum=PRIORITIES, default='interactive',
+                              description='Interactive Validations are scheduled before bulk ones: '
+                                          '[interactive, bulk]'),
+    'callback_url': fields.String(example='https://ci.example.com/hooks/validation',
+                                  description='The Validation is posted to this URL once it finished')
+})  # pragma: no cover
+
+validation_batch_request = ns.model('ValidationBatchRequest', {
+    'stack_specifications': fields.List(fields.String, required=True, example=['pandas\\nnumpy>=1.11.0', 'six'],
+                                        description='Specifications of the Software Stacks'),
+    'ecosystem': fields.String(required=True, default='pypi',
+                               description='In which ecosystem are the stack specifications to be validated: [pypi]'),
+    'priority': fields.String(enum=PRIORITIES, default='bulk',
+                              description='Interactive Validations are scheduled before bulk ones: '
+                                          '[interactive, bulk]'),
+    'callback_url': fields.String(example='https://ci.example.com/hooks/validation',
+                                  description='Each Validation is posted to this URL once it finished')
+})  # pragma: no cover
+
+validation_exploration_request = ns.model('ValidationExplorationRequest', {
+    'stack_specification': fields.String(required=True, example='flask>=0.12\\nrequests>=2.18,<2.20',
+                                         description='Specification of the Software Stack whose versions are explored'),
+    'ecosystem': fields.String(required=True, default='pypi',
+                               description='In which ecosystem are the combinations to be validated: [pypi]'),
+    'strategy': fields.String(enum=STRATEGIES, default='exhaustive',
+                              description='Which combinations of versions are validated: all of them, a random sample '
+                                          'or those of the oldest and newest versions: [exhaustive, random, boundary]'),
+    'max_combinations': fields.Integer(example=100, description='Validate at most this many combinations'),
+    'max_versions': fields.Integer(example=5, description='Explore this many of the newest versions of each package'),
+    'versions': fields.Raw(example={'flask': ['0.12.4', '1.0.2']},
+                           description='Versions to explore by package name, instead of those released on the package '
+                                       'index'),
+    'seed': fields.Integer(example=42,
+                           description='Seed of the random strategy, the same seed draws the same combinations'),
+    'priority': fields.String(enum=PRIORITIES, default='bulk',
+                              description='Interactive Validations are scheduled before bulk ones: [interactive, bulk]')
 })  # pragma: no cover
 
 validation_request_response = ns.model('ValidationRequestResponse', {
-    'id': fields.String(required=True, readOnly=True, example='7b63d226-1d6c-11e8-968f-54ee7504b46f', description='The Validation unique identifier')
+    'id': fields.String(required=True, readOnly=True, example='7b63d226-1d6c-11e8-968f-54ee7504b46f',
+                        description='The Validation unique identifier')
 })  # pragma: no cover
 
 validation = ns.model('Validation', {
-    'id': fields.String(required=True, readOnly=True, example='7b63d226-1d6c-11e8-968f-54ee7504b46f', description='The Validation unique identifier'),
-    'stack_specification': fields.String(required=True, readOnly=True, example='pandas\\nnumpy>=1.11.0', description='Specification of the Software Stack'),
-    'ecosystem': fields.String(required=True, readOnly=True, example='pypi', description='In which ecosystem is the stack specification to be validated: [pypi]'),
-    'phase': fields.String(required=True, readOnly=True, example='succeeded', description='Phase of the Validation job: [pending, running, succeeded, failed]'),
-    'raw_log': fields.String(readOnly=True, description='This is the raw log of the Validation job'),
-    'valid': fields.Boolean(readOnly=True, example='true', description='This indicates that the Validation is valid')
+    'id': fields.String(required=True, readOnly=True, example='7b63d226-1d6c-11e8-968f-54ee7504b46f',
+                        description='The Validation unique identifier'),
+    'stack_specification': fields.String(required=True, readOnly=True, example='pandas\\nnumpy>=1.11.0',
+                                         description='Specification of the Software Stack'),
+    'ecosystem': fields.String(required=True, readOnly=True, example='pypi',
+                               description='In which ecosystem is the stack specification to be validated: [pypi]'),
+    'phase': fields.String(required=True, readOnly=True, example='succeeded',
+                           description='Phase of the Validation job: [pending, running, succeeded, failed]'),
+    'queue_position': fields.Integer(readOnly=True, example=3,
+                                     description='Position of a pending Validation in the queue of Validations waiting '
+                                                 'for their job to be created, 1 is next'),
+    'raw_log': fields.String(readOnly=True,
+                             description='This is the raw log of the Validation job, only included if asked for by '
+                                         '?raw_log=true or ?fields=raw_log, see also /validations/{id}/raw_log'),
+    'valid': fields.Boolean(readOnly=True, example='true', description='This indicates that the Validation is valid'),
+    'failure': fields.String(readOnly=True, example='distribution_not_found',
+                             description='Why the Validation is not valid: [spec_parse_error, distribution_not_found, '
+                                         'resolution_error]'),
+    'pins': fields.Raw(readOnly=True, example={'pandas': '0.22.0', 'numpy': '1.14.2'},
+                       description='The versions the Software Stack resolved to, by package name'),
+    'timings': fields.Raw(readOnly=True, example={'resolve': 12.5, 'total': 12.7},
+                          description='How long the validator took, in seconds')
+})  # pragma: no cover
+
+exploration_combination = ns.model('ExplorationCombination', {
+    'id': fields.String(required=True, readOnly=True, example='7b63d226-1d6c-11e8-968f-54ee7504b46f',
+                        description='The identifier of the Validation of this combination'),
+    'pins': fields.Raw(required=True, readOnly=True, example={'flask': '1.0.2', 'requests': '2.19.1'},
+                       description='The versions of this combination, by package name'),
+    'pruned': fields.Boolean(readOnly=True, example='false',
+                             description='This combination was found to be invalid before and is not validated again'),
+    'phase': fields.String(readOnly=True, example='succeeded',
+                           description='Phase of the Validation: [pending, running, succeeded, failed, unknown]'),
+    'valid': fields.Boolean(readOnly=True, example='true', description='This indicates that the combination is valid'),
+    'failure': fields.String(readOnly=True, example='resolution_error',
+                             description='Why the combination is not valid: [spec_parse_error, distribution_not_found, '
+                                         'resolution_error]')
+})  # pragma: no cover
+
+exploration = ns.model('Exploration', {
+    'id': fields.String(required=True, readOnly=True, example='1e0b4a8c-3c1e-4b6f-a2f8-9d1f0c6b1a2e',
+                        description='The Exploration unique identifier'),
+    'stack_specification': fields.String(required=True, readOnly=True, example='flask>=0.12\\nrequests>=2.18,<2.20',
+                                         description='Specification of the Software Stack whose versions are explored'),
+    'ecosystem': fields.String(required=True, readOnly=True, example='pypi',
+                               description='In which ecosystem are the combinations validated: [pypi]'),
+    'strategy': fields.String(required=True, readOnly=True, example='exhaustive',
+                              description='Which combinations of versions are validated: [exhaustive, random, '
+                                          'boundary]'),
+    'total': fields.Integer(readOnly=True, example=10, description='How many combinations the strategy chose from'),
+    'finished': fields.Boolean(readOnly=True, example='false',
+                               description='This indicates that the Validations of all combinations finished'),
+    'combinations': fields.List(fields.Nested(exploration_combination), readOnly=True,
+                                description='The combinations chosen'),
+    'versions': fields.Raw(readOnly=True, example={'flask': {'1.0.2': {'valid': 2, 'invalid': 0}}},
+                           description='By package name and version, how many of the validated combinations it was '
+                                       'part of were valid and invalid')
 })  # pragma: no cover
 
 validationListItem = ns.model('ValidationListItem', {
-    'id': fields.String(required=True, readOnly=True, example='7b63d226-1d6c-11e8-968f-54ee7504b46f', description='The Validation unique identifier'),
+    'id': fields.String(required=True, readOnly=True, example='7b63d226-1d6c-11e8-968f-54ee7504b46f',
+                        description='The Validation unique identifier'),
 })
 
 PHASE = ['pending', 'running', 'succeeded', 'failed', 'unknown']
 VALIDITY = ['valid', 'invalid']
-FAILURE_REASON = ['spec_parse_error']
+FAILURE_REASON = [FAILURE_SPEC_PARSE_ERROR, FAILURE_DISTRIBUTION_NOT_FOUND, FAILURE_RESOLUTION_ERROR]
+
+validation_list_parser = ns.parser()  # pragma: no cover
+validation_list_parser.add_argument('limit', type=inputs.positive, location='args',
+                                    help='Return at most the Validations of this many Validation jobs')
+validation_list_parser.add_argument('continue', location='args',
+                                    help='Return the next page, the token is taken from the X-Continue header')
+validation_list_parser.add_argument('phase', choices=PHASE, location='args', help='Only Validations in this phase')
+validation_list_parser.add_argument('validity', choices=VALIDITY, location='args',
+                                    help='Only valid or invalid Validations')
+validation_list_parser.add_argument('ecosystem', choices=ECOSYSTEM, location='args',
+                                    help='Only Validations within this ecosystem')
+validation_list_parser.add_argument('created_after', type=inputs.datetime_from_iso8601, location='args',
+                                    help='Only Validations created at or after this time (ISO 8601)')
+validation_list_parser.add_argument('created_before', type=inputs.datetime_from_iso8601, location='args',
+                                    help='Only Validations created before this time (ISO 8601)')
 
 DAO = ValidationDAO()
 
 
+def _client():
+    """Identify the client of a request, Validations of different clients take turns to be scheduled."""
+    return request.headers.get('X-Client-Id') or request.access_route[0]
+
+
+def _create(create):
+    """Have `create`, a method of the DAO, create what the JSON body of the request asks for. Anything else raised,
+    such as QueueFullError with its Retry-After header, is answered by flask-restplus."""
+    try:
+        return create(request.get_json(), client=_client()), 201
+    except EcosystemNotSupportedError as err:
+        ns.abort(400, str(err))
+    except SpecificationSyntaxError as e:
+        ns.abort(400, e.description, errors=e.errors)
+    except BadRequest as e:
+        ns.abort(400, e.description)
+    except ServiceUnavailable as e:
+        ns.abort(503, str(e))
+
+
 @ns.route('/<string:id>')
 @ns.response(404, 'Validation not found')
 @ns.param('id', 'The Validation identifier')
 class Validation(Resource):
     """Show or delete a single Validation"""
-    @ns.doc('get_validation')
-    # FIXME we should , skip_none=True once it is release
-    @ns.marshal_with(validation)
+    @ns.doc('get_validation', params={'fields': 'Only these fields, separated by commas (default: all but raw_log)',
+                                      'raw_log': 'Include the raw log of the validator: true or false (default)',
+                                      'wait': 'Wait up to this many seconds for the Validation to finish first'})
+    @ns.response(200, 'Success', validation)
+    @ns.response(304, 'Validation not modified since the ETag given by If-None-Match')
+    @ns.response(400, 'Invalid fields or wait')
     def get(self, id):
-        """Show a specific Validation"""
+        """Show a specific Validation, its ETag changes whenever it does"""
 
         v = None
+        _raw_log = request.args.get('raw_log', 'false').lower() in ('true', 'yes', '1')
 
         try:
-            v = DAO.get(id)
+            _wait = inputs.natural(request.args.get('wait', '0'))
+        except ValueError:
+            ns.abort(400, 'wait must be a number of seconds')
+
+        if 'fields' in request.args:
+            _fields = [field.strip() for field in request.args['fields'].split(',') if field.strip()]
+            _unknown = sorted(set(_fields) - set(validation))
+
+            if _unknown:
+                ns.abort(400, 'unknown fields: {}'.format(', '.join(_unknown)))
+        else:
+            _fields = [field for field in validation if field != 'raw_log' or _raw_log]
+
+        # told by the executor without asking Kubernetes, so If-None-Match is answered before the Validation is read;
+        # the log of a running Validation grows without its version changing
+        _version = None if _wait or 'raw_log' in _fields else DAO.version(id)
+
+        if _version is not None:
+            _etag = _etag_of(id, _version, _fields)
+
+            if request.if_none_match.contains_weak(_etag):
+                return Response(status=304, headers={'ETag': quote_etag(_etag, weak=True)})
+
+        try:
+            v = DAO.get(id, raw_log='raw_log' in _fields, wait=_wait)
         except NotFoundError as err:
             ns.abort(404, "Validation {} doesn't exist".format(id))
 
-        return v
+        # FIXME we should , skip_none=True once it is release
+        _representation = OrderedDict((field, value) for field, value in marshal(v, validation).items()
+                                      if field in _fields)
+
+        if _version is None:
+            _etag = _etag_of(id, json.dumps(_representation, sort_keys=True), _fields)
+
+            if request.if_none_match.contains_weak(_etag):
+                return Response(status=304, headers={'ETag': quote_etag(_etag, weak=True)})
+
+        return _representation, 200, {'ETag': quote_etag(_etag, weak=True)}
 
     @ns.doc('delete_validation')
     @ns.response(204, 'Validation deleted')
+    @ns.response(409, 'Validation is carried out together with others by a batch job')
     def delete(self, id):
         """Delete a Validation given its identifier"""
 
@@ -86,44 +264,179 @@ class Validation(Resource):
             v = DAO.delete(id)
         except NotFoundError as err:
             ns.abort(404, "Validation {} doesn't exist".format(id))
+        except Conflict as e:
+            ns.abort(409, e.description)
+        except ServiceUnavailable as e:
+            ns.abort(503, str(e))
 
         return '', 204
 
 
+@ns.route('/<string:id>/raw_log')
+@ns.response(404, 'Validation not found')
+@ns.param('id', 'The Validation identifier')
+class ValidationRawLog(Resource):
+    """Download the raw log of a Validation"""
+    @ns.doc('get_validation_raw_log')
+    @ns.response(200, 'The raw log of the validator, as plain text')
+    @ns.response(206, 'The part of the raw log asked for by the Range header')
+    @ns.response(304, 'Raw log not modified since the ETag given by If-None-Match')
+    @ns.response(416, 'Range not satisfiable')
+    def get(self, id):
+        """Show the raw log of the validator of a Validation, supports Range requests to fetch only what was added"""
+
+        try:
+            _log = DAO.get_raw_log(id).encode('utf-8')
+        except NotFoundError as err:
+            ns.abort(404, "Validation {} doesn't exist".format(id))
+
+        _response = Response(_log, mimetype='text/plain')
+        _response.add_etag()
+
+        return _response.make_conditional(request, accept_ranges=True, complete_length=len(_log))
+
+
+def _etag_of(id, version, fields):
+    """The ETag of a representation of a Validation, from what it depends on."""
+    _key = json.dumps([thoth_dependency_monkey.__version__, id, version, sorted(fields)])
+
+    return hashlib.sha1(_key.encode('utf-8')).hexdigest()
+
+
+def _server_sent_events(events):
+    for event in events:
+        if event is None:
+            # keeps proxies from closing the connection
+            yield ': keepalive\n\n'
+        else:
+            yield 'event: phase\ndata: {}\n\n'.format(json.dumps(event, sort_keys=True))
+
+
+@ns.route('/events')
+class ValidationEvents(Resource):
+    """Stream phase transitions of Validations"""
+    @ns.doc('stream_validation_events',
+            params={'id': 'Only transitions of the Validations with these ids, may be given more than once'})
+    @ns.response(404, 'Validation not found')
+    @ns.response(501, 'Transitions of all Validations are not told in this execution mode')
+    def get(self):
+        """Stream phase transitions as server-sent events, the current phase of the given Validations comes first"""
+
+        _ids = request.args.getlist('id') or None
+
+        try:
+            _events = DAO.events(_ids)
+        except NotFoundError as e:
+            ns.abort(404, "Validation {} doesn't exist".format(e.id))
+        except NotImplemented as e:
+            ns.abort(501, e.description)
+
+        return Response(_server_sent_events(_events), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
 @ns.route('/')
 class ValidationList(Resource):
     """Request a new Validation"""
     @ns.doc('list_validations')
+    @ns.expect(validation_list_parser)
     @ns.marshal_list_with(validationListItem)
     @ns.response(503, 'Service we depend on is not available')
+    @ns.response(400, 'Invalid filter or continue token')
     def get(self):
-        """List all Validations"""
+        """List all Validations, if there are more than asked for by limit the X-Continue header is set"""
 
-        all_validations = DAO.get_all()
+        args = validation_list_parser.parse_args()
+        _valid = None if args['validity'] is None else args['validity'] == 'valid'
+
+        try:
+            all_validations, _continue = DAO.get_all(
+                limit=args['limit'], continue_token=args['continue'], phase=args['phase'], valid=_valid,
+                ecosystem=args['ecosystem'], created_after=args['created_after'], created_before=args['created_before'])
+        except BadRequest as e:
+            ns.abort(400, e.description)
 
         if all_validations == None:
             return []
 
+        if _continue is not None:
+            return all_validations, 200, {'X-Continue': _continue}
+
         return all_validations
 
     @ns.doc('request_validation')
     @ns.marshal_with(validation, code=201)
     @ns.expect(validation_request)
     @ns.response(503, 'Service we depend on is not available')
-    @ns.response(400, 'Ecosystem not supported')
+    @ns.response(400, 'Ecosystem not supported or stack specification malformed')
+    @ns.response(429, 'Too many Validations are waiting to be scheduled, see the Retry-After header')
     @ns.response(201, 'Validation request accepted')
     def post(self):
         """Request a new Validation"""
 
+        return _create(DAO.create)
+
+
+@ns.route('/batch')
+class ValidationBatch(Resource):
+    """Request a batch of new Validations"""
+    @ns.doc('request_validation_batch')
+    @ns.marshal_list_with(validation_request_response, code=201)
+    @ns.expect(validation_batch_request)
+    @ns.response(503, 'Service we depend on is not available')
+    @ns.response(400, 'Ecosystem not supported')
+    @ns.response(429, 'Too many Validations are waiting to be scheduled, see the Retry-After header')
+    @ns.response(201, 'Validation requests accepted')
+    def post(self):
+        """Request a new Validation for each of the stack specifications, the ids are returned in the same order"""
+
+        return _create(DAO.create_batch)
+
+
+@ns.route('/explorations')
+class ValidationExplorationList(Resource):
+    """Explore the combinations of versions of a Software Stack"""
+    @ns.doc('request_validation_exploration')
+    @ns.marshal_with(exploration, code=201)
+    @ns.expect(validation_exploration_request)
+    @ns.response(503, 'Service we depend on is not available')
+    @ns.response(400, 'Ecosystem not supported, stack specification malformed or too many combinations')
+    @ns.response(429, 'Too many Validations are waiting to be scheduled, see the Retry-After header')
+    @ns.response(201, 'Exploration accepted')
+    def post(self):
+        """Request a Validation for each combination of versions of the packages of a stack specification"""
+
+        return _create(DAO.create_exploration)
+
+
+@ns.route('/explorations/<string:id>')
+@ns.response(404, 'Exploration not found')
+@ns.param('id', 'The Exploration identifier')
+class ValidationExploration(Resource):
+    """Show an Exploration"""
+    @ns.doc('get_validation_exploration')
+    @ns.marshal_with(exploration)
+    def get(self, id):
+        """Show the combinations of an Exploration, and which versions they were valid with"""
+
         try:
-            # TODO check if we need to better safe guard this
-            v = DAO.create(request.get_json())
-        except EcosystemNotSupportedError as err:
-            ns.abort(400, str(err))
-        except ServiceUnavailable as e:
-            ns.abort(503, str(e))
-        except Exception as e:
-            ns.abort(500, str(e))
-            raise e
+            return DAO.get_exploration(id)
+        except NotFoundError:
+            ns.abort(404, "Exploration {} doesn't exist".format(id))
+
+
+@ns.route('/explorations/<string:id>/results')
+@ns.response(404, 'Exploration not found')
+@ns.param('id', 'The Exploration identifier')
+class ValidationExplorationResults(Resource):
+    """Stream the results of an Exploration"""
+    @ns.doc('stream_validation_exploration_results')
+    def get(self, id):
+        """Stream the combinations of an Exploration as newline delimited JSON, each one once it was validated"""
+
+        try:
+            _results = DAO.get_exploration_results(id)
+        except NotFoundError:
+            ns.abort(404, "Exploration {} doesn't exist".format(id))
 
-        return v, 201
+        return Response((json.dumps(c, sort_keys=True) + '\n' for c in _results), mimetype='application/x-ndjson')
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#   thoth-dependency-monkey
+#   Copyright(C) 2018 Christoph Görn
+#
+#   This program is free software: you can redistribute it and / or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Thoth: Dependency Monkey API"""
+
+import os
+import gzip
+import json
+import sqlite3
+import threading
+
+from .cooperative import blocking
+
+
+ARCHIVE_PATH = os.getenv('THOTH_DEPENDENCY_MONKEY_ARCHIVE', '/tmp/thoth-dependency-monkey-archive.sqlite')
+
+
+class Archive():
+    """Finished Validations, with their result record and compressed log, kept in an SQLite database.
+
+    A Validation is a dict with id, stack_specification, ecosystem, spec_hash, phase, result (the result
+    record, None if there is none), log, created and finished (seconds since the epoch) and job. A Validation
+    is recorded once it finished, its job is the name of the Job that carried it out while that still exists
+    (and keeps the log), None once the Validation is archived.
+    """
+
+    COLUMNS = ['id', 'stack_specification', 'ecosystem', 'spec_hash', 'phase', 'valid', 'result',
+               'created', 'finished', 'job']
+
+    def __init__(self, path=ARCHIVE_PATH, journal_mode='WAL'):
+        self.path = path
+        self.journal_mode = journal_mode
+
+        self._local = threading.local()
+
+        with self._connection() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS validations ('
+                       'id TEXT PRIMARY KEY, stack_specification TEXT, ecosystem TEXT, spec_hash TEXT, '
+                       'phase TEXT, valid INTEGER, result TEXT, log BLOB, created REAL, finished REAL, job TEXT)')
+            db.execute('CREATE INDEX IF NOT EXISTS validations_spec_hash ON validations (spec_hash)')
+
+    def _connection(self):
+        # sqlite3 connections must not be shared between threads
+        db = getattr(self._local, 'db', None)
+
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute('PRAGMA journal_mode={}'.format(self.journal_mode))
+            # a Validation recorded right before a power loss is recorded again, no need to sync every write
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+
+        return db
+
+    def _row(self, row):
+        if row is None:
+            return None
+
+        v = dict(zip(self.COLUMNS, row))
+        v['result'] = json.loads(v['result']) if v['result'] is not None else None
+        del v['valid']
+
+        return v
+
+    @blocking
+    def put(self, validations):
+        """Record Validations, all of them or none."""
+        db = self._connection()
+
+        db.execute('BEGIN IMMEDIATE')
+
+        try:
+            for v in validations:
+                _result = v.get('result')
+
+                db.execute(
+                    'INSERT OR REPLACE INTO validations (id, stack_specification, ecosystem, spec_hash, phase, valid, '
+                    'result, log, created, finished, job) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (v['id'], v['stack_specification'], v['ecosystem'], v['spec_hash'], v['phase'],
+                     None if _result is None else int(_result['valid']),
+                     None if _result is None else json.dumps(_result, sort_keys=True),
+                     None if v.get('log') is None else gzip.compress(v['log'].encode()),
+                     v['created'], v['finished'], v.get('job')))
+
+            db.execute('COMMIT')
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+
+    @blocking
+    def get(self, id):
+        return self._row(self._connection().execute(
+            'SELECT {} FROM validations WHERE id = ?'.format(', '.join(self.COLUMNS)), (id,)).fetchone())
+
+    @blocking
+    def log(self, id):
+        row = self._connection().execute('SELECT log FROM validations WHERE id = ?', (id,)).fetchone()
+
+        if row is None or row[0] is None:
+            return None
+
+        return gzip.decompress(row[0]).decode()
+
+    @blocking
+    def ids(self, archived=False):
+        _query = 'SELECT id FROM validations{} ORDER BY id'.format(' WHERE job IS NULL' if archived else '')
+
+        return [row[0] for row in self._connection().execute(_query)]
+
+    @blocking
+    def list(self, after=None, limit=None, phase=None, valid=None, ecosystem=None, created_after=None,
+             created_before=None, archived=False):
+        """List Validations, only the ones whose Job is gone if `archived`."""
+        _where, _params = (['job IS NULL'] if archived else []), []
+
+        for clause, value in (('id > ?', after), ('phase = ?', phase), ('ecosystem = ?', ecosystem),
+                              ('valid = ?', None if valid is None else int(valid)),
+                              ('created >= ?', created_after), ('created < ?', created_before)):
+            if value is not None:
+                _where.append(clause)
+                _params.append(value)
+
+        _query = 'SELECT {} FROM validations'.format(', '.join(self.COLUMNS))
+
+        if _where:
+            _query += ' WHERE ' + ' AND '.join(_where)
+
+        _query += ' ORDER BY id'
+
+        if limit is not None:
+            _query += ' LIMIT ?'
+            _params.append(limit)
+
+        return [self._row(row) for row in self._connection().execute(_query, _params)]
+
+    @blocking
+    def find(self, spec_hash):
+        return [self._row(row) for row in self._connection().execute(
+            'SELECT {} FROM validations WHERE spec_hash = ?'.format(', '.join(self.COLUMNS)), (spec_hash,))]
+
+    @blocking
+    def delete(self, id):
+        return self._connection().execute('DELETE FROM validations WHERE id = ?', (id,)).rowcount > 0
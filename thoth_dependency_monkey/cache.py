@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#   thoth-dependency-monkey
+#   Copyright(C) 2018 Christoph Görn
+#
+#   This program is free software: you can redistribute it and / or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Thoth: Dependency Monkey API"""
+
+import threading
+
+from collections import OrderedDict
+
+
+class LRUCache():
+    """A thread-safe least recently used cache, bounded by the total size of its values.
+
+    The size of a value is determined by `size_func`, by default its length. A value
+    larger than `max_size` is not cached at all.
+    """
+
+    def __init__(self, max_size, size_func=len):
+        self.max_size = max_size
+        self.size = 0
+
+        self._size_func = size_func
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._items.move_to_end(key)
+            except KeyError:
+                return default
+
+            return self._items[key][0]
+
+    def put(self, key, value):
+        value_size = self._size_func(value)
+
+        with self._lock:
+            self._pop(key)
+
+            if value_size > self.max_size:
+                return
+
+            self._items[key] = (value, value_size)
+            self.size += value_size
+
+            while self.size > self.max_size:
+                _, (_, evicted_size) = self._items.popitem(last=False)
+                self.size -= evicted_size
+
+    def pop(self, key):
+        with self._lock:
+            return self._pop(key)
+
+    def _pop(self, key):
+        item = self._items.pop(key, None)
+
+        if item is None:
+            return None
+
+        self.size -= item[1]
+
+        return item[0]
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#   thoth-dependency-monkey
+#   Copyright(C) 2018 Christoph Görn
+#
+#   This program is free software: you can redistribute it and / or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Thoth: Dependency Monkey API"""
+
+import os
+import gzip
+
+
+# responses smaller than this many bytes are not worth compressing
+GZIP_MIN_SIZE = int(os.getenv('THOTH_DEPENDENCY_MONKEY_GZIP_MIN_SIZE', 1024))
+GZIP_LEVEL = int(os.getenv('THOTH_DEPENDENCY_MONKEY_GZIP_LEVEL', 6))
+
+
+def gzip_response(request, response, min_size=GZIP_MIN_SIZE, level=GZIP_LEVEL):
+    """Compress the body of a response with gzip if the client accepts it and it is large enough.
+
+    Streamed responses, such as server-sent events, partial and conditional responses are left alone.
+    """
+    if response.direct_passthrough or response.is_streamed or response.status_code != 200 or \
+            'Content-Encoding' in response.headers:
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    if not request.accept_encodings['gzip'] or response.content_length is None or \
+            response.content_length < min_size:
+        return response
+
+    response.set_data(gzip.compress(response.get_data(), compresslevel=level))
+    response.headers['Content-Encoding'] = 'gzip'
+    # ranges are of the uncompressed body, and the compressed one is not the same byte for byte
+    response.headers.pop('Accept-Ranges', None)
+    _etag, _weak = response.get_etag()
+
+    if _etag is not None and not _weak:
+        response.set_etag(_etag, weak=True)
+
+    return response
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#   thoth-dependency-monkey
+#   Copyright(C) 2018 Christoph Görn
+#
+#   This program is free software: you can redistribute it and / or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Thoth: Dependency Monkey API"""
+
+import functools
+
+from gevent import get_hub, monkey
+
+
+# set within the threads of gevent's threadpool
+_worker = monkey.get_original('threading', 'local')()
+
+
+def blocking(func):
+    """Run `func` within gevent's threadpool once gevent patched threads, as serve.py does.
+
+    sqlite3 waits for a lock of the database without yielding to other greenlets, a call waiting for another
+    replica would stall every request of the process. Calls are made as they are if threads are not patched.
+    """
+    @functools.wraps(func)
+    def _blocking(*args, **kwargs):
+        if not monkey.is_module_patched('threading') or getattr(_worker, 'active', False):
+            return func(*args, **kwargs)
+
+        return get_hub().threadpool.apply(_call, (func, args, kwargs))
+
+    return _blocking
+
+
+def _call(func, args, kwargs):
+    _worker.active = True
+
+    return func(*args, **kwargs)
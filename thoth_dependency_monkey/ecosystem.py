@@ -18,6 +18,36 @@
 
 """Thoth: Dependency Monkey API"""  # pragma: no cover
 
+import os
+import math
+import threading
+
+from collections import deque
+
+from .cache import LRUCache
+
+
+# how many of the latest Validations of stacks of about the same size make up a profile, and how many it takes
+# before Validation jobs are given what the profile tells instead of the defaults below
+RESOURCE_PROFILE_SIZE = int(os.getenv('THOTH_DEPENDENCY_MONKEY_RESOURCE_PROFILE_SIZE', 1000))
+RESOURCE_PROFILE_MIN_SIZE = int(os.getenv('THOTH_DEPENDENCY_MONKEY_RESOURCE_PROFILE_MIN_SIZE', 20))
+RESOURCE_PROFILE_STACKS = int(os.getenv('THOTH_DEPENDENCY_MONKEY_RESOURCE_PROFILE_STACKS', 100000))
+# requests are the request percentile of the profile, limits and the deadline the limit percentile with headroom
+RESOURCE_REQUEST_PERCENTILE = int(os.getenv('THOTH_DEPENDENCY_MONKEY_RESOURCE_REQUEST_PERCENTILE', 90))
+RESOURCE_LIMIT_PERCENTILE = int(os.getenv('THOTH_DEPENDENCY_MONKEY_RESOURCE_LIMIT_PERCENTILE', 99))
+RESOURCE_HEADROOM = float(os.getenv('THOTH_DEPENDENCY_MONKEY_RESOURCE_HEADROOM', 1.5))
+
+# what a validator is given per stack until there is a profile: memory in bytes, CPU in cores, deadline in seconds
+VALIDATOR_MEMORY_REQUEST = int(os.getenv('THOTH_DEPENDENCY_MONKEY_VALIDATOR_MEMORY_REQUEST', 256 * 1024 ** 2))
+VALIDATOR_MEMORY_LIMIT = int(os.getenv('THOTH_DEPENDENCY_MONKEY_VALIDATOR_MEMORY_LIMIT', 2 * 1024 ** 3))
+VALIDATOR_CPU_REQUEST = float(os.getenv('THOTH_DEPENDENCY_MONKEY_VALIDATOR_CPU_REQUEST', 0.25))
+VALIDATOR_CPU_LIMIT = float(os.getenv('THOTH_DEPENDENCY_MONKEY_VALIDATOR_CPU_LIMIT', 2))
+VALIDATOR_DEADLINE = int(os.getenv('THOTH_DEPENDENCY_MONKEY_VALIDATOR_DEADLINE', 3600))
+# whatever the profile tells, a validator gets at least this much
+VALIDATOR_MIN_MEMORY = 64 * 1024 ** 2
+VALIDATOR_MIN_CPU = 0.05
+VALIDATOR_MIN_DEADLINE = int(os.getenv('THOTH_DEPENDENCY_MONKEY_VALIDATOR_MIN_DEADLINE', 300))
+
 
 class EcosystemNotSupportedError(Exception):
     """Exception raised if a Ecosystem is not supported.
@@ -34,4 +64,90 @@ class EcosystemNotSupportedError(Exception):
         return self.message
 
 
-ECOSYSTEM = ['pypi']  # pragma: no cover
+def _percentile(values, percentile):
+    _sorted = sorted(values)
+
+    return _sorted[min(len(_sorted) - 1, int(len(_sorted) * percentile / 100))]
+
+
+class Validator():
+    """The validator of an ecosystem: the image its Validation jobs run, and a profile of what its Validations took.
+
+    Each finished Validation is recorded with the size of its stack specification (its number of requirements), its
+    runtime, peak memory and CPU usage. A Validation job is given what Validations of stacks of about the same size
+    (within a power of two) took: its requests are the RESOURCE_REQUEST_PERCENTILE of them, its limits and deadline
+    the RESOURCE_LIMIT_PERCENTILE with RESOURCE_HEADROOM. A stack validated before is given what it took the last
+    time, with headroom. As long as there are fewer than RESOURCE_PROFILE_MIN_SIZE Validations of a size, the
+    defaults apply.
+    """
+
+    def __init__(self, image):
+        self.image = image
+
+        self._lock = threading.Lock()
+        # (runtime, memory, cores) of the latest Validations, by size class
+        self._profiles = {}
+        # (runtime, memory, cores) of the latest Validation, by spec hash
+        self._stacks = LRUCache(RESOURCE_PROFILE_STACKS, size_func=lambda usage: 1)
+
+    def record(self, size, spec_hash, runtime, memory, cpu):
+        """Record a Validation of a stack with `size` requirements that took `runtime` seconds, `memory` bytes at
+        its peak and `cpu` seconds of CPU time."""
+        _usage = (runtime, memory, cpu / runtime if runtime > 0 else 0)
+
+        with self._lock:
+            self._profiles.setdefault(size.bit_length(), deque(maxlen=RESOURCE_PROFILE_SIZE)).append(_usage)
+
+        self._stacks.put(spec_hash, _usage)
+
+    def _estimate(self, size, spec_hash):
+        """Return the (runtime, memory, cores) to request and to limit a Validation to, None if not known."""
+        _known = self._stacks.get(spec_hash)
+
+        if _known is not None:
+            return _known, _known
+
+        with self._lock:
+            _profile = list(self._profiles.get(size.bit_length(), ()))
+
+        if len(_profile) < RESOURCE_PROFILE_MIN_SIZE:
+            return None
+
+        _columns = list(zip(*_profile))
+
+        return (tuple(_percentile(column, RESOURCE_REQUEST_PERCENTILE) for column in _columns),
+                tuple(_percentile(column, RESOURCE_LIMIT_PERCENTILE) for column in _columns))
+
+    def resources(self, stacks):
+        """Return the resources (as of a container of a Kubernetes Pod) and the deadline in seconds of a Validation
+        job validating `stacks`, (size, spec hash) tuples, one after another."""
+        _estimates = [self._estimate(size, spec_hash) for size, spec_hash in stacks]
+
+        if not _estimates or None in _estimates:
+            _memory = (VALIDATOR_MEMORY_REQUEST, VALIDATOR_MEMORY_LIMIT)
+            _cpu = (VALIDATOR_CPU_REQUEST, VALIDATOR_CPU_LIMIT)
+            _deadline = VALIDATOR_DEADLINE * max(1, len(stacks))
+        else:
+            # the stacks are validated one after another: their runtimes add up, their memory does not
+            _memory = (max(request[1] for request, _ in _estimates),
+                       max(limit[1] for _, limit in _estimates) * RESOURCE_HEADROOM)
+            _cpu = (max(request[2] for request, _ in _estimates),
+                    max(limit[2] for _, limit in _estimates) * RESOURCE_HEADROOM)
+            _deadline = sum(limit[0] for _, limit in _estimates) * RESOURCE_HEADROOM
+
+        _memory_request = max(VALIDATOR_MIN_MEMORY, int(_memory[0]))
+        _cpu_request = max(VALIDATOR_MIN_CPU, _cpu[0])
+
+        return {
+            'requests': {'memory': str(_memory_request), 'cpu': '{}m'.format(math.ceil(_cpu_request * 1000))},
+            'limits': {'memory': str(max(_memory_request, int(_memory[1]))),
+                       'cpu': '{}m'.format(math.ceil(max(_cpu_request, _cpu[1]) * 1000))}
+        }, max(VALIDATOR_MIN_DEADLINE, math.ceil(_deadline))
+
+
+# the validator of each supported ecosystem
+VALIDATORS = {
+    'pypi': Validator(os.getenv('THOTH_DEPENDENCY_MONKEY_PYPI_VALIDATOR_IMAGE', 'pypi-validator'))
+}  # pragma: no cover
+
+ECOSYSTEM = sorted(VALIDATORS)  # pragma: no cover
@@ -0,0 +1,339 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#   thoth-dependency-monkey
+#   Copyright(C) 2018 Christoph Görn
+#
+#   This program is free software: you can redistribute it and / or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Thoth: Dependency Monkey API"""
+
+import io
+import os
+import math
+import time
+import signal
+import logging
+import threading
+
+from functools import partial
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.exceptions import ServiceUnavailable
+
+from .worker import VALIDATOR, load_validator
+from .result import parse_result
+from .metrics import observe_validation, VALIDATIONS
+
+
+LOCAL_WORKERS = int(os.getenv('THOTH_DEPENDENCY_MONKEY_LOCAL_WORKERS', os.cpu_count() or 1))
+LOCAL_MAX_PENDING = int(os.getenv('THOTH_DEPENDENCY_MONKEY_LOCAL_MAX_PENDING', 1000))
+LOCAL_TIMEOUT = int(os.getenv('THOTH_DEPENDENCY_MONKEY_LOCAL_TIMEOUT', 600))
+LOCAL_RETENTION = int(os.getenv('THOTH_DEPENDENCY_MONKEY_LOCAL_RETENTION', 24 * 3600))
+
+logger = logging.getLogger(__file__)
+
+
+class Executor():
+    """Carries out Validations on behalf of the ValidationDAO.
+
+    A Validation is submitted as a dict with id, stack_specification, ecosystem and spec_hash.
+    """
+
+    def submit(self, validations, jobs=None):
+        """Carry out Validations, executors that pack Validations together may be asked to use `jobs` units of
+        work for them."""
+        raise NotImplementedError()
+
+    def get(self, id):
+        """Return a dict with stack_specification, ecosystem, phase and, once succeeded, the result record
+        (see result.py) as result. None if unknown."""
+        raise NotImplementedError()
+
+    def log(self, id):
+        """Return the output of the validator, None if there is none (yet)."""
+        raise NotImplementedError()
+
+    def ids(self):
+        raise NotImplementedError()
+
+    def list(self, limit=None, continue_token=None, phase=None, valid=None, ecosystem=None,
+             created_after=None, created_before=None):
+        """Return a page of Validations matching all given filters as dicts with an id, and the continue token
+        of the next page (None if this is the last one). Creation times are seconds since the epoch."""
+        raise NotImplementedError()
+
+    def find(self, spec_hash):
+        """Return dicts with id, phase, created and finished (seconds since the epoch, or None) of all
+        Validations of stacks with the given spec hash."""
+        raise NotImplementedError()
+
+    def delete(self, id):
+        raise NotImplementedError()
+
+    def version(self, id):
+        """Return a string that changes whenever the Validation, apart from its log, changes. None if this cannot be
+        told without reading the Validation."""
+        return None
+
+    def add_listener(self, listener):
+        """Have `listener` called with the id and the new phase of each Validation changing its phase, return
+        False if this executor cannot tell when that happens."""
+        return False
+
+
+class WorkQueueExecutor(Executor):
+    """Puts Validations onto a WorkQueue, they are carried out by a pool of validator workers."""
+
+    def __init__(self, queue):
+        self._queue = queue
+
+    def submit(self, validations, jobs=None):
+        for v in validations:
+            self._queue.put(v['id'], v['stack_specification'], v['ecosystem'], v['spec_hash'])
+
+    def get(self, id):
+        _queued = self._queue.get(id)
+
+        if _queued is None:
+            return None
+
+        v = {
+            'stack_specification': _queued['stack_specification'],
+            'ecosystem': _queued['ecosystem'],
+            'phase': _queued['phase']
+        }
+
+        if v['phase'] == 'succeeded' and _queued['raw_log'] is not None:
+            v['result'] = parse_result(_queued['raw_log'])
+
+        return v
+
+    def log(self, id):
+        _queued = self._queue.get(id)
+
+        return None if _queued is None else _queued['raw_log']
+
+    def ids(self):
+        return self._queue.ids()
+
+    def list(self, limit=None, continue_token=None, phase=None, valid=None, ecosystem=None,
+             created_after=None, created_before=None):
+        _queued = self._queue.list(after=continue_token, limit=limit, phase=phase, valid=valid, ecosystem=ecosystem,
+                                   created_after=created_after, created_before=created_before)
+        _items = [{'id': v['id']} for v in _queued]
+
+        if limit is not None and len(_queued) == limit:
+            return _items, _queued[-1]['id']
+
+        return _items, None
+
+    def find(self, spec_hash):
+        return [{'id': v['id'], 'phase': v['phase'], 'created': v['enqueued'], 'finished': v['finished']}
+                for v in self._queue.find(spec_hash)]
+
+    def delete(self, id):
+        return self._queue.delete(id)
+
+
+def _matches(v, phase=None, valid=None, ecosystem=None, created_after=None, created_before=None):
+    """Check a Validation with phase, ecosystem, created and result against the filters of Executor.list()."""
+    if phase is not None and v['phase'] != phase:
+        return False
+    if ecosystem is not None and v['ecosystem'] != ecosystem:
+        return False
+    if created_after is not None and v['created'] < created_after:
+        return False
+    if created_before is not None and v['created'] >= created_before:
+        return False
+    if valid is not None and (v.get('result') is None or v['result']['valid'] != valid):
+        return False
+
+    return True
+
+
+# the validator loaded into a process of the LocalExecutor's pool
+_validator = None
+
+
+def _timeout(signum, frame):
+    raise TimeoutError('validation did not finish in time')
+
+
+def _validate(validator_path, stack_specification, timeout):
+    """Run within a process of the LocalExecutor's pool: validate one stack specification, return its output
+    and when it started."""
+    global _validator
+
+    _started = time.time()
+
+    if _validator is None:
+        _validator = load_validator(validator_path)
+
+    _output = io.StringIO()
+
+    signal.signal(signal.SIGALRM, _timeout)
+    signal.alarm(math.ceil(timeout))
+
+    try:
+        with redirect_stdout(_output):
+            _validator.validate(stack_specification)
+    finally:
+        signal.alarm(0)
+
+    return _output.getvalue(), _started
+
+
+class LocalExecutor(Executor):
+    """Carries out Validations within a pool of local processes, no Kubernetes required.
+
+    Each process loads the validator once. At most `max_workers` Validations run at once and at most
+    `max_pending` wait for a process, each one is given `timeout` seconds. Results are retained for
+    `retention` seconds.
+    """
+
+    def __init__(self, max_workers=LOCAL_WORKERS, max_pending=LOCAL_MAX_PENDING, timeout=LOCAL_TIMEOUT,
+                 retention=LOCAL_RETENTION, validator_path=VALIDATOR):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.retention = retention
+        self.validator_path = validator_path
+
+        # re-entrant, as a done callback runs right away in the submitting thread if the future is done already
+        self._lock = threading.RLock()
+        self._pool = None
+        self._validations = {}
+        self._futures = {}
+
+        VALIDATIONS.labels('local', 'pending').set_function(lambda: self._count_futures(running=False))
+        VALIDATIONS.labels('local', 'running').set_function(lambda: self._count_futures(running=True))
+
+    def _count_futures(self, running):
+        with self._lock:
+            return len([future for future in self._futures.values() if future.running() == running])
+
+    def submit(self, validations, jobs=None):
+        with self._lock:
+            self._expire()
+
+            if len(self._futures) + len(validations) > self.max_workers + self.max_pending:
+                raise ServiceUnavailable('local executor is at capacity')
+
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+
+            for v in validations:
+                self._validations[v['id']] = {
+                    'stack_specification': v['stack_specification'],
+                    'ecosystem': v['ecosystem'],
+                    'spec_hash': v['spec_hash'],
+                    'phase': 'pending',
+                    'created': time.time(),
+                    'finished': None
+                }
+
+                _future = self._pool.submit(_validate, self.validator_path, v['stack_specification'], self.timeout)
+                self._futures[v['id']] = _future
+
+                _future.add_done_callback(partial(self._done, v['id']))
+
+    def _done(self, id, future):
+        with self._lock:
+            self._futures.pop(id, None)
+
+            v = self._validations.get(id)
+
+            if v is None:
+                return
+
+            v['finished'] = time.time()
+            _started = None
+
+            if future.cancelled():
+                v['phase'] = 'failed'
+            elif future.exception() is not None:
+                logger.error('validation id {} failed: {}'.format(id, future.exception()))
+
+                v['phase'] = 'failed'
+                v['raw_log'] = str(future.exception())
+            else:
+                v['phase'] = 'succeeded'
+                v['raw_log'], _started = future.result()
+                v['result'] = parse_result(v['raw_log'])
+
+            observe_validation('local', v['phase'], v['created'], _started, v['finished'])
+
+    def _expire(self):
+        _expired = time.time() - self.retention
+
+        for id in [id for id, v in self._validations.items() if v['finished'] and v['finished'] < _expired]:
+            del self._validations[id]
+
+    def get(self, id):
+        with self._lock:
+            v = self._validations.get(id)
+
+            if v is None:
+                return None
+
+            v = dict(v)
+            _future = self._futures.get(id)
+
+            if _future is not None and _future.running():
+                v['phase'] = 'running'
+
+            v.pop('raw_log', None)
+
+            return v
+
+    def log(self, id):
+        with self._lock:
+            v = self._validations.get(id)
+
+            return None if v is None else v.get('raw_log')
+
+    def ids(self):
+        with self._lock:
+            self._expire()
+
+            return list(self._validations.keys())
+
+    def list(self, limit=None, continue_token=None, **filters):
+        with self._lock:
+            _ids = sorted(id for id, v in self._validations.items()
+                          if (continue_token is None or id > continue_token) and _matches(v, **filters))
+
+        if limit is not None and len(_ids) > limit:
+            return [{'id': id} for id in _ids[:limit]], _ids[limit - 1]
+
+        return [{'id': id} for id in _ids], None
+
+    def find(self, spec_hash):
+        with self._lock:
+            return [{'id': id, 'phase': v['phase'], 'created': v['created'], 'finished': v['finished']}
+                    for id, v in self._validations.items() if v['spec_hash'] == spec_hash]
+
+    def delete(self, id):
+        with self._lock:
+            _future = self._futures.pop(id, None)
+
+            if _future is not None:
+                _future.cancel()
+
+            return self._validations.pop(id, None) is not None
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
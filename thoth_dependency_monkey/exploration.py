@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#   thoth-dependency-monkey
+#   Copyright(C) 2018 Christoph Görn
+#
+#   This program is free software: you can redistribute it and / or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Thoth: Dependency Monkey API"""
+
+import os
+import json
+import time
+import random
+import logging
+import itertools
+import urllib.error
+import urllib.request
+
+from functools import reduce
+
+import pkg_resources
+
+from werkzeug.exceptions import BadRequest, ServiceUnavailable
+
+from .cache import LRUCache
+from .specification import split_specification, canonical_name, COMMENT_RE
+
+
+# exhaustive: every combination, random: a sample of them, boundary: every combination of the oldest and the newest
+# candidate version of each package
+STRATEGIES = ('exhaustive', 'random', 'boundary')
+
+EXPLORATION_MAX_COMBINATIONS = int(os.getenv('THOTH_DEPENDENCY_MONKEY_EXPLORATION_MAX_COMBINATIONS', 1000))
+EXPLORATION_MAX_VERSIONS = int(os.getenv('THOTH_DEPENDENCY_MONKEY_EXPLORATION_MAX_VERSIONS', 5))
+EXPLORATION_SHARD_SIZE = int(os.getenv('THOTH_DEPENDENCY_MONKEY_EXPLORATION_SHARD_SIZE', 10))
+EXPLORATION_CACHE_SIZE = int(os.getenv('THOTH_DEPENDENCY_MONKEY_EXPLORATION_CACHE_SIZE', 1000))
+# seconds explorations are kept in the store shared by the replicas
+EXPLORATION_TTL = int(os.getenv('THOTH_DEPENDENCY_MONKEY_EXPLORATION_TTL', 7 * 24 * 3600))
+# results of an exploration are streamed as they come in, looking for new ones every interval, until the timeout
+EXPLORATION_POLL_INTERVAL = float(os.getenv('THOTH_DEPENDENCY_MONKEY_EXPLORATION_POLL_INTERVAL', 5))
+EXPLORATION_STREAM_TIMEOUT = int(os.getenv('THOTH_DEPENDENCY_MONKEY_EXPLORATION_STREAM_TIMEOUT', 3600))
+
+# where the releases of packages are looked up, and for how many seconds they are kept in memory
+PYPI_URL = os.getenv('THOTH_DEPENDENCY_MONKEY_PYPI_URL', 'https://pypi.org/pypi')
+RELEASE_CACHE_TTL = int(os.getenv('THOTH_DEPENDENCY_MONKEY_RELEASE_CACHE_TTL', 3600))
+
+logger = logging.getLogger(__file__)
+
+
+class ReleaseIndex():
+    """Looks up the released versions of packages using the JSON API of a Python package index."""
+
+    def __init__(self, url=PYPI_URL, ttl=RELEASE_CACHE_TTL, timeout=10):
+        self.url = url.rstrip('/')
+        self.ttl = ttl
+        self.timeout = timeout
+
+        # (time looked up, versions) by canonical package name
+        self._releases = LRUCache(EXPLORATION_CACHE_SIZE, size_func=lambda item: 1)
+
+    def versions(self, name):
+        """Return the versions of a package that have files not yanked, raise BadRequest if it does not exist."""
+        name = canonical_name(name)
+        _cached = self._releases.get(name)
+
+        if _cached is not None and time.time() - _cached[0] < self.ttl:
+            return _cached[1]
+
+        try:
+            with urllib.request.urlopen('{}/{}/json'.format(self.url, name), timeout=self.timeout) as f:
+                _releases = json.loads(f.read().decode())['releases']
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                raise BadRequest('package {} does not exist'.format(name))
+
+            logger.error('looking up releases of {}: {}'.format(name, e))
+            raise ServiceUnavailable('package index')
+        except (OSError, ValueError, KeyError) as e:
+            logger.error('looking up releases of {}: {}'.format(name, e))
+            raise ServiceUnavailable('package index')
+
+        _versions = [version for version, files in _releases.items()
+                     if files and not all(f.get('yanked') for f in files)]
+
+        self._releases.put(name, (time.time(), _versions))
+
+        return _versions
+
+
+def explored_requirements(spec):
+    """Split a stack specification into its lines, each with the requirement it explores, None if it explores none.
+
+    Requirements naming a package with version specifiers, extras and markers are explored, options, URLs and
+    requirements pinned with === are kept as they are.
+    """
+    _lines = []
+
+    for line in split_specification(spec):
+        line = COMMENT_RE.sub('', line).strip()
+
+        if not line:
+            continue
+
+        _requirement = None
+
+        if not line.startswith('-') and '://' not in line and '===' not in line:
+            try:
+                _requirement = pkg_resources.Requirement.parse(line)
+            except ValueError:
+                pass
+
+        _lines.append((line, _requirement))
+
+    return _lines
+
+
+def candidate_versions(requirement, versions, max_versions=EXPLORATION_MAX_VERSIONS):
+    """Return the newest `max_versions` (all if None) of the versions matching a requirement, oldest first;
+    pre-releases are only candidates if the requirement pins one."""
+    _matching = sorted([version for version in versions if requirement.specifier.contains(version)],
+                       key=pkg_resources.parse_version)
+
+    return _matching if max_versions is None else _matching[-max_versions:]
+
+
+def count_combinations(candidates, strategy):
+    """Return the number of combinations a strategy may choose from."""
+    if strategy == 'boundary':
+        candidates = [_boundaries(versions) for versions in candidates]
+
+    return reduce(lambda count, versions: count * len(versions), candidates, 1)
+
+
+def _boundaries(versions):
+    return versions[:1] + versions[-1:] if len(versions) > 1 else versions
+
+
+def combinations(candidates, strategy='exhaustive', limit=EXPLORATION_MAX_COMBINATIONS, seed=None):
+    """Yield at most `limit` distinct combinations of candidate versions, tuples of one version per package.
+
+    `candidates` holds the candidate versions of each package, oldest first. Exhaustive and boundary combinations
+    start with the newest versions, random ones are drawn using `seed`.
+    """
+    if strategy == 'boundary':
+        candidates = [_boundaries(versions) for versions in candidates]
+
+    if strategy in ('exhaustive', 'boundary'):
+        yield from itertools.islice(itertools.product(*[versions[::-1] for versions in candidates]), limit)
+        return
+
+    _random = random.Random(seed)
+    _total = count_combinations(candidates, strategy)
+
+    if _total <= limit:
+        _all = list(itertools.product(*candidates))
+        _random.shuffle(_all)
+
+        yield from _all
+        return
+
+    _drawn = set()
+
+    while len(_drawn) < limit:
+        combination = tuple(_random.choice(versions) for versions in candidates)
+
+        if combination not in _drawn:
+            _drawn.add(combination)
+
+            yield combination
+
+
+def pinned_requirement(requirement, version):
+    """Return a requirement pinned to one version, keeping its extras and marker."""
+    _pinned = requirement.project_name
+
+    if requirement.extras:
+        _pinned += '[{}]'.format(','.join(sorted(requirement.extras)))
+
+    _pinned += '==' + version
+
+    if requirement.marker is not None:
+        _pinned += '; ' + str(requirement.marker)
+
+    return _pinned
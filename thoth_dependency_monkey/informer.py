@@ -0,0 +1,279 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#   thoth-dependency-monkey
+#   Copyright(C) 2018 Christoph Görn
+#
+#   This program is free software: you can redistribute it and / or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Thoth: Dependency Monkey API"""
+
+import os
+import time
+import logging
+import threading
+
+from kubernetes import client, watch
+
+from .metrics import CACHE_STALENESS
+
+
+INFORMER_WATCH_TIMEOUT = int(os.getenv(
+    'THOTH_DEPENDENCY_MONKEY_INFORMER_WATCH_TIMEOUT', 300))
+INFORMER_RETRY_INTERVAL = int(os.getenv(
+    'THOTH_DEPENDENCY_MONKEY_INFORMER_RETRY_INTERVAL', 5))
+
+logger = logging.getLogger(__file__)
+
+
+def label_indexer(label):
+    """Index function for `Informer` indexing objects by the value of one of their labels."""
+    def _index(obj):
+        labels = obj.metadata.labels or {}
+
+        return [labels[label]] if label in labels else []
+
+    return _index
+
+
+class Informer():
+    """Keeps an indexed in-memory copy of Kubernetes objects up to date using list and watch.
+
+    The informer lists all objects matching `label_selector` once, and afterwards
+    follows a watch starting at the resourceVersion of the list (or of the last event
+    received), so a dropped watch connection is resumed without listing again. Only if
+    the resourceVersion has expired (410 Gone) the objects are listed again.
+
+    `key_func` maps an object to its key, `indexers` maps an index name to a function
+    returning the list of index values of an object. Handlers are called with the event
+    type (ADDED, MODIFIED or DELETED) and the object for every change, listed objects are
+    handed to them as ADDED.
+    """
+
+    def __init__(self, name, list_func, return_type, key_func, label_selector=None, indexers=None,
+                 watch_timeout=INFORMER_WATCH_TIMEOUT, retry_interval=INFORMER_RETRY_INTERVAL):
+        self.name = name
+        self.label_selector = label_selector
+        self.watch_timeout = watch_timeout
+        self.retry_interval = retry_interval
+
+        self._list_func = list_func
+        self._return_type = return_type
+        self._key_func = key_func
+        self._indexers = indexers or {}
+
+        self._lock = threading.RLock()
+        self._objects = {}
+        self._indexes = {index: {} for index in self._indexers}
+        self._handlers = []
+
+        self._resource_version = None
+        self._synced = threading.Event()
+        self._watching = False
+        self._last_sync = None
+
+        self._thread = None
+        self._stopped = threading.Event()
+        self._watch = None
+
+        CACHE_STALENESS.labels(name).set_function(self.staleness)
+
+    def start(self):
+        """Start following the cluster in a background thread, calling this more than once is a no-op. An
+        informer that was stopped lists all objects again."""
+        with self._lock:
+            if self._thread is not None and not self._stopped.is_set():
+                return
+
+            if self._thread is not None:
+                self._stopped = threading.Event()
+                self._synced.clear()
+                self._resource_version = None
+
+            self._thread = threading.Thread(
+                target=self._run, args=(self._stopped,), name='informer-{}'.format(self.name), daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop following the cluster, the objects are kept but not in sync any more."""
+        with self._lock:
+            self._stopped.set()
+            self._synced.clear()
+
+        if self._watch is not None:
+            self._watch.stop()
+
+    def has_synced(self):
+        return self._synced.is_set()
+
+    def wait_for_sync(self, timeout=None):
+        return self._synced.wait(timeout)
+
+    def staleness(self):
+        """Seconds since the cache was last known to be up to date, 0 while the watch is connected."""
+        if self._watching:
+            return 0
+
+        if self._last_sync is None:
+            return float('inf')
+
+        return time.time() - self._last_sync
+
+    def get(self, key):
+        with self._lock:
+            return self._objects.get(key)
+
+    def keys(self):
+        with self._lock:
+            return list(self._objects.keys())
+
+    def list(self):
+        with self._lock:
+            return list(self._objects.values())
+
+    def count(self, index, value):
+        with self._lock:
+            return len(self._indexes[index].get(value, ()))
+
+    def index_values(self, index):
+        with self._lock:
+            return list(self._indexes[index].keys())
+
+    def by_index(self, index, value):
+        with self._lock:
+            return [self._objects[key] for key in self._indexes[index].get(value, ())]
+
+    def add_handler(self, handler):
+        self._handlers.append(handler)
+
+    def add(self, obj):
+        """Add an object we know about before the watch delivers it, e.g. one we just created."""
+        with self._lock:
+            if self._key_func(obj) not in self._objects:
+                self._store(obj)
+
+    def discard(self, key):
+        """Remove an object we know is gone before the watch tells us, e.g. one we just deleted."""
+        with self._lock:
+            self._remove(key)
+
+    def _run(self, stopped):
+        while not stopped.is_set():
+            try:
+                if self._resource_version is None:
+                    self._list()
+
+                self._follow()
+            except client.rest.ApiException as e:
+                logger.error('informer {}: {}'.format(self.name, e))
+
+                if e.status == 410:
+                    self._resource_version = None
+                else:
+                    stopped.wait(self.retry_interval)
+            except Exception as e:  # the watch connection may break in many ways, we just start over
+                logger.error('informer {}: {}'.format(self.name, e))
+
+                stopped.wait(self.retry_interval)
+            finally:
+                self._watching = False
+
+    def _list(self):
+        logger.debug('informer {}: listing objects'.format(self.name))
+
+        resp = self._list_func(label_selector=self.label_selector)
+
+        with self._lock:
+            self._objects = {}
+            self._indexes = {index: {} for index in self._indexers}
+
+            for obj in resp.items or []:
+                self._store(obj)
+
+            self._resource_version = resp.metadata.resource_version
+            self._last_sync = time.time()
+
+        self._synced.set()
+
+        for obj in resp.items or []:
+            self._notify('ADDED', obj)
+
+    def _follow(self):
+        logger.debug('informer {}: watching from resourceVersion {}'.format(
+            self.name, self._resource_version))
+
+        self._watch = watch.Watch(return_type=self._return_type)
+        self._watching = True
+
+        for event in self._watch.stream(self._list_func, label_selector=self.label_selector,
+                                        resource_version=self._resource_version,
+                                        timeout_seconds=self.watch_timeout):
+            if event['type'] == 'ERROR':
+                status = event['raw_object']
+
+                if status.get('code') == 410:
+                    logger.debug('informer {}: resourceVersion expired'.format(self.name))
+
+                    self._resource_version = None
+                    return
+
+                raise client.rest.ApiException(status=status.get('code'), reason=status.get('message'))
+
+            obj = event['object']
+
+            with self._lock:
+                if event['type'] == 'DELETED':
+                    self._remove(self._key_func(obj))
+                else:
+                    self._store(obj)
+
+                self._resource_version = obj.metadata.resource_version
+                self._last_sync = time.time()
+
+            self._notify(event['type'], obj)
+
+        # the watch timed out on the server side, which means we were in sync up to now
+        self._last_sync = time.time()
+
+    def _notify(self, event_type, obj):
+        for handler in self._handlers:
+            try:
+                handler(event_type, obj)
+            except Exception as e:  # a failing handler must not stop the informer
+                logger.error('informer {}: handler failed: {}'.format(self.name, e))
+
+    def _store(self, obj):
+        key = self._key_func(obj)
+
+        self._remove(key)
+        self._objects[key] = obj
+
+        for index, index_func in self._indexers.items():
+            for value in index_func(obj):
+                self._indexes[index].setdefault(value, set()).add(key)
+
+    def _remove(self, key):
+        obj = self._objects.pop(key, None)
+
+        if obj is None:
+            return
+
+        for index, index_func in self._indexers.items():
+            for value in index_func(obj):
+                keys = self._indexes[index].get(value)
+
+                if keys is not None:
+                    keys.discard(key)
+
+                    if not keys:
+                        del self._indexes[index][value]
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#   thoth-dependency-monkey
+#   Copyright(C) 2018 Christoph Görn
+#
+#   This program is free software: you can redistribute it and / or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Thoth: Dependency Monkey API"""
+
+import os
+import logging
+import threading
+
+from kubernetes import client, config
+
+
+SERVICE_TOKEN_FILENAME = '/var/run/secrets/kubernetes.io/serviceaccount/token'
+SERVICE_CERT_FILENAME = '/var/run/secrets/kubernetes.io/serviceaccount/ca.crt'
+
+KUBERNETES_POOL_MAXSIZE = int(os.getenv(
+    'THOTH_DEPENDENCY_MONKEY_KUBERNETES_POOL_MAXSIZE', 10))
+KUBERNETES_REQUEST_TIMEOUT = float(os.getenv(
+    'THOTH_DEPENDENCY_MONKEY_KUBERNETES_REQUEST_TIMEOUT', 30))
+
+logger = logging.getLogger(__file__)
+
+
+class KubernetesClientManager():
+    """Keeps one configured Kubernetes ApiClient (and its connection pool) for the lifetime of the process.
+
+    The kubeconfig or the service account is read once, the bearer token is re-read
+    only if the service account token file has been rotated.
+    """
+
+    def __init__(self, host, pool_maxsize=KUBERNETES_POOL_MAXSIZE, request_timeout=KUBERNETES_REQUEST_TIMEOUT,
+                 token_filename=SERVICE_TOKEN_FILENAME, cert_filename=SERVICE_CERT_FILENAME):
+        self.host = host
+        self.pool_maxsize = pool_maxsize
+        self.request_timeout = request_timeout
+        self.token_filename = token_filename
+        self.cert_filename = cert_filename
+
+        self._lock = threading.Lock()
+        self._api_client = None
+        self._core_v1 = None
+        self._batch_v1 = None
+        self._token_mtime = None
+
+    @property
+    def in_cluster(self):
+        return os.path.isfile(self.token_filename)
+
+    @property
+    def api_client(self):
+        with self._lock:
+            if self._api_client is None:
+                self._api_client = self._create_api_client()
+            elif self.in_cluster:
+                self._refresh_token(self._api_client.configuration)
+
+            return self._api_client
+
+    @property
+    def core_v1(self):
+        api_client = self.api_client
+
+        if self._core_v1 is None:
+            self._core_v1 = client.CoreV1Api(api_client)
+
+        return self._core_v1
+
+    @property
+    def batch_v1(self):
+        api_client = self.api_client
+
+        if self._batch_v1 is None:
+            self._batch_v1 = client.BatchV1Api(api_client)
+
+        return self._batch_v1
+
+    def _create_api_client(self):
+        configuration = client.Configuration()
+
+        if self.in_cluster:
+            logger.debug('using service account from {}'.format(self.token_filename))
+
+            configuration.host = self.host
+            configuration.ssl_ca_cert = self.cert_filename
+            self._refresh_token(configuration)
+        else:
+            logger.info("not running within an OpenShift cluster, using local kube config...")
+
+            config.load_kube_config(client_configuration=configuration)
+
+        configuration.connection_pool_maxsize = self.pool_maxsize
+
+        api_client = client.ApiClient(configuration)
+
+        # block instead of opening throwaway connections if all pooled connections are in use
+        api_client.rest_client.pool_manager.connection_pool_kw['block'] = True
+
+        return api_client
+
+    def _refresh_token(self, configuration):
+        mtime = os.stat(self.token_filename).st_mtime
+
+        if mtime == self._token_mtime:
+            return
+
+        logger.debug('(re-)reading service account token')
+
+        with open(self.token_filename) as f:
+            configuration.api_key['authorization'] = 'bearer ' + f.read().strip()
+
+        self._token_mtime = mtime
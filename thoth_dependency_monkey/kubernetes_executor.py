@@ -0,0 +1,901 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#   thoth-dependency-monkey
+#   Copyright(C) 2018 Christoph Görn
+#
+#   This program is free software: you can redistribute it and / or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Thoth: Dependency Monkey API"""
+
+import os
+import json
+import time
+import uuid
+import logging
+
+from werkzeug.exceptions import BadRequest, Conflict, ServiceUnavailable
+from kubernetes import client
+
+from .executor import Executor
+from .ecosystem import VALIDATORS, RESOURCE_PROFILE_SIZE
+from .specification import specification_size
+from .informer import Informer
+from .cache import LRUCache
+from .scheduler import Scheduler
+from .store import store_from_url
+from .leader import LeaderElector
+from .retention import Retention, RETENTION_TTL, RETENTION_INTERVAL
+from .replication import Replication
+from .validation_job import VALIDATION_JOB_PREFIX, VALIDATIONS_ANNOTATION, validations_of_job, job_phase, \
+    job_finished, created_day, label_selector, job_selected, job_manifest
+from .validation_pods import ValidationPods, validation_log, RESULT_CACHE_SIZE
+from .specification_config_maps import SpecificationConfigMaps, SPECIFICATIONS_MOUNT_PATH
+from .metrics import CacheStats, kubernetes_api_call, observe_validation, VALIDATIONS
+
+
+KUBERNETES_API_URL = os.getenv(
+    'KUBERNETES_API_URL', 'https://kubernetes.default.svc.cluster.local:443')
+THOTH_DEPENDENCY_MONKEY_NAMESPACE = os.getenv(
+    'THOTH_DEPENDENCY_MONKEY_NAMESPACE', 'thoth-dev')
+JOB_CACHE = os.getenv('THOTH_DEPENDENCY_MONKEY_JOB_CACHE', 'yes').lower() not in ('no', 'false', '0')
+POD_CACHE = os.getenv('THOTH_DEPENDENCY_MONKEY_POD_CACHE', 'yes').lower() not in ('no', 'false', '0')
+BATCH_JOBS = int(os.getenv('THOTH_DEPENDENCY_MONKEY_BATCH_JOBS', 4))
+
+# replicas of the API Service share a store, the one elected leader carries out the background work, see Replication
+LEADER_ELECTION = 'kubernetes-executor'
+
+logger = logging.getLogger(__file__)
+
+
+class KubernetesExecutor(Executor):
+    """Carries out each Validation, or batch of Validations, as a Kubernetes Job running a validator image."""
+
+    def __init__(self, kubernetes_client, archive=None, retention_ttl=RETENTION_TTL,
+                 retention_interval=RETENTION_INTERVAL, store=None):
+        # one ApiClient (and connection pool) is shared by all calls of this executor
+        self._kube = kubernetes_client
+
+        # the background work is carried out by the replica elected leader, see _leading()
+        self._store = store if store is not None else store_from_url()
+        self._leader = LeaderElector(self._store, LEADER_ELECTION, on_started_leading=self._start_leading,
+                                     on_stopped_leading=self._stop_leading)
+
+        # finished Validations are recorded once, and read back from there, see Retention too; replicas sharing a
+        # store share it, the leader records them
+        self._archive = archive if archive is not None else self._store.archive()
+        # in front of it the records of the most recently read finished Validations, by id
+        self._finished = LRUCache(RESULT_CACHE_SIZE, size_func=lambda v: 1)
+        # validators start off with a profile of a sample of the Validations recorded before
+        self._profile(self._archive.list(limit=RESOURCE_PROFILE_SIZE))
+        self._retention = Retention(self._list_all_jobs, job_finished, self._archive_job, self._leading,
+                                    ttl=retention_ttl, interval=retention_interval)
+        # called with id and phase of the Validations of a Job that changed its phase, see add_listener()
+        self._listeners = []
+
+        # all validation Jobs are kept in memory and followed by a watch, indexed by the Validations they carry out
+        self._jobs = Informer('jobs', self._list_validation_jobs, 'V1Job',
+                              key_func=lambda job: job.metadata.name,
+                              label_selector='validation-id',
+                              indexers={'validation-id': lambda job: [v['id'] for v in validations_of_job(job)],
+                                        'spec-hash': lambda job: [v['spec_hash'] for v in validations_of_job(job)
+                                                                  if v['spec_hash']],
+                                        'phase': lambda job: [job_phase(job)]})
+
+        # the Pods of the Jobs, with the logs and results of the Validations, and their stack specifications
+        self._pods = ValidationPods(kubernetes_client, THOTH_DEPENDENCY_MONKEY_NAMESPACE,
+                                    lambda informer: self._cache_synced(informer, POD_CACHE))
+        self._specifications = SpecificationConfigMaps(kubernetes_client, THOTH_DEPENDENCY_MONKEY_NAMESPACE,
+                                                       lambda informer: self._cache_synced(informer, JOB_CACHE))
+
+        # Validation jobs are created by the scheduler, which caps the number of Jobs pending or running at once
+        self._scheduler = Scheduler('jobs', self._create_validation_job, self._count_active_jobs)
+        self._replication = Replication(self._store, self._scheduler, self._leading, self.delete)
+
+        # Validations are selected by the phase and validity labels of their Jobs, the watch keeps them up to date
+        self._jobs.add_handler(self._label_job)
+
+        self._job_stats = CacheStats('jobs')
+        self._finished_stats = CacheStats('finished')
+
+        for phase in ('pending', 'running'):
+            VALIDATIONS.labels('kubernetes', phase).set_function(lambda phase=phase: self._jobs.count('phase', phase))
+
+        VALIDATIONS.labels('kubernetes', 'queued').set_function(lambda: len(self._scheduler))
+
+        # once everything it starts is in place
+        self._leader.start()
+
+    def submit(self, validations, jobs=None):
+        """Pack the Validations into at most `jobs` (BATCH_JOBS by default) Jobs, they are queued until the
+        scheduler creates them. A replica that is not the leader hands them to the leader."""
+        _jobs = min(jobs or BATCH_JOBS, len(validations))
+        _chunks = [validations[i::_jobs] for i in range(_jobs)]
+        _client, _priority = validations[0].get('client'), validations[0].get('priority', 'interactive')
+
+        if self._replication.shared and not self._leading():
+            self._replication.hand_over(_chunks, _client, _priority)
+            return
+
+        # all of them or none
+        self._scheduler.ensure_room(_jobs, _client, _priority)
+
+        # told before they are queued, their Job may be created right away
+        for chunk in _chunks:
+            self._replication.share(chunk, 'pending', 'queued')
+
+        for chunk in _chunks:
+            self._scheduler.enqueue([v['id'] for v in chunk], chunk, _client, _priority)
+
+    def _share_job(self, job, phase):
+        """Tell the other replicas about the Validations of a Job pending or running."""
+        self._replication.share([dict(self._job_validation(job, v['id']), id=v['id']) for v in validations_of_job(job)],
+                                phase, job.metadata.resource_version)
+
+    def _create_validation_job(self, validations):
+        if len(validations) == 1:
+            _job = self._schedule_validation_job(
+                validations[0]['id'], validations[0]['stack_specification'], validations[0]['ecosystem'],
+                validations[0]['spec_hash'])
+        else:
+            _job = self._schedule_batch_validation_job(str(uuid.uuid4()), validations, validations[0]['ecosystem'])
+
+        # so that a GET right after the POST does not have to wait for the watch, and the Job counts as active
+        if JOB_CACHE:
+            self._jobs.add(_job)
+        else:
+            # without a watch the leader cannot tell when the Job changes, the other replicas ask the Kubernetes API
+            self._replication.unshare([v['id'] for v in validations_of_job(_job)])
+
+    def _count_active_jobs(self):
+        """Return the number of Validation jobs pending or running."""
+        # Jobs are created by the leader only, the other replicas have no room for more
+        if not self._leading():
+            return self._scheduler.max_running
+
+        if self._cache_synced(self._jobs, JOB_CACHE):
+            return self._jobs.count('phase', 'pending') + self._jobs.count('phase', 'running')
+
+        return len([job for job in self._get_all_scheduled_validation_job()
+                    if job_phase(job) in ('pending', 'running')])
+
+    def get(self, id):
+        # a finished Validation never changes, it is read without asking the Kubernetes API
+        _finished = self._get_finished(str(id))
+
+        if _finished is not None:
+            v = {name: _finished[name] for name in ('stack_specification', 'ecosystem', 'phase')}
+
+            if _finished['result'] is not None:
+                v['result'] = _finished['result']
+
+            return v
+
+        _shared = self._replication.get(str(id))
+
+        if _shared is not None:
+            return {name: _shared[name] for name in ('stack_specification', 'ecosystem', 'phase')}
+
+        _job = self._find_validation_job(id)
+
+        if _job is None:
+            return self._get_queued(id)
+
+        v = self._job_validation(_job, id)
+
+        if v['phase'] in ('succeeded', 'failed'):
+            self._record_finished(_job, known={str(id): v})
+
+        return v
+
+    def _get_finished(self, id):
+        """Return the record of a finished Validation, None if it has not been recorded."""
+        v = self._finished.get(id)
+
+        # another replica may have deleted it since
+        if v is not None and self._replication.deleted(id):
+            self._finished.pop(id)
+            v = None
+
+        if self._finished_stats.record(v is not None):
+            return v
+
+        v = self._archive.get(id)
+
+        if v is not None:
+            self._finished.put(id, v)
+
+        return v
+
+    def _record_finished(self, job, known=None):
+        """Record the Validations of a Job that finished, unless the result of one of them is not known yet.
+        `known` are Validations of the Job already read, by id. Only the leader writes them to the archive, the other
+        replicas keep them in memory."""
+        _validations = self._finished_validations(job, known=known)
+
+        if any(v['phase'] == 'succeeded' and v.get('result') is None for v in _validations):
+            return
+
+        # a Validation is profiled once, when it is recorded for the first time
+        _profiled = [v for v in _validations if self._finished.get(v['id']) is None]
+
+        if self._leading():
+            self._archive.put(_validations)
+
+        self._remember_finished(_validations)
+        self._profile(_profiled)
+
+    def _profile(self, validations):
+        """Record what the Validations took with the validator of their ecosystem."""
+        for v in validations:
+            _result = v.get('result') or {}
+            _resources = _result.get('resources')
+
+            if not _resources or not v.get('spec_hash') or v['ecosystem'] not in VALIDATORS or \
+                    'total' not in (_result.get('timings') or {}):
+                continue
+
+            VALIDATORS[v['ecosystem']].record(specification_size(v['stack_specification']), v['spec_hash'],
+                                              _result['timings']['total'], _resources['memory'], _resources['cpu'])
+
+    def _remember_finished(self, validations):
+        for v in validations:
+            self._finished.put(v['id'], {name: value for name, value in v.items() if name != 'log'})
+
+    def _job_validation(self, job, id):
+        """Return stack specification, ecosystem, phase and, once succeeded, the result of a Validation of a Job."""
+        v = {}
+
+        # lets copy the Validation information from the Kubernetes Job
+        for container in job.spec.template.spec.containers:
+            if container.name == job.metadata.name:
+                for env in container.env:
+                    v[env.name.lower()] = env.value
+
+        # a batch Job carries the stack specifications of all its Validations
+        _batch = v.pop('stack_specifications', None)
+
+        if _batch is not None:
+            for validation in json.loads(_batch):
+                if validation['id'] == str(id):
+                    v.update(validation)
+
+            v.pop('id', None)
+
+        # the stack specification is mounted from its ConfigMap, Jobs of earlier versions carry it within their env
+        _file = v.pop('stack_specification_file', None)
+
+        if _file is not None:
+            v['stack_specification'] = self._specifications.get(os.path.basename(_file))
+
+        v['phase'] = job_phase(job)
+
+        if v['phase'] == 'succeeded':
+            v['result'] = self._pods.result(job, id, _batch is not None)
+
+        return v
+
+    def _get_queued(self, id):
+        """Return a Validation waiting for its Job to be created, None if it is not queued."""
+        _queued = self._scheduler.get(str(id))
+
+        if _queued is None:
+            # handed to the leader by another replica, not queued by it yet
+            _shared = self._replication.get_handed(id)
+
+            if _shared is not None:
+                return {name: _shared[name] for name in ('stack_specification', 'ecosystem', 'phase')}
+
+        # if it is neither queued nor known to OpenShift, we let it 404
+        if _queued is None:
+            return None
+
+        for v in _queued['work']:
+            if v['id'] == str(id):
+                return {
+                    'stack_specification': v['stack_specification'],
+                    'ecosystem': v['ecosystem'],
+                    'phase': 'pending',
+                    'queue_position': _queued['position']
+                }
+
+    def version(self, id):
+        """A finished Validation never changes, the others change with their place in the queue or the
+        resourceVersion of their Job. Told without calling the Kubernetes API, None if the Job cache cannot tell."""
+        if self._get_finished(str(id)) is not None:
+            return 'finished'
+
+        _shared = self._replication.get(str(id))
+
+        if _shared is not None:
+            return _shared['version']
+
+        _queued = self._scheduler.get(str(id))
+
+        if _queued is not None:
+            return 'queued-{}'.format(_queued['position'])
+
+        if not self._cache_synced(self._jobs, JOB_CACHE):
+            return None
+
+        _jobs = self._jobs.by_index('validation-id', str(id))
+
+        return _jobs[0].metadata.resource_version if _jobs else None
+
+    def log(self, id):
+        _finished = self._get_finished(str(id))
+
+        # the log of a finished Validation is kept by its Pod, until it is archived
+        if _finished is not None and _finished['job'] is None:
+            return self._archive.log(str(id))
+
+        _job = self._find_validation_job(id)
+
+        if _job is None:
+            # archived meanwhile, by the leader
+            return self._archive.log(str(id)) if _finished is not None else None
+
+        log = self._pods.log(_job)
+
+        if log is not None and VALIDATIONS_ANNOTATION in (_job.metadata.annotations or {}):
+            log = validation_log(log, id)
+
+        return log
+
+    def ids(self):
+        _queued = [id for entry in self._scheduler.queued() for id in entry['ids']]
+
+        _queued += self._archive.ids(archived=True)
+
+        if self._cache_synced(self._jobs, JOB_CACHE):
+            return self._jobs.index_values('validation-id') + _queued
+
+        result = _queued
+
+        for job in self._get_all_scheduled_validation_job():
+            if job.metadata.name.startswith(VALIDATION_JOB_PREFIX):
+                for validation in validations_of_job(job):
+                    result.append(str(validation['id']))
+
+        logger.debug('found the following validations: {}'.format(result))
+
+        return result
+
+    def list(self, limit=None, continue_token=None, **filters):
+        """List the Validations of at most `limit` Jobs, followed by the archived Validations.
+
+        Jobs are selected by their labels, from the cache if it is in sync, from the Kubernetes API otherwise.
+        Continue tokens of the cache start with c:, the ones of the Kubernetes API with k:, the ones of the
+        archive with a:.
+        """
+        if continue_token is not None and continue_token[:2] not in ('c:', 'k:', 'a:'):
+            raise BadRequest('invalid continue token')
+
+        if continue_token is not None and continue_token.startswith('a:'):
+            return self._list_archived(limit, continue_token[2:] or None, filters)
+
+        if (continue_token is None or continue_token.startswith('c:')) and self._cache_synced(self._jobs, JOB_CACHE):
+            _items, _next = self._list_cached(limit, continue_token[2:] if continue_token else None, filters)
+        elif continue_token is not None and continue_token.startswith('c:'):
+            raise BadRequest('continue token expired')
+        else:
+            _items, _next = self._list_jobs(limit, continue_token[2:] if continue_token else None, filters)
+
+        if _next is not None:
+            return _items, _next
+
+        # the Jobs are exhausted, the archived Validations fill up the page
+        _rest = None if limit is None else limit - len(_items)
+
+        if _rest is not None and _rest <= 0:
+            return _items, 'a:'
+
+        _archived, _next = self._list_archived(_rest, None, filters)
+
+        return _items + _archived, _next
+
+    def _list_archived(self, limit, after, filters):
+        _archived = self._archive.list(after=after, limit=limit, archived=True, **filters)
+
+        if limit is not None and len(_archived) == limit:
+            return [{'id': v['id']} for v in _archived], 'a:' + _archived[-1]['id']
+
+        return [{'id': v['id']} for v in _archived], None
+
+    def _list_cached(self, limit, after, filters):
+        _jobs = sorted((job for job in self._jobs.list()
+                        if (after is None or job.metadata.name > after) and job_selected(job, filters)),
+                       key=lambda job: job.metadata.name)
+
+        _next = None
+
+        if limit is not None and len(_jobs) > limit:
+            _jobs = _jobs[:limit]
+            _next = 'c:' + _jobs[-1].metadata.name
+
+        return [v for job in _jobs for v in self._job_validations(job, filters)], _next
+
+    def _list_jobs(self, limit, continue_token, filters):  # pragma: no cover
+        _kwargs = {'label_selector': label_selector(filters)}
+
+        if limit is not None:
+            _kwargs['limit'] = limit
+        if continue_token is not None:
+            _kwargs['_continue'] = continue_token
+
+        try:
+            _resp = self._list_validation_jobs(**_kwargs)
+        except client.rest.ApiException as e:
+            logger.error(e)
+
+            if e.status == 410:
+                raise BadRequest('continue token expired')
+
+            raise ServiceUnavailable('OpenShift')
+
+        _next = _resp.metadata._continue
+
+        return ([v for job in _resp.items or [] if job.metadata.name.startswith(VALIDATION_JOB_PREFIX)
+                 for v in self._job_validations(job, filters)],
+                'k:' + _next if _next else None)
+
+    def _job_validations(self, job, filters):
+        """Return the Validations of a selected Job matching what its labels cannot tell: the exact creation time
+        and, for a batch Job with valid and invalid Validations, the validity."""
+        _created = job.metadata.creation_timestamp.timestamp()
+
+        if filters.get('created_after') is not None and _created < filters['created_after']:
+            return []
+        if filters.get('created_before') is not None and _created >= filters['created_before']:
+            return []
+
+        _validations = validations_of_job(job)
+        _batch = VALIDATIONS_ANNOTATION in (job.metadata.annotations or {})
+
+        if filters.get('valid') is not None and (job.metadata.labels or {}).get('validity') == 'mixed':
+            _validations = [v for v in _validations
+                            if (self._pods.result(job, v['id'], _batch) or {}).get('valid') == filters['valid']]
+
+        return [{'id': str(v['id'])} for v in _validations]
+
+    def _label_job(self, event_type, job):
+        """Keep the phase, validity, ecosystem and created-day labels of a Job up to date."""
+        if not job.metadata.name.startswith(VALIDATION_JOB_PREFIX):
+            return
+
+        if event_type == 'DELETED':
+            self._replication.unshare([v['id'] for v in validations_of_job(job)])
+
+            self._scheduler.wakeup()
+            return
+
+        _labels = job.metadata.labels or {}
+        _wanted = {'phase': job_phase(job), 'created-day': created_day(job.metadata.creation_timestamp)}
+
+        if 'ecosystem' not in _labels:
+            for container in job.spec.template.spec.containers:
+                for env in container.env or []:
+                    if env.name == 'ECOSYSTEM':
+                        _wanted['ecosystem'] = env.value
+
+        if _wanted['phase'] == 'succeeded' and 'validity' not in _labels:
+            _validity = self._job_validity(job)
+
+            if _validity is not None:
+                _wanted['validity'] = _validity
+
+        _changed = {name: value for name, value in _wanted.items() if _labels.get(name) != value}
+
+        if _changed.get('phase') in ('succeeded', 'failed'):
+            self._observe_job(job, _changed['phase'])
+
+            # there is room for another Job
+            self._scheduler.wakeup()
+
+        if _changed:
+            self._patch_job_labels(job.metadata.name, _changed)
+
+        if _changed.get('phase') in ('succeeded', 'failed'):
+            self._record_finished(job)
+
+        if _wanted['phase'] in ('pending', 'running') and (event_type == 'ADDED' or 'phase' in _changed):
+            self._share_job(job, _wanted['phase'])
+        elif 'phase' in _changed:
+            self._replication.unshare([v['id'] for v in validations_of_job(job)])
+
+        if 'phase' in _changed:
+            for validation in validations_of_job(job):
+                self._replication.publish_transition(str(validation['id']), _changed['phase'])
+                self._tell_listeners(str(validation['id']), _changed['phase'])
+
+    def _tell_listeners(self, id, phase):
+        for listener in self._listeners:
+            listener(id, phase)
+
+    def add_listener(self, listener):
+        """Have `listener` called whenever a Validation job changes its phase, as told by the watch of the Jobs.
+        Only the leader watches the Jobs, replicas sharing a store are told by it."""
+        if not JOB_CACHE:
+            return False
+
+        self._listeners.append(listener)
+        self._replication.follow_transitions(self._tell_listeners)
+
+        return True
+
+    def _observe_job(self, job, phase):
+        """Observe the timings of a Job that just finished, the Pod carrying it out started running at its start
+        time."""
+        _pod = self._pods.pod(job)
+        _started = (_pod.status.start_time if _pod is not None else None) or job.status.start_time
+        _finished = job.status.completion_time
+
+        observe_validation('kubernetes', phase, job.metadata.creation_timestamp.timestamp(),
+                           _started.timestamp() if _started else None,
+                           _finished.timestamp() if _finished else time.time())
+
+    def _job_validity(self, job):
+        """Return valid, invalid or, for a batch Job with valid and invalid Validations, mixed. None if unknown yet."""
+        _batch = VALIDATIONS_ANNOTATION in (job.metadata.annotations or {})
+        _records = [self._pods.result(job, v['id'], _batch) for v in validations_of_job(job)]
+
+        if not _records or None in _records:
+            return None
+
+        _valid = {record['valid'] for record in _records}
+
+        if len(_valid) > 1:
+            return 'mixed'
+
+        return 'valid' if _valid.pop() else 'invalid'
+
+    def find(self, spec_hash):
+        if self._cache_synced(self._jobs, JOB_CACHE):
+            _jobs = self._jobs.by_index('spec-hash', spec_hash)
+        else:
+            try:
+                _jobs = self._list_validation_jobs(label_selector='spec-hash=' + spec_hash).items or []
+            except client.rest.ApiException as e:
+                logger.error(e)
+
+                raise ServiceUnavailable('OpenShift')
+
+        result = []
+
+        for job in _jobs:
+            for validation in validations_of_job(job):
+                if validation['spec_hash'] == spec_hash:
+                    result.append({
+                        'id': validation['id'],
+                        'phase': job_phase(job),
+                        'created': job.metadata.creation_timestamp.timestamp(),
+                        'finished': job.status.completion_time.timestamp() if job.status.completion_time else None
+                    })
+
+        for entry in self._scheduler.queued():
+            for validation in entry['work']:
+                if validation['spec_hash'] == spec_hash:
+                    result.append({'id': validation['id'], 'phase': 'pending', 'created': entry['enqueued'],
+                                   'finished': None})
+
+        for v in self._archive.find(spec_hash):
+            if v['job'] is None:
+                result.append({'id': v['id'], 'phase': v['phase'], 'created': v['created'],
+                               'finished': v['finished']})
+
+        return result
+
+    def delete(self, id):
+        """Delete a Validation, its Job and Pods, or its queued Job, and its record. A Validation queued by the
+        leader is deleted by the leader."""
+        _finished = self._get_finished(str(id))
+        _shared = self._replication.get(str(id)) if _finished is None else None
+
+        if _shared is not None and _shared['version'] == 'queued':
+            if _shared['batch']:
+                raise Conflict('Validation {} is queued within a batch, together with others'.format(id))
+
+            self._replication.hand_deletion(id)
+
+            return True
+
+        _job = self._find_validation_job(id) if _finished is None or _finished['job'] is not None else None
+
+        if _job is not None:
+            if len(validations_of_job(_job)) > 1:
+                raise Conflict('Validation {} is carried out by a batch job, together with others'.format(id))
+
+            self._delete_job(_job.metadata.name)
+            self._finished.pop(str(id))
+            self._archive.delete(str(id))
+            self._replication.tell_deleted(id)
+
+            return True
+
+        _queued = self._scheduler.get(str(id))
+
+        if _queued is not None:
+            if len(_queued['work']) > 1:
+                raise Conflict('Validation {} is queued within a batch, together with others'.format(id))
+
+            self._replication.unshare([id])
+
+            return self._scheduler.remove(str(id))
+
+        self._finished.pop(str(id))
+
+        if not self._archive.delete(str(id)):
+            return False
+
+        self._replication.tell_deleted(id)
+
+        return True
+
+    def _finished_validations(self, job, archived=False, known=None):
+        """Return the Validations of a finished Job the way they are recorded, with their log if the Job is about
+        to be deleted."""
+        _batch = VALIDATIONS_ANNOTATION in (job.metadata.annotations or {})
+        _log = self._pods.log(job) if archived else None
+        _validations = []
+
+        for validation in validations_of_job(job):
+            v = dict((known or {}).get(str(validation['id'])) or self._job_validation(job, validation['id']))
+
+            v['id'] = str(validation['id'])
+            v['spec_hash'] = validation['spec_hash']
+            v['created'] = job.metadata.creation_timestamp.timestamp()
+            v['finished'] = job_finished(job)
+            v['log'] = validation_log(_log, v['id']) if _log is not None and _batch else _log
+            v['job'] = None if archived else job.metadata.name
+
+            _validations.append(v)
+
+        return _validations
+
+    def _list_all_jobs(self):
+        """Return all Validation jobs."""
+        if self._cache_synced(self._jobs, JOB_CACHE):
+            return self._jobs.list()
+
+        return self._get_all_scheduled_validation_job()
+
+    def _archive_job(self, job):
+        """Move the Validations of a finished Job to the archive, with their result and log, then delete the Job and
+        its Pods. Returns the number of Validations archived."""
+        _validations = self._finished_validations(job, archived=True)
+
+        self._archive.put(_validations)
+        self._remember_finished(_validations)
+        self._delete_job(job.metadata.name)
+
+        return len(_validations)
+
+    def _leading(self):
+        """Return whether this replica carries out the background work, it was elected leader."""
+        return self._leader.is_leader()
+
+    def _start_leading(self):
+        """Start archiving finished Jobs, watching the Jobs, the other replicas are told about them, and queuing what
+        they hand over."""
+        self._retention.start()
+
+        if self._replication.shared:
+            self._replication.start()
+
+            if JOB_CACHE:
+                self._jobs.start()
+
+    def _stop_leading(self):
+        """Stop watching, hand the queued Validations to the next leader."""
+        for informer in (self._jobs, self._pods.informer, self._specifications.informer):
+            informer.stop()
+
+        self._replication.hand_back()
+
+    def _cache_synced(self, informer, enabled):
+        # only the leader keeps the watches
+        if not enabled or not self._leading():
+            return False
+
+        informer.start()
+
+        return informer.has_synced()
+
+    def _find_validation_job(self, id):
+        if self._cache_synced(self._jobs, JOB_CACHE):
+            _jobs = self._jobs.by_index('validation-id', str(id))
+
+            if self._job_stats.record(bool(_jobs)):
+                return _jobs[0]
+
+        # the cache is not in sync yet, or the Job is younger than the last event we got
+        return self._get_scheduled_validation_job(id)
+
+    def _list_validation_jobs(self, **kwargs):  # pragma: no cover
+        if kwargs.get('watch'):
+            return self._kube.batch_v1.list_namespaced_job(THOTH_DEPENDENCY_MONKEY_NAMESPACE, **kwargs)
+
+        kwargs.setdefault('_request_timeout', self._kube.request_timeout)
+
+        with kubernetes_api_call('list_jobs'):
+            return self._kube.batch_v1.list_namespaced_job(THOTH_DEPENDENCY_MONKEY_NAMESPACE, **kwargs)
+
+    def _schedule_validation_job(self, id, spec, ecosystem, spec_hash):  # pragma: no cover
+        logger.debug('scheduling validation id {}'.format(id))
+
+        _specifications = {spec_hash: spec}
+        _job = self._create_job(job_manifest(
+            id, {'spec-hash': spec_hash}, {}, ecosystem,
+            [{'name': 'STACK_SPECIFICATION_FILE', 'value': os.path.join(SPECIFICATIONS_MOUNT_PATH, spec_hash)}],
+            _specifications))
+
+        self._store_specifications(_job, _specifications)
+
+        return _job
+
+    def _schedule_batch_validation_job(self, batch_id, validations, ecosystem):  # pragma: no cover
+        logger.debug('scheduling batch {} of validation ids {}'.format(
+            batch_id, [v['id'] for v in validations]))
+
+        _specs = [{'id': v['id'], 'stack_specification_file': os.path.join(SPECIFICATIONS_MOUNT_PATH, v['spec_hash'])}
+                  for v in validations]
+        _annotation = [{'id': v['id'], 'spec_hash': v['spec_hash']} for v in validations]
+
+        _specifications = {v['spec_hash']: v['stack_specification'] for v in validations}
+
+        # the validation-id label of a batch Job is the batch id, the Validations are listed in an annotation
+        _job = self._create_job(job_manifest(
+            batch_id, {'validation-batch': 'true'}, {VALIDATIONS_ANNOTATION: json.dumps(_annotation)}, ecosystem,
+            [{'name': 'STACK_SPECIFICATIONS', 'value': json.dumps(_specs)}], _specifications))
+
+        self._store_specifications(_job, _specifications)
+
+        return _job
+
+    def _store_specifications(self, job, specifications):  # pragma: no cover
+        """Store the stack specifications of a Job just created, its Pod waits for them. If they cannot be stored,
+        the Job is deleted again."""
+        try:
+            self._specifications.put(job, specifications)
+        except ServiceUnavailable:
+            self._delete_job(job.metadata.name)
+            raise
+
+    def _create_job(self, job_manifest):  # pragma: no cover
+        _api = self._kube.batch_v1
+
+        try:
+            with kubernetes_api_call('create_job'):
+                _resp = _api.create_namespaced_job(
+                    body=job_manifest, namespace=THOTH_DEPENDENCY_MONKEY_NAMESPACE,
+                    _request_timeout=self._kube.request_timeout)
+        except client.rest.ApiException as e:
+            logger.error(e)
+
+            if e.status == 403:
+                raise ServiceUnavailable('OpenShift auth failed')
+
+            raise ServiceUnavailable('OpenShift')
+
+        return _resp
+
+    def _delete_job(self, name):  # pragma: no cover
+        logger.debug('deleting job {}'.format(name))
+
+        try:
+            with kubernetes_api_call('delete_job'):
+                # the Pods of the Job are deleted by the garbage collector
+                self._kube.batch_v1.delete_namespaced_job(
+                    name, THOTH_DEPENDENCY_MONKEY_NAMESPACE, client.V1DeleteOptions(propagation_policy='Background'),
+                    _request_timeout=self._kube.request_timeout)
+        except client.rest.ApiException as e:
+            if e.status != 404:
+                logger.error(e)
+
+                raise ServiceUnavailable('OpenShift')
+
+        self._jobs.discard(name)
+
+    def _patch_job_labels(self, name, labels):  # pragma: no cover
+        logger.debug('labelling job {} with {}'.format(name, labels))
+
+        try:
+            with kubernetes_api_call('patch_job'):
+                self._kube.batch_v1.patch_namespaced_job(
+                    name, THOTH_DEPENDENCY_MONKEY_NAMESPACE, {'metadata': {'labels': labels}},
+                    _request_timeout=self._kube.request_timeout)
+        except client.rest.ApiException as e:
+            # the Job may be gone already, the next event gives us another chance otherwise
+            logger.error(e)
+
+    def _get_all_scheduled_validation_job(self):  # pragma: no cover
+        logger.debug('looking for all validations')
+
+        result = []
+
+        _api = self._kube.batch_v1
+
+        try:
+            with kubernetes_api_call('list_jobs'):
+                _resp = _api.list_namespaced_job(
+                    namespace=THOTH_DEPENDENCY_MONKEY_NAMESPACE, label_selector='validation-id',
+                    _request_timeout=self._kube.request_timeout)
+
+            # if we got a none empty list of jobs, lets filter the ones out that belong to us...
+            if not _resp.items is None:
+                for job in _resp.items:
+                    if job.metadata.name.startswith(VALIDATION_JOB_PREFIX):
+                        result.append(job)
+
+        except client.rest.ApiException as e:
+            logger.error(e)
+
+            if e.status == 403:
+                raise ServiceUnavailable('OpenShift auth failed')
+
+            raise ServiceUnavailable('OpenShift')
+
+        except IndexError as e:
+            logger.debug('we got no jobs...')
+
+            return []
+
+        return result
+
+    def _get_scheduled_validation_job(self, id):  # pragma: no cover
+        logger.debug('looking for validation id {}'.format(id))
+
+        _api = self._kube.batch_v1
+
+        try:
+            with kubernetes_api_call('list_jobs'):
+                _resp = _api.list_namespaced_job(
+                    namespace=THOTH_DEPENDENCY_MONKEY_NAMESPACE, include_uninitialized=True,
+                    label_selector='validation-id='+str(id),
+                    _request_timeout=self._kube.request_timeout)
+
+            if not _resp.items is None:
+                return _resp.items[0]
+        except IndexError as e:
+            # the Validation may be carried out by a batch Job
+            return self._get_scheduled_batch_validation_job(id)
+        except client.rest.ApiException as e:
+            logger.error(e)
+
+            if e.status == 403:
+                raise ServiceUnavailable('OpenShift auth failed')
+
+            raise ServiceUnavailable('OpenShift')
+
+        return None
+
+    def _get_scheduled_batch_validation_job(self, id):  # pragma: no cover
+        logger.debug('looking for batch carrying out validation id {}'.format(id))
+
+        try:
+            _resp = self._list_validation_jobs(label_selector='validation-batch')
+
+            for job in _resp.items or []:
+                if str(id) in [v['id'] for v in validations_of_job(job)]:
+                    return job
+        except client.rest.ApiException as e:
+            logger.error(e)
+
+            if e.status == 403:
+                raise ServiceUnavailable('OpenShift auth failed')
+
+            raise ServiceUnavailable('OpenShift')
+
+        logger.debug('we got no jobs...')
+
+        return None
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#   thoth-dependency-monkey
+#   Copyright(C) 2018 Christoph Görn
+#
+#   This program is free software: you can redistribute it and / or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Thoth: Dependency Monkey API"""
+
+import os
+import time
+import socket
+import logging
+import threading
+
+from .metrics import LEADER
+
+
+# the leader renews its lease every renew interval, another replica takes over once it was not renewed for the
+# lease duration
+LEADER_LEASE_DURATION = int(os.getenv('THOTH_DEPENDENCY_MONKEY_LEADER_LEASE_DURATION', 15))
+LEADER_RENEW_INTERVAL = float(os.getenv('THOTH_DEPENDENCY_MONKEY_LEADER_RENEW_INTERVAL', 5))
+# identifies this replica, by default the name of its Pod along with the process id
+LEADER_IDENTITY = os.getenv('THOTH_DEPENDENCY_MONKEY_LEADER_IDENTITY') or '{}-{}'.format(socket.gethostname(),
+                                                                                           os.getpid())
+
+logger = logging.getLogger(__file__)
+
+
+class LeaderElector():
+    """Elects one of the replicas sharing a Store to carry out background work.
+
+    Every `renew_interval` seconds each replica tries to acquire the lease `name`, the leader renews it. Once the
+    leader stopped renewing it, e.g. because it is gone, another replica takes over after `lease_duration` seconds.
+    A leader that did not renew its lease within `lease_duration` seconds does not consider itself the leader any
+    more, so there is at most one leader at a time. `on_started_leading` and `on_stopped_leading` are called
+    whenever this replica becomes the leader or stops being it.
+
+    With a Store that is not shared the only replica is the leader right from the start.
+    """
+
+    def __init__(self, store, name, identity=LEADER_IDENTITY, lease_duration=LEADER_LEASE_DURATION,
+                 renew_interval=LEADER_RENEW_INTERVAL, on_started_leading=None, on_stopped_leading=None):
+        self.name = name
+        self.identity = identity
+        self.lease_duration = lease_duration
+        self.renew_interval = renew_interval
+
+        self._store = store
+        self._on_started_leading = on_started_leading
+        self._on_stopped_leading = on_stopped_leading
+
+        self._lock = threading.Lock()
+        self._leading = False
+        # when the lease was last acquired or renewed
+        self._renewed = None
+
+        self._thread = None
+        self._stopped = threading.Event()
+
+        LEADER.labels(name).set_function(lambda: int(self.is_leader()))
+
+    def is_leader(self):
+        with self._lock:
+            return self._leading and time.monotonic() - self._renewed < self.lease_duration
+
+    def start(self):
+        """Take part in the election, calling this more than once is a no-op. The first attempt to acquire the
+        lease is made right away."""
+        with self._lock:
+            if self._thread is not None:
+                return
+
+            self._thread = threading.Thread(target=self._run, name='leader-{}'.format(self.name), daemon=True)
+
+        self.try_acquire()
+        self._thread.start()
+
+    def stop(self):
+        """Stop taking part in the election, give up the lease if this replica holds it."""
+        self._stopped.set()
+
+        try:
+            self._store.release(self.name, self.identity)
+        except Exception as e:
+            logger.error('leader election {}: {}'.format(self.name, e))
+
+        self._transition(False)
+
+    def _run(self):
+        while not self._stopped.wait(self.renew_interval):
+            self.try_acquire()
+
+    def try_acquire(self):
+        """Try to acquire or renew the lease, return whether this replica is the leader."""
+        _started = time.monotonic()
+
+        try:
+            _leading = self._store.acquire(self.name, self.identity, self.lease_duration)
+        except Exception as e:
+            logger.error('leader election {}: {}'.format(self.name, e))
+            _leading = False
+
+        if _leading:
+            with self._lock:
+                self._renewed = _started
+
+        self._transition(_leading)
+
+        return _leading
+
+    def _transition(self, leading):
+        with self._lock:
+            if leading == self._leading:
+                return
+
+            self._leading = leading
+
+        logger.info('leader election {}: {} {} the leader'.format(self.name, self.identity,
+                                                                  'is' if leading else 'is not'))
+
+        _callback = self._on_started_leading if leading else self._on_stopped_leading
+
+        if _callback is not None:
+            try:
+                _callback()
+            except Exception as e:
+                logger.error('leader election {}: {}'.format(self.name, e))
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#   thoth-dependency-monkey
+#   Copyright(C) 2018 Christoph Görn
+#
+#   This program is free software: you can redistribute it and / or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Thoth: Dependency Monkey API"""
+"""Thoth: Dependency Monkey API"""
+
+import time
+
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Gauge, Histogram
+
+
+# buckets of Validations, which take from seconds to many minutes
+VALIDATION_BUCKETS = (1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600, float('inf'))
+
+FLASK_REQUEST_LATENCY = Histogram('flask_request_latency_seconds', 'Flask Request Latency',
+                                  ['method', 'endpoint'])
+FLASK_REQUEST_COUNT = Counter('flask_request_count', 'Flask Request Count',
+                              ['method', 'endpoint', 'http_status'])
+
+KUBERNETES_API_LATENCY = Histogram('thoth_dependency_monkey_kubernetes_api_latency_seconds',
+                                   'Latency of calls to the Kubernetes API', ['operation'])
+KUBERNETES_API_ERRORS = Counter('thoth_dependency_monkey_kubernetes_api_errors_total',
+                                'Failed calls to the Kubernetes API', ['operation', 'status'])
+
+VALIDATION_QUEUE_SECONDS = Histogram('thoth_dependency_monkey_validation_queue_seconds',
+                                     'Seconds from requesting a Validation until it starts running',
+                                     ['executor'], buckets=VALIDATION_BUCKETS)
+VALIDATION_RUN_SECONDS = Histogram('thoth_dependency_monkey_validation_run_seconds',
+                                   'Seconds a Validation runs', ['executor'], buckets=VALIDATION_BUCKETS)
+VALIDATION_SECONDS = Histogram('thoth_dependency_monkey_validation_seconds',
+                               'Seconds from requesting a Validation until it finished', ['executor', 'phase'],
+                               buckets=VALIDATION_BUCKETS)
+VALIDATIONS = Gauge('thoth_dependency_monkey_validations', 'Validations (or Validation jobs) by phase',
+                    ['executor', 'phase'])
+VALIDATIONS_ARCHIVED = Counter('thoth_dependency_monkey_validations_archived_total',
+                               'Validations moved to the archive, their Jobs deleted')
+
+CACHE_LOOKUPS = Counter('thoth_dependency_monkey_cache_lookups_total', 'Lookups of in-memory caches',
+                        ['cache', 'result'])
+CACHE_HIT_RATIO = Gauge('thoth_dependency_monkey_cache_hit_ratio',
+                        'Share of lookups of an in-memory cache that were hits', ['cache'])
+CACHE_STALENESS = Gauge('thoth_dependency_monkey_cache_staleness_seconds',
+                        'Seconds since the in-memory cache was last known to be in sync with the cluster',
+                        ['cache'])
+
+LEADER = Gauge('thoth_dependency_monkey_leader',
+               'Whether this replica is the leader carrying out the background work, 1 if it is', ['election'])
+
+
+@contextmanager
+def kubernetes_api_call(operation):
+    """Measure a call to the Kubernetes API, a failing call is counted by the status of its ApiException."""
+    _started = time.monotonic()
+
+    try:
+        yield
+    except Exception as e:
+        KUBERNETES_API_ERRORS.labels(operation, str(getattr(e, 'status', None) or 'none')).inc()
+        raise
+    finally:
+        KUBERNETES_API_LATENCY.labels(operation).observe(time.monotonic() - _started)
+
+
+def observe_validation(executor, phase, created, started, finished):
+    """Observe the timings of a finished Validation, times are seconds since the epoch, started may be None."""
+    if started is not None:
+        VALIDATION_QUEUE_SECONDS.labels(executor).observe(max(started - created, 0))
+        VALIDATION_RUN_SECONDS.labels(executor).observe(max(finished - started, 0))
+
+    VALIDATION_SECONDS.labels(executor, phase).observe(max(finished - created, 0))
+
+
+class CacheStats():
+    """Counts hits and misses of an in-memory cache, exported as counters and as hit ratio."""
+
+    def __init__(self, name):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+
+        CACHE_HIT_RATIO.labels(name).set_function(self.hit_ratio)
+
+    def hit(self):
+        self.hits += 1
+        CACHE_LOOKUPS.labels(self.name, 'hit').inc()
+
+    def miss(self):
+        self.misses += 1
+        CACHE_LOOKUPS.labels(self.name, 'miss').inc()
+
+    def record(self, hit):
+        """Count a lookup, returns whether it was a hit."""
+        if hit:
+            self.hit()
+        else:
+            self.miss()
+
+        return hit
+
+    def hit_ratio(self):
+        _lookups = self.hits + self.misses
+
+        return self.hits / _lookups if _lookups else 0
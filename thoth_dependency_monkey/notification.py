@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#   thoth-dependency-monkey
+#   Copyright(C) 2018 Christoph Görn
+#
+#   This program is free software: you can redistribute it and / or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Thoth: Dependency Monkey API"""
+
+import os
+import json
+import time
+import queue
+import socket
+import logging
+import ipaddress
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from werkzeug.exceptions import BadRequest
+
+
+FINISHED_PHASES = ('succeeded', 'failed')
+
+# executors that cannot tell when a Validation changes its phase are asked every interval, for the Validations
+# someone waits for
+NOTIFICATION_POLL_INTERVAL = float(os.getenv('THOTH_DEPENDENCY_MONKEY_NOTIFICATION_POLL_INTERVAL', 5))
+# a client long-polling a Validation waits at most this many seconds
+NOTIFICATION_MAX_WAIT = int(os.getenv('THOTH_DEPENDENCY_MONKEY_NOTIFICATION_MAX_WAIT', 60))
+# a stream of events is closed after its timeout, a comment is sent on it after each heartbeat interval without events
+EVENT_STREAM_TIMEOUT = int(os.getenv('THOTH_DEPENDENCY_MONKEY_EVENT_STREAM_TIMEOUT', 3600))
+EVENT_HEARTBEAT_INTERVAL = float(os.getenv('THOTH_DEPENDENCY_MONKEY_EVENT_HEARTBEAT_INTERVAL', 15))
+WEBHOOK_TIMEOUT = int(os.getenv('THOTH_DEPENDENCY_MONKEY_WEBHOOK_TIMEOUT', 10))
+WEBHOOK_RETRIES = int(os.getenv('THOTH_DEPENDENCY_MONKEY_WEBHOOK_RETRIES', 3))
+# hosts callback URLs may point to, comma separated, `.example.com` allows all hosts within example.com. Without any
+# a callback URL may point to any host whose addresses are all public, not to services within the cluster
+WEBHOOK_ALLOWED_HOSTS = [host.strip().lower() for host in
+                         os.getenv('THOTH_DEPENDENCY_MONKEY_WEBHOOK_ALLOWED_HOSTS', '').split(',') if host.strip()]
+
+logger = logging.getLogger(__file__)
+
+
+def check_callback_url(url, allowed_hosts=None):
+    """Return a callback URL if it is an HTTP(S) URL of an allowed host, raise BadRequest otherwise. None is no
+    callback URL. If no hosts are allowed, by `allowed_hosts` or WEBHOOK_ALLOWED_HOSTS, any host is allowed whose
+    addresses are all public: no private, loopback or link-local ones."""
+    if url is None:
+        return None
+
+    _url = urllib.parse.urlsplit(url)
+
+    if _url.scheme.lower() not in ('http', 'https') or not _url.hostname:
+        raise BadRequest('callback_url must be an http or https URL')
+
+    _allowed = WEBHOOK_ALLOWED_HOSTS if allowed_hosts is None else allowed_hosts
+    _host = _url.hostname.lower()
+
+    if _allowed:
+        if not any(_host == host or (host.startswith('.') and _host.endswith(host)) for host in _allowed):
+            raise BadRequest('callback_url must point to one of the hosts {}'.format(', '.join(_allowed)))
+
+        return url
+
+    try:
+        _port = _url.port or (443 if _url.scheme.lower() == 'https' else 80)
+        _addresses = {info[4][0] for info in socket.getaddrinfo(_host, _port, proto=socket.IPPROTO_TCP)}
+    except (OSError, ValueError):
+        raise BadRequest('callback_url host {} cannot be resolved'.format(_host))
+
+    for address in _addresses:
+        _address = ipaddress.ip_address(address.split('%', 1)[0])
+
+        if not _address.is_global or _address.is_multicast:
+            raise BadRequest('callback_url must not point to a private, loopback or link-local address')
+
+    return url
+
+
+class _NoRedirects(urllib.request.HTTPRedirectHandler):
+    """Callback URLs are not followed elsewhere, where they were not checked."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_webhook_opener = urllib.request.build_opener(_NoRedirects)
+
+
+class Subscription():
+    """Phase transitions of the Validations with the given ids, of all Validations if `ids` is None."""
+
+    def __init__(self, notifier, ids=None):
+        self.ids = None if ids is None else set(ids)
+
+        self._notifier = notifier
+        self._queue = queue.Queue()
+
+    def get(self, timeout=None):
+        """Return the next transition as (id, phase), None if there was none within `timeout` seconds."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._notifier.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Notifier():
+    """Tells everyone waiting for Validations when their phase changes.
+
+    Transitions are published by the executor, from its watch of Validation jobs, once listen() was called with an
+    executor that is able to tell. Otherwise a background thread asks for the phase of each Validation someone
+    subscribed to, or registered a webhook for, every `poll_interval` seconds using `phase_func`.
+
+    Once a Validation finished its webhooks are called by another background thread: the Validation, as returned by
+    `describe_func`, is posted as JSON to each of them.
+    """
+
+    def __init__(self, phase_func, describe_func, poll_interval=NOTIFICATION_POLL_INTERVAL,
+                 webhook_timeout=WEBHOOK_TIMEOUT, webhook_retries=WEBHOOK_RETRIES):
+        self.poll_interval = poll_interval
+        self.webhook_timeout = webhook_timeout
+        self.webhook_retries = webhook_retries
+        self.listening = False
+
+        self._phase_func = phase_func
+        self._describe_func = describe_func
+
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+        # callback URLs by the id of the Validation they wait for
+        self._webhooks = {}
+        # last phase polled, by Validation id
+        self._phases = {}
+        # (id, url) of webhooks to be called
+        self._deliveries = queue.Queue()
+
+        self._poller = None
+        self._sender = None
+
+    def listen(self, executor):
+        """Have the executor publish transitions, return False if it cannot tell when they happen."""
+        self.listening = executor.add_listener(self.publish)
+
+        return self.listening
+
+    def publish(self, id, phase):
+        """Tell the subscribers of a Validation about its new phase, call its webhooks if it finished."""
+        with self._lock:
+            _subscriptions = [s for s in self._subscriptions if s.ids is None or id in s.ids]
+            _urls = self._webhooks.pop(id, []) if phase in FINISHED_PHASES else []
+
+        for subscription in _subscriptions:
+            subscription._queue.put((id, phase))
+
+        for url in _urls:
+            self._deliver(id, url)
+
+    def subscribe(self, ids=None):
+        """Subscribe to the transitions of the Validations with the given ids, to all transitions if None."""
+        if ids is None and not self.listening:
+            raise ValueError('transitions of all Validations cannot be told by polling')
+
+        _subscription = Subscription(self, ids)
+
+        with self._lock:
+            self._subscriptions.add(_subscription)
+
+        self._start_polling()
+
+        return _subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def add_webhook(self, id, url):
+        """Post the Validation to `url` once it finished."""
+        with self._lock:
+            self._webhooks.setdefault(id, []).append(url)
+
+        self._start_polling()
+
+    def _start_polling(self):
+        with self._lock:
+            if self.listening or self._poller is not None:
+                return
+
+            self._poller = threading.Thread(target=self._run_polling, name='notifier-poll', daemon=True)
+            self._poller.start()
+
+    def _run_polling(self):
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error('notifier: {}'.format(e))
+
+            time.sleep(self.poll_interval)
+
+    def poll(self):
+        """Ask for the phase of each Validation someone waits for, publish those that changed."""
+        with self._lock:
+            _ids = set(self._webhooks)
+
+            for subscription in self._subscriptions:
+                _ids.update(subscription.ids or ())
+
+            # Validations nobody waits for any more are forgotten
+            self._phases = {id: phase for id, phase in self._phases.items() if id in _ids}
+
+        for id in _ids:
+            _phase = self._phase_func(id)
+
+            if _phase is None:
+                continue
+
+            with self._lock:
+                _changed = _phase != self._phases.get(id)
+                self._phases[id] = _phase
+
+            if _changed:
+                self.publish(id, _phase)
+
+    def _deliver(self, id, url):
+        self._deliveries.put((id, url))
+
+        with self._lock:
+            if self._sender is not None:
+                return
+
+            self._sender = threading.Thread(target=self._run_webhooks, name='webhooks', daemon=True)
+            self._sender.start()
+
+    def _run_webhooks(self):
+        while True:
+            id, url = self._deliveries.get()
+
+            try:
+                self.call_webhook(id, url)
+            except Exception as e:
+                logger.error('webhook {} of validation {}: {}'.format(url, id, e))
+
+    def call_webhook(self, id, url):
+        """Post the Validation to `url`, retrying with backoff, return True if it was delivered."""
+        _body = json.dumps(self._describe_func(id), sort_keys=True).encode()
+
+        for attempt in range(self.webhook_retries + 1):
+            if attempt:
+                time.sleep(2 ** attempt)
+
+            _request = urllib.request.Request(url, data=_body, headers={'Content-Type': 'application/json'})
+
+            try:
+                # checked again, the host may resolve to other addresses by now
+                check_callback_url(url)
+
+                with _webhook_opener.open(_request, timeout=self.webhook_timeout):
+                    return True
+            except BadRequest as e:
+                logger.error('webhook {} of validation {} refused: {}'.format(url, id, e.description))
+
+                return False
+            except (OSError, ValueError) as e:
+                logger.debug('webhook {} of validation {} failed: {}'.format(url, id, e))
+
+        logger.error('webhook {} of validation {} failed {} times, giving up'.format(
+            url, id, self.webhook_retries + 1))
+
+        return False
@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#   thoth-dependency-monkey
+#   Copyright(C) 2018 Christoph Görn
+#
+#   This program is free software: you can redistribute it and / or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Thoth: Dependency Monkey API"""
+
+import os
+import time
+import logging
+import threading
+
+from werkzeug.exceptions import Conflict
+
+from .scheduler import QueueFullError
+
+
+# replicas of the API Service share a store: the one elected leader keeps the watches, archives finished Jobs and
+# creates the queued ones. It tells the others about each Validation it queued, or whose Job is pending or running,
+# by id, and publishes the transitions its watch tells. The others hand the Validations submitted to them, and the
+# queued ones deleted, to the leader by queues.
+SHARED_VALIDATION_KEY = 'validation/{}'
+SHARED_VALIDATION_TTL = 7 * 24 * 3600
+SUBMISSIONS_QUEUE = 'submissions'
+DELETIONS_QUEUE = 'deletions'
+TRANSITIONS_CHANNEL = 'transitions'
+# finished Validations deleted by any replica, the others may still remember them
+DELETED_VALIDATION_KEY = 'deleted/{}'
+# the usage() of the leader's Scheduler, so the others can tell whether there is room for more
+SCHEDULER_USAGE_KEY = 'scheduler-usage'
+# seconds between looking for Validations handed to the leader
+STORE_POLL_INTERVAL = float(os.getenv('THOTH_DEPENDENCY_MONKEY_STORE_POLL_INTERVAL', 1))
+
+logger = logging.getLogger(__file__)
+
+
+class Replication():
+    """Shares the work of the leader with the other replicas of the API Service, through the Store they share.
+
+    Validations handed to the leader are queued by it with `scheduler`, the queued ones deleted are deleted by it
+    with `delete_func`; once started, the leader takes them every `poll_interval` seconds, `leading_func` tells
+    whether this replica is the leader. The other replicas read the transitions the leader publishes as often.
+    With a Store that is not shared there are no other replicas, nothing is shared.
+    """
+
+    def __init__(self, store, scheduler, leading_func, delete_func, poll_interval=STORE_POLL_INTERVAL):
+        self.shared = store.shared
+        self.poll_interval = poll_interval
+
+        self._store = store
+        self._scheduler = scheduler
+        self._leading_func = leading_func
+        self._delete_func = delete_func
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._follower = None
+
+    def share(self, validations, phase, version):
+        """Tell the other replicas about Validations queued together (`version` queued), or carried out by one Job
+        (`version` is its resourceVersion). Each has an id, a stack specification and an ecosystem."""
+        if not self.shared:
+            return
+
+        for v in validations:
+            self._store.put(SHARED_VALIDATION_KEY.format(v['id']),
+                            {'stack_specification': v['stack_specification'], 'ecosystem': v['ecosystem'],
+                             'phase': phase, 'version': version, 'batch': len(validations) > 1},
+                            ttl=SHARED_VALIDATION_TTL)
+
+    def unshare(self, ids):
+        """Stop telling the other replicas about Validations, their Job finished or is gone: they are told by the
+        archive, or by the Job."""
+        if not self.shared:
+            return
+
+        for id in ids:
+            self._store.delete(SHARED_VALIDATION_KEY.format(id))
+
+    def get(self, id):
+        """Return what the leader told about a Validation it queued, or whose Job is pending or running. None if it
+        told nothing, or if this replica is the leader."""
+        if not self.shared or self._leading_func():
+            return None
+
+        return self._store.get(SHARED_VALIDATION_KEY.format(id))
+
+    def get_handed(self, id):
+        """Return what a replica told about a Validation it handed to the leader, which did not queue it yet."""
+        if not self.shared:
+            return None
+
+        _shared = self._store.get(SHARED_VALIDATION_KEY.format(id))
+
+        return _shared if _shared is not None and _shared['version'] == 'queued' else None
+
+    def tell_deleted(self, id):
+        """Tell the other replicas a finished Validation was deleted, they forget what they remember of it."""
+        if self.shared:
+            self._store.put(DELETED_VALIDATION_KEY.format(id), True)
+
+    def deleted(self, id):
+        """Return whether a finished Validation was deleted by any replica."""
+        return self.shared and self._store.get(DELETED_VALIDATION_KEY.format(id)) is not None
+
+    def publish_transition(self, id, phase):
+        """Tell the other replicas about a Validation changing its phase, as told by the watch of the leader."""
+        if self.shared:
+            self._store.publish(TRANSITIONS_CHANNEL, {'id': id, 'phase': phase})
+
+    def follow_transitions(self, listener):
+        """Have `listener` called with the id and the new phase of each Validation changing its phase, as published
+        by the leader, while this replica is not the leader. Calling this more than once is a no-op."""
+        with self._lock:
+            if not self.shared or self._follower is not None:
+                return
+
+            # transitions published from now on
+            _, _position = self._store.published(TRANSITIONS_CHANNEL)
+
+            self._follower = threading.Thread(target=self._follow, args=(listener, _position), name='transitions',
+                                              daemon=True)
+            self._follower.start()
+
+    def _follow(self, listener, position):
+        while True:
+            time.sleep(self.poll_interval)
+
+            try:
+                _transitions, position = self._store.published(TRANSITIONS_CHANNEL, position)
+
+                # the leader tells its own listeners
+                if self._leading_func():
+                    continue
+
+                for transition in _transitions:
+                    listener(transition['id'], transition['phase'])
+            except Exception as e:
+                logger.error('transitions: {}'.format(e))
+
+    def hand_over(self, chunks, client, priority):
+        """Hand Validations to the leader, each chunk is queued as one entry, raise QueueFullError if the queue of
+        the leader has no room for them."""
+        # as the leader last told, Validations handed to it but not queued yet count as well
+        _usage = self._store.get(SCHEDULER_USAGE_KEY) or {'total': 0, 'bulk': 0, 'clients': {}}
+        _usage['total'] += self._store.size(SUBMISSIONS_QUEUE)
+
+        self._scheduler.ensure_room(len(chunks), client, priority, usage=_usage)
+
+        for chunk in chunks:
+            self.share(chunk, 'pending', 'queued')
+
+        for chunk in chunks:
+            self._store.push(SUBMISSIONS_QUEUE, {'work': chunk, 'client': client, 'priority': priority})
+
+    def hand_deletion(self, id):
+        """Have the leader delete a Validation it queued."""
+        self.unshare([id])
+        self._store.push(DELETIONS_QUEUE, str(id))
+
+    def hand_back(self):
+        """Hand the Validations queued by this replica to the next leader, it stopped leading."""
+        for entry in self._scheduler.queued():
+            try:
+                self._store.push(SUBMISSIONS_QUEUE, {'work': entry['work'], 'client': entry['client'],
+                                                     'priority': entry['priority']})
+            except Exception as e:  # they are created once this replica is the leader again
+                logger.error('handing queued validations {} to the leader failed: {}'.format(entry['ids'], e))
+                continue
+
+            self._scheduler.remove(entry['ids'][0])
+
+    def start(self):
+        """Take the Validations handed to the leader in a background thread, calling this more than once is a
+        no-op."""
+        with self._lock:
+            if self._thread is not None:
+                return
+
+            self._thread = threading.Thread(target=self._run, name='intake', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval)
+
+            if not self._leading_func():
+                continue
+
+            try:
+                self.take_handed_validations()
+            except Exception as e:
+                logger.error('intake: {}'.format(e))
+
+    def take_handed_validations(self):
+        """Queue the Validations the other replicas handed to the leader, delete the queued ones they deleted.
+        Returns the number of Validations queued."""
+        _queued = 0
+
+        while True:
+            # taken off the queue once queued, it stays first in line while there is no room for it
+            _submission = self._store.peek(SUBMISSIONS_QUEUE)
+
+            if _submission is None:
+                break
+
+            try:
+                self._scheduler.enqueue([v['id'] for v in _submission['work']], _submission['work'],
+                                        _submission['client'], _submission['priority'], admitted=True)
+                _queued += len(_submission['work'])
+            except QueueFullError:
+                break
+            except Exception as e:  # it would be first in line forever
+                logger.error('queueing handed validations {} failed: {}'.format(
+                    [v['id'] for v in _submission['work']], e))
+
+            self._store.pop(SUBMISSIONS_QUEUE)
+
+        while True:
+            _id = self._store.pop(DELETIONS_QUEUE)
+
+            if _id is None:
+                break
+
+            try:
+                self._delete_func(_id)
+            except Conflict as e:
+                logger.error(e.description)
+
+        self._store.put(SCHEDULER_USAGE_KEY, self._scheduler.usage())
+
+        return _queued
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#   thoth-dependency-monkey
+#   Copyright(C) 2018 Christoph Görn
+#
+#   This program is free software: you can redistribute it and / or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Thoth: Dependency Monkey API"""
+"""Thoth: Dependency Monkey API"""
+
+import json
+import logging
+
+
+# the validator ends the output of each Validation with this tag, followed by the result record as JSON
+RESULT_TAG = '### thoth-dependency-monkey result '
+
+# failure classes of the result record
+FAILURE_SPEC_PARSE_ERROR = 'spec_parse_error'
+FAILURE_DISTRIBUTION_NOT_FOUND = 'distribution_not_found'
+FAILURE_RESOLUTION_ERROR = 'resolution_error'
+
+logger = logging.getLogger(__file__)
+
+
+def parse_result(log):
+    """Return the result record of the last tagged line within a validator log, None if there is none."""
+    _index = log.rfind(RESULT_TAG)
+
+    if _index < 0:
+        return _legacy_result(log)
+
+    _line = log[_index + len(RESULT_TAG):].split('\n', 1)[0]
+
+    try:
+        return json.loads(_line)
+    except ValueError as e:
+        logger.error('could not parse result record: {}'.format(e))
+
+        return None
+
+
+def parse_termination_message(message, id=None):
+    """Return the result record within a termination message.
+
+    The validator writes a single record, or, for a batch, a JSON object keyed by Validation id. A record
+    that had to be shortened to fit the message lacks its pins. None if the message does not hold a record.
+    """
+    if not message:
+        return None
+
+    try:
+        _record = json.loads(message)
+    except ValueError:
+        return None
+
+    if id is not None and 'valid' not in _record:
+        _record = _record.get(str(id))
+
+    if not isinstance(_record, dict) or 'pins' not in _record:
+        return None
+
+    return _record
+
+
+def _legacy_result(log):
+    """Derive a result record from the log of a validator that predates result records."""
+    if 'No matching distribution found' in log or 'one package and the specified version could not be found' in log:
+        _failure = FAILURE_DISTRIBUTION_NOT_FOUND
+    elif 'most probably a syntax error in the spec' in log:
+        _failure = FAILURE_SPEC_PARSE_ERROR
+    else:
+        _failure = None
+
+    return {'valid': _failure is None, 'failure': _failure, 'pins': None, 'timings': None}
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#   thoth-dependency-monkey
+#   Copyright(C) 2018 Christoph Görn
+#
+#   This program is free software: you can redistribute it and / or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Thoth: Dependency Monkey API"""
+
+import os
+import time
+import logging
+import threading
+
+from .metrics import VALIDATIONS_ARCHIVED
+
+
+# Validation jobs finished longer ago than this are moved to the archive, and deleted with their Pods; 0 keeps them
+RETENTION_TTL = int(os.getenv('THOTH_DEPENDENCY_MONKEY_RETENTION_TTL', 0))
+RETENTION_INTERVAL = int(os.getenv('THOTH_DEPENDENCY_MONKEY_RETENTION_INTERVAL', 300))
+
+logger = logging.getLogger(__file__)
+
+
+class Retention():
+    """Moves the Validations of Jobs finished more than `ttl` seconds ago to the archive, and deletes the Jobs.
+
+    `jobs_func` returns all Validation jobs, `finished_func` when a Job finished (seconds since the epoch, None if it
+    has not), `archive_func` records the Validations of a Job in the archive, with their result and log, deletes the
+    Job and returns the number of Validations archived. Once started, this is done every `interval` seconds while
+    `leading_func` tells this replica carries out the background work. A `ttl` of 0 keeps all Jobs.
+    """
+
+    def __init__(self, jobs_func, finished_func, archive_func, leading_func, ttl=RETENTION_TTL,
+                 interval=RETENTION_INTERVAL):
+        self.ttl = ttl
+        self.interval = interval
+
+        self._jobs_func = jobs_func
+        self._finished_func = finished_func
+        self._archive_func = archive_func
+        self._leading_func = leading_func
+
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def archive_finished_jobs(self):
+        """Archive and delete the Jobs finished more than `ttl` seconds ago, return the number of Jobs deleted."""
+        _expired = time.time() - self.ttl
+        _deleted = 0
+
+        for job in self._jobs_func():
+            _finished = self._finished_func(job)
+
+            if _finished is None or _finished > _expired:
+                continue
+
+            try:
+                _archived = self._archive_func(job)
+            except Exception as e:  # the next round gives it another chance
+                logger.error('archiving job {} failed: {}'.format(job.metadata.name, e))
+                continue
+
+            VALIDATIONS_ARCHIVED.inc(_archived)
+            _deleted += 1
+
+        return _deleted
+
+    def start(self):
+        """Archive finished Jobs in a background thread, calling this more than once, or with a `ttl` of 0, is a
+        no-op."""
+        with self._lock:
+            if self.ttl <= 0 or self._thread is not None:
+                return
+
+            self._thread = threading.Thread(target=self._run, name='retention', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+
+            if not self._leading_func():
+                continue
+
+            try:
+                _deleted = self.archive_finished_jobs()
+
+                if _deleted:
+                    logger.info('archived and deleted {} finished jobs'.format(_deleted))
+            except Exception as e:
+                logger.error('retention: {}'.format(e))
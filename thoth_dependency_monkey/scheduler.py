@@ -0,0 +1,307 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#   thoth-dependency-monkey
+#   Copyright(C) 2018 Christoph Görn
+#
+#   This program is free software: you can redistribute it and / or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Thoth: Dependency Monkey API"""
+
+import os
+import time
+import logging
+import threading
+
+from collections import OrderedDict, deque
+
+from werkzeug.exceptions import TooManyRequests
+
+
+# interactive requests are always dispatched before bulk ones
+PRIORITIES = ('interactive', 'bulk')
+
+SCHEDULER_MAX_RUNNING = int(os.getenv('THOTH_DEPENDENCY_MONKEY_SCHEDULER_MAX_RUNNING', 100))
+SCHEDULER_MAX_QUEUED = int(os.getenv('THOTH_DEPENDENCY_MONKEY_SCHEDULER_MAX_QUEUED', 10000))
+SCHEDULER_MAX_QUEUED_PER_CLIENT = int(os.getenv('THOTH_DEPENDENCY_MONKEY_SCHEDULER_MAX_QUEUED_PER_CLIENT', 1000))
+# room of the queue only interactive work may take
+SCHEDULER_INTERACTIVE_RESERVE = int(os.getenv('THOTH_DEPENDENCY_MONKEY_SCHEDULER_INTERACTIVE_RESERVE', 1000))
+SCHEDULER_INTERVAL = int(os.getenv('THOTH_DEPENDENCY_MONKEY_SCHEDULER_INTERVAL', 10))
+SCHEDULER_RETRY_AFTER = int(os.getenv('THOTH_DEPENDENCY_MONKEY_SCHEDULER_RETRY_AFTER', 60))
+
+logger = logging.getLogger(__file__)
+
+
+class QueueFullError(TooManyRequests):
+    """Exception raised if the queue of a Scheduler has no room for more work.
+
+    Attributes:
+        retry_after -- seconds after which the client may try again, sent as Retry-After header
+    """
+
+    def __init__(self, retry_after):
+        super().__init__('too many Validations are waiting to be scheduled, try again later')
+
+        self.retry_after = retry_after
+
+    def get_headers(self, environ=None):
+        return super().get_headers(environ) + [('Retry-After', str(self.retry_after))]
+
+
+class Scheduler():
+    """A bounded queue in front of something that starts work, like the creation of Validation jobs.
+
+    Work is queued by client and priority: all interactive work is dispatched before bulk work, within a
+    priority the clients take turns. Work is dispatched as long as `running_func` reports fewer than
+    `max_running` units of work running. `dispatch_func` is called with the work of an entry, if it fails the
+    entry is put back in front of its queue and retried later.
+
+    Dispatching happens right away when work is enqueued, on wakeup() and every `interval` seconds.
+
+    At most `max_queued` entries are queued, at most `max_queued_per_client` of them by one client, and bulk work
+    leaves `interactive_reserve` of the room to interactive work, so that no client keeps others from queueing.
+    """
+
+    def __init__(self, name, dispatch_func, running_func, max_running=SCHEDULER_MAX_RUNNING,
+                 max_queued=SCHEDULER_MAX_QUEUED, max_queued_per_client=SCHEDULER_MAX_QUEUED_PER_CLIENT,
+                 interactive_reserve=SCHEDULER_INTERACTIVE_RESERVE, interval=SCHEDULER_INTERVAL,
+                 retry_after=SCHEDULER_RETRY_AFTER):
+        self.name = name
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.max_queued_per_client = max_queued_per_client
+        self.interactive_reserve = interactive_reserve
+        self.interval = interval
+        self.retry_after = retry_after
+
+        self._dispatch_func = dispatch_func
+        self._running_func = running_func
+
+        self._lock = threading.RLock()
+        self._dispatching = threading.Lock()
+        # by priority, the queued entries of each client, the client to be served next comes first
+        self._queues = {priority: OrderedDict() for priority in PRIORITIES}
+        # entries by the ids of their Validations
+        self._entries = {}
+        self._size = 0
+
+        self._thread = None
+        self._wakeup = threading.Event()
+
+    def __len__(self):
+        with self._lock:
+            return self._size
+
+    def usage(self):
+        """Return the number of queued entries, in total, of bulk priority and by client."""
+        with self._lock:
+            _clients = {}
+
+            for priority in PRIORITIES:
+                for client, queue in self._queues[priority].items():
+                    _clients[client] = _clients.get(client, 0) + len(queue)
+
+            return {'total': self._size, 'bulk': sum(len(queue) for queue in self._queues['bulk'].values()),
+                    'clients': _clients}
+
+    def ensure_room(self, entries, client=None, priority='interactive', usage=None):
+        """Raise QueueFullError if there is no room for this many more entries of a client and priority.
+
+        `usage` is the usage() of the queue to check, that of this Scheduler by default.
+        """
+        with self._lock:
+            usage = usage or self.usage()
+
+            if usage['total'] + entries > self.max_queued - (self.interactive_reserve if priority == 'bulk' else 0):
+                raise QueueFullError(self.retry_after)
+
+            if usage['clients'].get(client, 0) + entries > self.max_queued_per_client:
+                raise QueueFullError(self.retry_after)
+
+    def enqueue(self, ids, work, client, priority='interactive', admitted=False):
+        """Queue work carrying out the Validations with the given ids, raise QueueFullError if there is no room.
+
+        Work `admitted` by the ensure_room() of another replica is only refused if the queue is full.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError('unknown priority {}'.format(priority))
+
+        _entry = {'ids': list(ids), 'work': work, 'client': client, 'priority': priority, 'enqueued': time.time()}
+
+        with self._lock:
+            if admitted and self._size >= self.max_queued:
+                raise QueueFullError(self.retry_after)
+
+            if not admitted:
+                self.ensure_room(1, client, priority)
+
+            self._queues[priority].setdefault(client, deque()).append(_entry)
+            self._size += 1
+
+            for id in _entry['ids']:
+                self._entries[id] = _entry
+
+        self.start()
+        self.dispatch()
+
+    def get(self, id):
+        """Return the work, enqueued time and position (1 is next) of a queued Validation, None if it is not queued."""
+        with self._lock:
+            _entry = self._entries.get(id)
+
+            if _entry is None:
+                return None
+
+            for position, entry in enumerate(self._order(), 1):
+                if entry is _entry:
+                    return {'work': _entry['work'], 'enqueued': _entry['enqueued'], 'position': position}
+
+    def remove(self, id):
+        """Remove the queued entry carrying out the Validation with the given id, return False if there is none."""
+        with self._lock:
+            _entry = self._entries.get(id)
+
+            if _entry is None:
+                return False
+
+            _queues = self._queues[_entry['priority']]
+            _queues[_entry['client']].remove(_entry)
+
+            if not _queues[_entry['client']]:
+                del _queues[_entry['client']]
+
+            self._size -= 1
+
+            for id in _entry['ids']:
+                self._entries.pop(id, None)
+
+            return True
+
+    def queued(self):
+        """Return the work, enqueued time, ids, client and priority of all queued entries, in the order they will
+        be dispatched."""
+        with self._lock:
+            return [{'work': entry['work'], 'enqueued': entry['enqueued'], 'ids': entry['ids'],
+                     'client': entry['client'], 'priority': entry['priority']}
+                    for entry in self._order()]
+
+    def _order(self):
+        """Yield the queued entries in the order they will be dispatched, clients taking turns within a priority."""
+        for priority in PRIORITIES:
+            _queues = list(self._queues[priority].values())
+            _turn = 0
+
+            while _queues:
+                for queue in _queues:
+                    if _turn < len(queue):
+                        yield queue[_turn]
+
+                _turn += 1
+                _queues = [queue for queue in _queues if _turn < len(queue)]
+
+    def _pop(self):
+        with self._lock:
+            for priority in PRIORITIES:
+                if not self._queues[priority]:
+                    continue
+
+                _client, _queue = self._queues[priority].popitem(last=False)
+                _entry = _queue.popleft()
+
+                # the client goes to the back of the line, if it has more work queued
+                if _queue:
+                    self._queues[priority][_client] = _queue
+
+                self._size -= 1
+
+                for id in _entry['ids']:
+                    self._entries.pop(id, None)
+
+                return _entry
+
+        return None
+
+    def _push_back(self, entry):
+        """Put an entry that failed to be dispatched back in front of its client's queue, the client is next."""
+        with self._lock:
+            _queues = self._queues[entry['priority']]
+
+            _queues.setdefault(entry['client'], deque()).appendleft(entry)
+            _queues.move_to_end(entry['client'], last=False)
+            self._size += 1
+
+            for id in entry['ids']:
+                self._entries[id] = entry
+
+    def dispatch(self):
+        """Dispatch queued work while there is capacity, return the number of entries dispatched."""
+        # one caller dispatches at a time, so that capacity is not handed out twice
+        if not self._dispatching.acquire(blocking=False):
+            self.wakeup()
+            return 0
+
+        _dispatched = 0
+
+        try:
+            if not len(self):
+                return 0
+
+            try:
+                _capacity = self.max_running - self._running_func()
+            except Exception as e:
+                logger.error('{}: cannot tell how much work is running, retrying later: {}'.format(self.name, e))
+                return 0
+
+            while _capacity > 0:
+                _entry = self._pop()
+
+                if _entry is None:
+                    break
+
+                try:
+                    self._dispatch_func(_entry['work'])
+                except Exception as e:
+                    logger.error('{}: dispatching {} failed, retrying later: {}'.format(self.name, _entry['ids'], e))
+
+                    self._push_back(_entry)
+                    break
+
+                _capacity -= 1
+                _dispatched += 1
+        finally:
+            self._dispatching.release()
+
+        return _dispatched
+
+    def wakeup(self):
+        """Have the background thread dispatch queued work, e.g. because some work finished."""
+        self._wakeup.set()
+
+    def start(self):
+        """Start dispatching in a background thread, calling this more than once is a no-op."""
+        with self._lock:
+            if self._thread is not None:
+                return
+
+            self._thread = threading.Thread(target=self._run, name='scheduler-{}'.format(self.name), daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+            try:
+                self.dispatch()
+            except Exception as e:
+                logger.error('{}: {}'.format(self.name, e))
@@ -0,0 +1,461 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#   thoth-dependency-monkey
+#   Copyright(C) 2018 Christoph Görn
+#
+#   This program is free software: you can redistribute it and / or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Thoth: Dependency Monkey API"""
+
+import os
+import re
+import hashlib
+
+from functools import lru_cache
+
+from werkzeug.exceptions import BadRequest
+
+
+COMMENT_RE = re.compile(r'(^|\s+)#.*$')
+COMMENT_LINE_RE = re.compile(r'^\s*#')
+WHITESPACE_RE = re.compile(r'\s+')
+NAME_RE = re.compile(r'^([A-Za-z0-9][A-Za-z0-9._-]*)(\[[^\]]*\])?(.*)$')
+NAME_SEPARATOR_RE = re.compile(r'[-_.]+')
+
+REQUIREMENT_CACHE_SIZE = int(os.getenv('THOTH_DEPENDENCY_MONKEY_REQUIREMENT_CACHE_SIZE', 16384))
+
+# options pip accepts within a requirements file, those taking a value map to True
+REQUIREMENTS_FILE_OPTIONS = {
+    '-i': True, '--index-url': True, '--extra-index-url': True, '--no-index': False,
+    '-f': True, '--find-links': True, '--pre': False, '--trusted-host': True,
+    '--no-binary': True, '--only-binary': True, '-e': True, '--editable': True
+}
+# options naming a requirement
+EDITABLE_OPTIONS = ('-e', '--editable')
+# options pip accepts after a requirement
+REQUIREMENT_OPTIONS = ('--hash', '--install-option', '--global-option')
+
+PACKAGE_NAME_RE = re.compile(r'[A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?')
+EXTRAS_RE = re.compile(r'\[\s*([A-Za-z0-9][A-Za-z0-9._-]*(?:\s*,\s*[A-Za-z0-9][A-Za-z0-9._-]*)*)?\s*\]')
+VERSION_OPERATOR_RE = re.compile(r'===|~=|==|!=|<=|>=|<|>')
+VERSION_RE = re.compile(
+    r'v?(?:\d+!)?\d+(?:\.\d+)*'
+    r'(?:[-_.]?(?:a|b|c|rc|alpha|beta|pre|preview)[-_.]?\d*)?'
+    r'(?:-\d+|[-_.]?(?:post|rev|r)[-_.]?\d*)?'
+    r'(?:[-_.]?dev[-_.]?\d*)?'
+    r'(?:\+[a-z0-9]+(?:[-_.][a-z0-9]+)*)?', re.IGNORECASE)
+ARBITRARY_VERSION_RE = re.compile(r'[^\s;,)]+')
+URL_RE = re.compile(r'[A-Za-z][A-Za-z0-9+.-]*://\S+')
+
+MARKER_VARIABLES = ('python_version', 'python_full_version', 'os_name', 'sys_platform', 'platform_release',
+                    'platform_system', 'platform_version', 'platform_machine', 'platform_python_implementation',
+                    'implementation_name', 'implementation_version', 'extra')
+MARKER_TOKEN_RE = re.compile(r"""\s*(?:(?P<string>'[^']*'|"[^"]*")|(?P<op>===|==|!=|<=|>=|~=|<|>|not\s+in\b|in\b)|"""
+                             r"""(?P<bool>and\b|or\b)|(?P<paren>[()])|(?P<variable>[A-Za-z_][A-Za-z0-9_.]*))""")
+
+
+class SpecificationSyntaxError(BadRequest):
+    """Exception raised if a stack specification is malformed.
+
+    Attributes:
+        errors -- list of dicts with line, column (both counting from 1) and message of each error
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+
+        super().__init__('stack specification is malformed: ' + '; '.join(
+            'line {line}, column {column}: {message}'.format(**error) for error in errors))
+
+
+class _RequirementSyntaxError(Exception):
+    def __init__(self, column, message):
+        self.column = column
+        self.message = message
+
+
+def split_specification(spec):
+    """Split a stack specification into lines, newlines may be escaped as they are within the API."""
+    return spec.replace('\\n', '\n').splitlines()
+
+
+def join_continuations(lines):
+    """Join lines continued by a trailing backslash the way pip does, yield the number of the first line and the line.
+
+    A comment line ends a continuation, as it does for pip.
+    """
+    _number, _continued = None, []
+
+    for number, line in enumerate(lines, 1):
+        line = line.rstrip('\r\n')
+
+        if line.endswith('\\') and not COMMENT_LINE_RE.match(line):
+            if not _continued:
+                _number = number
+
+            _continued.append(line.rstrip('\\'))
+            continue
+
+        if not _continued:
+            yield number, line
+            continue
+
+        _continued.append(' ' + line if COMMENT_LINE_RE.match(line) else line)
+
+        yield _number, ''.join(_continued)
+
+        _continued = []
+
+    if _continued:
+        yield _number, ''.join(_continued)
+
+
+def canonical_name(name):
+    """Canonical form of a package name as of PEP 503."""
+    return NAME_SEPARATOR_RE.sub('-', name).lower()
+
+
+def normalize_requirement(line):
+    """Return the canonical form of one line of a stack specification, or None if the line has no content."""
+    line = COMMENT_RE.sub('', line).strip()
+
+    if not line:
+        return None
+
+    # options like --index-url or -e are kept as they are
+    if line.startswith('-'):
+        return WHITESPACE_RE.sub(' ', line)
+
+    requirement, _, marker = line.partition(';')
+    requirement = WHITESPACE_RE.sub('', requirement)
+
+    match = NAME_RE.match(requirement)
+
+    if match is None:
+        return WHITESPACE_RE.sub(' ', line)
+
+    name, extras, specifiers = match.groups()
+
+    requirement = canonical_name(name)
+
+    if extras:
+        requirement += '[{}]'.format(','.join(sorted(canonical_name(e) for e in extras[1:-1].split(',') if e)))
+
+    if specifiers:
+        requirement += ','.join(sorted(s for s in specifiers.split(',') if s))
+
+    marker = WHITESPACE_RE.sub(' ', marker).strip()
+
+    if marker:
+        requirement += '; ' + marker
+
+    return requirement
+
+
+def normalize_specification(spec):
+    """Return the canonical form of a stack specification: without comments, one canonical requirement per line,
+    sorted."""
+    requirements = set()
+
+    for line in split_specification(spec):
+        requirement = normalize_requirement(line)
+
+        if requirement is not None:
+            requirements.add(requirement)
+
+    return '\n'.join(sorted(requirements))
+
+
+def specification_size(spec):
+    """Number of requirements of a stack specification, options other than -e do not count."""
+    return len([line for line in normalize_specification(spec).splitlines()
+                if not line.startswith('-') or re.split(r'[\s=]', line, 1)[0] in EDITABLE_OPTIONS])
+
+
+def specification_errors(lines):
+    """Check a stack specification line by line, yield a dict with line, column and message for each error.
+
+    `lines` is a stack specification as a string, with newlines that may be escaped as they are within
+    the API, or any iterable of lines such as a file. Lines continued by a backslash are checked as one,
+    errors within them are reported at their first line.
+    """
+    if isinstance(lines, str):
+        lines = split_specification(lines)
+
+    _requirements, _errors = 0, 0
+
+    for number, line in join_continuations(lines):
+        error = check_requirement(line)
+
+        if error is None:
+            continue
+
+        if error is True:
+            _requirements += 1
+            continue
+
+        _errors += 1
+
+        yield {'line': number, 'column': error[0], 'message': error[1]}
+
+    if _requirements == 0 and _errors == 0:
+        yield {'line': 1, 'column': 1, 'message': 'stack specification has no requirements'}
+
+
+def check_specification(spec):
+    """Raise SpecificationSyntaxError listing all errors of a malformed stack specification."""
+    errors = list(specification_errors(spec))
+
+    if errors:
+        raise SpecificationSyntaxError(errors)
+
+
+@lru_cache(maxsize=REQUIREMENT_CACHE_SIZE)
+def check_requirement(line):
+    """Check one line of a stack specification.
+
+    Returns True for a requirement (including an editable one given by -e), None for a line without one
+    (blank, comment or other option), and a tuple of column and message for a malformed line.
+    """
+    content = COMMENT_RE.sub('', line).rstrip()
+    _start = len(content) - len(content.lstrip())
+
+    if not content.strip():
+        return None
+
+    try:
+        if content.lstrip().startswith('-'):
+            return True if _check_option(content, _start) in EDITABLE_OPTIONS else None
+
+        _check_requirement(content, _start)
+    except _RequirementSyntaxError as e:
+        return (e.column + 1, e.message)
+
+    return True
+
+
+def _skip_whitespace(line, position):
+    while position < len(line) and line[position].isspace():
+        position += 1
+
+    return position
+
+
+def _check_option(line, position):
+    option, _, value = line[position:].partition('=') if '=' in line[position:].split(' ', 1)[0] \
+        else line[position:].partition(' ')
+
+    if option not in REQUIREMENTS_FILE_OPTIONS:
+        raise _RequirementSyntaxError(position, 'unknown option {}'.format(option))
+
+    if REQUIREMENTS_FILE_OPTIONS[option] and not value.strip():
+        raise _RequirementSyntaxError(position + len(option), 'option {} requires a value'.format(option))
+
+    if not REQUIREMENTS_FILE_OPTIONS[option] and value.strip():
+        raise _RequirementSyntaxError(position + len(option), 'option {} takes no value'.format(option))
+
+    return option
+
+
+def _check_requirement(line, position):
+    # a URL like git+https://github.com/org/project#egg=project
+    match = URL_RE.match(line, position)
+
+    if match is not None:
+        if '#egg=' not in match.group(0):
+            raise _RequirementSyntaxError(position, 'a URL requirement needs an #egg= fragment naming the package')
+
+        position = match.end()
+    else:
+        match = PACKAGE_NAME_RE.match(line, position)
+
+        if match is None:
+            raise _RequirementSyntaxError(position, 'expected a package name')
+
+        position = _skip_whitespace(line, match.end())
+
+        match = EXTRAS_RE.match(line, position)
+
+        if position < len(line) and line[position] == '[' and match is None:
+            raise _RequirementSyntaxError(position, 'malformed extras')
+
+        if match is not None:
+            position = _skip_whitespace(line, match.end())
+
+        if position < len(line) and line[position] == '@':
+            position = _skip_whitespace(line, position + 1)
+            match = URL_RE.match(line, position)
+
+            if match is None:
+                raise _RequirementSyntaxError(position, 'expected a URL')
+
+            position = match.end()
+        else:
+            position = _check_version_specifiers(line, position)
+
+    position = _skip_whitespace(line, position)
+
+    if position < len(line) and line[position] == ';':
+        position = _check_marker(line, position + 1)
+
+    position = _skip_whitespace(line, position)
+
+    # per requirement options, like --hash, all of them take a value given after = or whitespace
+    while position < len(line) and line.startswith('--', position):
+        option = line[position:].split(None, 1)[0]
+
+        if option.split('=', 1)[0] not in REQUIREMENT_OPTIONS:
+            raise _RequirementSyntaxError(position, 'unknown option {}'.format(option.split('=', 1)[0]))
+
+        position = _skip_whitespace(line, position + len(option))
+
+        if '=' not in option:
+            if position >= len(line) or line.startswith('--', position):
+                raise _RequirementSyntaxError(position, 'option {} requires a value'.format(option))
+
+            position = _skip_whitespace(line, position + len(line[position:].split(None, 1)[0]))
+
+    if position < len(line):
+        raise _RequirementSyntaxError(position, 'unexpected {!r}'.format(line[position]))
+
+
+def _check_version_specifiers(line, position):
+    _parenthesized = position < len(line) and line[position] == '('
+
+    if _parenthesized:
+        position = _skip_whitespace(line, position + 1)
+
+    while True:
+        match = VERSION_OPERATOR_RE.match(line, position)
+
+        if match is None:
+            if position < len(line) and line[position] in '=!~<>':
+                raise _RequirementSyntaxError(position, 'unknown version operator')
+
+            break
+
+        operator = match.group(0)
+        position = _skip_whitespace(line, match.end())
+
+        if operator == '===':
+            match = ARBITRARY_VERSION_RE.match(line, position)
+        else:
+            match = VERSION_RE.match(line, position)
+
+        if match is None:
+            raise _RequirementSyntaxError(position, 'expected a version after {}'.format(operator))
+
+        position = match.end()
+
+        if line.startswith('.*', position):
+            if operator not in ('==', '!='):
+                raise _RequirementSyntaxError(position, 'a wildcard version is only allowed with == and !=')
+
+            position += 2
+
+        if position < len(line) and not line[position].isspace() and line[position] not in ',;)':
+            raise _RequirementSyntaxError(position, 'malformed version')
+
+        position = _skip_whitespace(line, position)
+
+        if position < len(line) and line[position] == ',':
+            position = _skip_whitespace(line, position + 1)
+
+            if VERSION_OPERATOR_RE.match(line, position) is None:
+                raise _RequirementSyntaxError(position, 'expected a version specifier after ,')
+
+            continue
+
+        break
+
+    if _parenthesized:
+        if position >= len(line) or line[position] != ')':
+            raise _RequirementSyntaxError(position, 'expected )')
+
+        position += 1
+
+    return position
+
+
+def _check_marker(line, position):
+    """Check an environment marker, it ends at the end of the line or at a per requirement option."""
+    _end = line.find(' --', position)
+    _end = len(line) if _end < 0 else _end
+
+    _tokens = []
+    _position = position
+
+    while _skip_whitespace(line, _position) < _end:
+        match = MARKER_TOKEN_RE.match(line, _position, _end)
+
+        if match is None:
+            raise _RequirementSyntaxError(_skip_whitespace(line, _position), 'malformed environment marker')
+
+        kind = match.lastgroup
+
+        if kind == 'variable' and match.group(kind) not in MARKER_VARIABLES:
+            raise _RequirementSyntaxError(match.start(kind), 'unknown marker variable {}'.format(match.group(kind)))
+
+        _tokens.append((kind, match.group(kind), match.start(kind)))
+        _position = match.end()
+
+    if not _tokens:
+        raise _RequirementSyntaxError(position, 'expected an environment marker after ;')
+
+    _index = _check_marker_or(_tokens, 0, _end)
+
+    if _index < len(_tokens):
+        raise _RequirementSyntaxError(_tokens[_index][2], 'unexpected {}'.format(_tokens[_index][1]))
+
+    return _end
+
+
+def _check_marker_or(tokens, index, end):
+    index = _check_marker_atom(tokens, index, end)
+
+    while index < len(tokens) and tokens[index][0] == 'bool':
+        index = _check_marker_atom(tokens, index + 1, end)
+
+    return index
+
+
+def _check_marker_atom(tokens, index, end):
+    if index >= len(tokens):
+        raise _RequirementSyntaxError(end, 'incomplete environment marker')
+
+    if tokens[index][1] == '(':
+        index = _check_marker_or(tokens, index + 1, end)
+
+        if index >= len(tokens) or tokens[index][1] != ')':
+            raise _RequirementSyntaxError(tokens[index][2] if index < len(tokens) else end, 'expected )')
+
+        return index + 1
+
+    for expected in (('variable', 'string'), ('op',), ('variable', 'string')):
+        if index >= len(tokens):
+            raise _RequirementSyntaxError(end, 'incomplete environment marker')
+
+        if tokens[index][0] not in expected:
+            raise _RequirementSyntaxError(tokens[index][2], 'unexpected {}'.format(tokens[index][1]))
+
+        index += 1
+
+    return index
+
+
+def specification_hash(spec, ecosystem):
+    """Content address of a stack specification within an ecosystem, short enough to be used as a label value."""
+    canonical = ecosystem.lower() + '\n' + normalize_specification(spec)
+
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:40]
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#   thoth-dependency-monkey
+#   Copyright(C) 2018 Christoph Görn
+#
+#   This program is free software: you can redistribute it and / or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Thoth: Dependency Monkey API"""
+
+import os
+import gzip
+import base64
+import logging
+
+from werkzeug.exceptions import ServiceUnavailable
+from kubernetes import client
+
+from .informer import Informer
+from .cache import LRUCache
+from .metrics import CacheStats, kubernetes_api_call
+
+
+SPECIFICATION_CACHE_SIZE = int(os.getenv('THOTH_DEPENDENCY_MONKEY_SPECIFICATION_CACHE_SIZE', 64 * 1024 * 1024))
+
+# stack specifications are kept out of the Jobs, in ConfigMaps named by their spec hash and owned by the Jobs
+# validating them, gzip compressed and base64 encoded; a Job mounts its ones as files named by spec hash
+SPECIFICATION_CONFIG_MAP_PREFIX = 'stack-specification-'
+SPECIFICATION_CONFIG_MAP_KEY = 'stack_specification.gz'
+SPECIFICATIONS_MOUNT_PATH = '/etc/thoth-dependency-monkey/stack-specifications'
+
+logger = logging.getLogger(__file__)
+
+
+def encode_specification(spec):
+    return base64.b64encode(gzip.compress(spec.encode())).decode()
+
+
+def decode_specification(data):
+    return gzip.decompress(base64.b64decode(data.encode())).decode()
+
+
+class SpecificationConfigMaps():
+    """The stack specifications of Validation jobs, kept in ConfigMaps of a namespace.
+
+    The ConfigMap of a spec hash is shared by all Jobs validating it, the garbage collector deletes it together with
+    the last of them. ConfigMaps are read from `informer` while `cache_synced_func` tells it is in sync, from the
+    Kubernetes API otherwise; stack specifications read are kept around.
+    """
+
+    def __init__(self, kubernetes_client, namespace, cache_synced_func, cache_size=SPECIFICATION_CACHE_SIZE):
+        self.namespace = namespace
+
+        self._kube = kubernetes_client
+        self._cache_synced_func = cache_synced_func
+
+        # the ConfigMaps of stack specifications, along with the Jobs validating them, keyed by spec hash
+        self.informer = Informer('configmaps', self._list_config_maps, 'V1ConfigMap',
+                                 key_func=lambda config_map: config_map.metadata.labels['spec-hash'],
+                                 label_selector='spec-hash')
+
+        # stack specifications, keyed by spec hash
+        self._specifications = LRUCache(cache_size)
+        self._stats = CacheStats('specifications')
+
+    def get(self, spec_hash):
+        """Return the stack specification with the given hash, None if there is no ConfigMap of it."""
+        spec = self._specifications.get(spec_hash)
+
+        if self._stats.record(spec is not None):
+            return spec
+
+        _config_map = self.informer.get(spec_hash) if self._cache_synced_func(self.informer) else None
+
+        if _config_map is not None:
+            spec = decode_specification(_config_map.data[SPECIFICATION_CONFIG_MAP_KEY])
+        else:
+            # the cache is not in sync yet, or the ConfigMap is younger than the last event we got
+            spec = self._read_config_map(spec_hash)
+
+        if spec is not None:
+            self._specifications.put(spec_hash, spec)
+
+        return spec
+
+    def put(self, job, specifications):  # pragma: no cover
+        """Store the stack specifications of a Job just created, by spec hash, in ConfigMaps owned by it."""
+        _owner = {'apiVersion': 'batch/v1', 'kind': 'Job', 'name': job.metadata.name, 'uid': job.metadata.uid,
+                  'blockOwnerDeletion': False}
+
+        for spec_hash, spec in specifications.items():
+            self._specifications.put(spec_hash, spec)
+            self._create_config_map(spec_hash, spec, _owner)
+
+    def _list_config_maps(self, **kwargs):  # pragma: no cover
+        if kwargs.get('watch'):
+            return self._kube.core_v1.list_namespaced_config_map(self.namespace, **kwargs)
+
+        kwargs.setdefault('_request_timeout', self._kube.request_timeout)
+
+        with kubernetes_api_call('list_config_maps'):
+            return self._kube.core_v1.list_namespaced_config_map(self.namespace, **kwargs)
+
+    def _create_config_map(self, spec_hash, spec, owner):  # pragma: no cover
+        _name = SPECIFICATION_CONFIG_MAP_PREFIX + spec_hash
+        _api = self._kube.core_v1
+
+        # the ConfigMap may exist, and be deleted by the garbage collector in the meantime
+        for _ in range(3):
+            try:
+                try:
+                    with kubernetes_api_call('create_config_map'):
+                        return _api.create_namespaced_config_map(
+                            self.namespace,
+                            {'apiVersion': 'v1', 'kind': 'ConfigMap',
+                             'metadata': {'name': _name, 'labels': {'spec-hash': spec_hash},
+                                          'ownerReferences': [owner]},
+                             'data': {SPECIFICATION_CONFIG_MAP_KEY: encode_specification(spec)}},
+                            _request_timeout=self._kube.request_timeout)
+                except client.rest.ApiException as e:
+                    if e.status != 409:
+                        raise
+
+                # owner references are merged by uid, the Job becomes one more owner
+                with kubernetes_api_call('patch_config_map'):
+                    return _api.patch_namespaced_config_map(
+                        _name, self.namespace, {'metadata': {'ownerReferences': [owner]}},
+                        _request_timeout=self._kube.request_timeout)
+            except client.rest.ApiException as e:
+                if e.status != 404:
+                    logger.error(e)
+
+                    raise ServiceUnavailable('OpenShift')
+
+        raise ServiceUnavailable('OpenShift')
+
+    def _read_config_map(self, spec_hash):  # pragma: no cover
+        try:
+            with kubernetes_api_call('read_config_map'):
+                _config_map = self._kube.core_v1.read_namespaced_config_map(
+                    SPECIFICATION_CONFIG_MAP_PREFIX + spec_hash, self.namespace,
+                    _request_timeout=self._kube.request_timeout)
+        except client.rest.ApiException as e:
+            if e.status == 404:
+                return None
+
+            logger.error(e)
+
+            raise ServiceUnavailable('OpenShift')
+
+        return decode_specification(_config_map.data[SPECIFICATION_CONFIG_MAP_KEY])
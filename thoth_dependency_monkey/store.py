@@ -0,0 +1,381 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#   thoth-dependency-monkey
+#   Copyright(C) 2018 Christoph Görn
+#
+#   This program is free software: you can redistribute it and / or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Thoth: Dependency Monkey API"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+
+from collections import deque
+
+from .archive import Archive
+from .cooperative import blocking
+
+
+# memory:// keeps the state of this replica to itself, sqlite:////path/to/store.sqlite shares it with all replicas
+# that can open the file, e.g. on a volume mounted by all of them
+STORE_URL = os.getenv('THOTH_DEPENDENCY_MONKEY_STORE', 'memory://')
+# replicas on different nodes share the file by a network filesystem, which cannot share the memory the WAL needs
+SQLITE_STORE_JOURNAL_MODE = 'DELETE'
+# seconds values published to a channel are kept, replicas read them more often than that
+CHANNEL_TTL = 60
+
+
+class Store():
+    """State shared by all replicas of the API Service.
+
+    Values are anything JSON can encode, kept by key, for `ttl` seconds if given. Queues hand out their values in
+    the order they were pushed, each to one replica. Values published to a channel are read by all replicas, for
+    CHANNEL_TTL seconds. A lease is held by one holder at a time, until it expires. `shared` tells whether other
+    replicas see the same state.
+    """
+
+    shared = False
+
+    def archive(self):
+        """Return the Archive of finished Validations, shared by the replicas if this Store is."""
+        return Archive()
+
+    def get(self, key):
+        """Return the value of a key, None if there is none or it expired."""
+        raise NotImplementedError()
+
+    def put(self, key, value, ttl=None):
+        raise NotImplementedError()
+
+    def add(self, key, value, ttl=None):
+        """Store a value unless the key holds one already, return False if it does."""
+        raise NotImplementedError()
+
+    def delete(self, key):
+        raise NotImplementedError()
+
+    def push(self, queue, value):
+        raise NotImplementedError()
+
+    def pop(self, queue):
+        """Take the oldest value of a queue, None if it is empty."""
+        raise NotImplementedError()
+
+    def peek(self, queue):
+        """Return the oldest value of a queue without taking it, None if it is empty."""
+        raise NotImplementedError()
+
+    def size(self, queue):
+        raise NotImplementedError()
+
+    def publish(self, channel, value):
+        raise NotImplementedError()
+
+    def published(self, channel, after=None):
+        """Return the values published to a channel after the position `after`, in the order they were published,
+        and the position of the last of them. Without `after` only the current position is returned."""
+        raise NotImplementedError()
+
+    def acquire(self, name, holder, ttl):
+        """Acquire or renew a lease for `holder`, for `ttl` seconds. Return False if it is held by another holder."""
+        raise NotImplementedError()
+
+    def release(self, name, holder):
+        """Give up a lease, if `holder` holds it."""
+        raise NotImplementedError()
+
+
+class InProcessStore(Store):
+    """A Store for a single replica, kept in memory."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (value encoded as JSON, expiry time or None) by key, leases by their name prefixed with lease/
+        self._entries = {}
+        self._queues = {}
+        # (position, value encoded as JSON, time published) by channel
+        self._channels = {}
+        self._position = 0
+        self._next_purge = 0
+
+    def _get(self, key):
+        _entry = self._entries.get(key)
+
+        if _entry is None or (_entry[1] is not None and _entry[1] <= time.time()):
+            return None
+
+        return json.loads(_entry[0])
+
+    def _put(self, key, value, ttl):
+        _now = time.time()
+
+        # expired entries are removed once a minute, while entries are added
+        if _now >= self._next_purge:
+            self._entries = {key: entry for key, entry in self._entries.items()
+                             if entry[1] is None or entry[1] > _now}
+            self._next_purge = _now + 60
+
+        self._entries[key] = (json.dumps(value), None if ttl is None else _now + ttl)
+
+    def get(self, key):
+        with self._lock:
+            return self._get(key)
+
+    def put(self, key, value, ttl=None):
+        with self._lock:
+            self._put(key, value, ttl)
+
+    def add(self, key, value, ttl=None):
+        with self._lock:
+            if self._get(key) is not None:
+                return False
+
+            self._put(key, value, ttl)
+
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def push(self, queue, value):
+        with self._lock:
+            self._queues.setdefault(queue, deque()).append(json.dumps(value))
+
+    def pop(self, queue):
+        with self._lock:
+            _queue = self._queues.get(queue)
+
+            return json.loads(_queue.popleft()) if _queue else None
+
+    def peek(self, queue):
+        with self._lock:
+            _queue = self._queues.get(queue)
+
+            return json.loads(_queue[0]) if _queue else None
+
+    def size(self, queue):
+        with self._lock:
+            return len(self._queues.get(queue, ()))
+
+    def publish(self, channel, value):
+        with self._lock:
+            _now = time.time()
+            _channel = self._channels.setdefault(channel, deque())
+
+            while _channel and _channel[0][2] <= _now - CHANNEL_TTL:
+                _channel.popleft()
+
+            self._position += 1
+            _channel.append((self._position, json.dumps(value), _now))
+
+    def published(self, channel, after=None):
+        with self._lock:
+            if after is None:
+                return [], self._position
+
+            _values = [(position, value) for position, value, _ in self._channels.get(channel, ()) if position > after]
+
+            return [json.loads(value) for _, value in _values], _values[-1][0] if _values else after
+
+    def acquire(self, name, holder, ttl):
+        with self._lock:
+            _holder = self._get('lease/' + name)
+
+            if _holder is not None and _holder != holder:
+                return False
+
+            self._put('lease/' + name, holder, ttl)
+
+            return True
+
+    def release(self, name, holder):
+        with self._lock:
+            if self._get('lease/' + name) == holder:
+                del self._entries['lease/' + name]
+
+
+class SQLiteStore(Store):
+    """A Store kept in an SQLite database, shared by all replicas that can open the file.
+
+    It stands in for a shared database or key-value store: the file has to be on a volume all replicas mount, and
+    one that supports the file locks of SQLite. The archive is kept within the same file.
+    """
+
+    shared = True
+
+    def __init__(self, path):
+        self.path = path
+
+        self._local = threading.local()
+
+        with self._connection() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT, expires REAL)')
+            db.execute('CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires)')
+            db.execute('CREATE TABLE IF NOT EXISTS queues (seq INTEGER PRIMARY KEY AUTOINCREMENT, queue TEXT, '
+                       'value TEXT)')
+            db.execute('CREATE INDEX IF NOT EXISTS queues_queue ON queues (queue, seq)')
+            db.execute('CREATE TABLE IF NOT EXISTS channels (seq INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT, '
+                       'value TEXT, published REAL)')
+            db.execute('CREATE INDEX IF NOT EXISTS channels_published ON channels (published)')
+
+    def _connection(self):
+        # sqlite3 connections must not be shared between threads
+        db = getattr(self._local, 'db', None)
+
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute('PRAGMA journal_mode={}'.format(SQLITE_STORE_JOURNAL_MODE))
+            self._local.db = db
+
+        return db
+
+    def archive(self):
+        return Archive(self.path, journal_mode=SQLITE_STORE_JOURNAL_MODE)
+
+    def _transaction(self, func):
+        """Call `func` with the connection within an IMMEDIATE transaction, which holds the write lock."""
+        db = self._connection()
+
+        db.execute('BEGIN IMMEDIATE')
+
+        try:
+            _result = func(db)
+
+            db.execute('COMMIT')
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+
+        return _result
+
+    @blocking
+    def get(self, key):
+        row = self._connection().execute('SELECT value FROM entries WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                                         (key, time.time())).fetchone()
+
+        return None if row is None else json.loads(row[0])
+
+    @blocking
+    def put(self, key, value, ttl=None):
+        self._connection().execute('INSERT OR REPLACE INTO entries (key, value, expires) VALUES (?, ?, ?)',
+                                   (key, json.dumps(value), None if ttl is None else time.time() + ttl))
+
+    @blocking
+    def add(self, key, value, ttl=None):
+        _now = time.time()
+
+        def _add(db):
+            db.execute('DELETE FROM entries WHERE key = ? AND expires <= ?', (key, _now))
+
+            return db.execute('INSERT OR IGNORE INTO entries (key, value, expires) VALUES (?, ?, ?)',
+                              (key, json.dumps(value), None if ttl is None else _now + ttl)).rowcount > 0
+
+        return self._transaction(_add)
+
+    @blocking
+    def delete(self, key):
+        self._connection().execute('DELETE FROM entries WHERE key = ?', (key,))
+
+    @blocking
+    def push(self, queue, value):
+        self._connection().execute('INSERT INTO queues (queue, value) VALUES (?, ?)', (queue, json.dumps(value)))
+
+    @blocking
+    def pop(self, queue):
+        def _pop(db):
+            row = db.execute('SELECT seq, value FROM queues WHERE queue = ? ORDER BY seq LIMIT 1',
+                             (queue,)).fetchone()
+
+            if row is not None:
+                db.execute('DELETE FROM queues WHERE seq = ?', (row[0],))
+
+            return row
+
+        row = self._transaction(_pop)
+
+        return None if row is None else json.loads(row[1])
+
+    @blocking
+    def peek(self, queue):
+        row = self._connection().execute('SELECT value FROM queues WHERE queue = ? ORDER BY seq LIMIT 1',
+                                         (queue,)).fetchone()
+
+        return None if row is None else json.loads(row[0])
+
+    @blocking
+    def size(self, queue):
+        return self._connection().execute('SELECT COUNT(*) FROM queues WHERE queue = ?', (queue,)).fetchone()[0]
+
+    @blocking
+    def publish(self, channel, value):
+        _now = time.time()
+
+        def _publish(db):
+            db.execute('DELETE FROM channels WHERE published <= ?', (_now - CHANNEL_TTL,))
+            db.execute('INSERT INTO channels (channel, value, published) VALUES (?, ?, ?)',
+                       (channel, json.dumps(value), _now))
+
+        self._transaction(_publish)
+
+    @blocking
+    def published(self, channel, after=None):
+        db = self._connection()
+
+        if after is None:
+            # positions are counted by all channels together, values published from now on come after this one
+            return [], db.execute('SELECT COALESCE(MAX(seq), 0) FROM channels').fetchone()[0]
+
+        rows = db.execute('SELECT seq, value FROM channels WHERE channel = ? AND seq > ? ORDER BY seq',
+                          (channel, after)).fetchall()
+
+        return [json.loads(row[1]) for row in rows], rows[-1][0] if rows else after
+
+    @blocking
+    def acquire(self, name, holder, ttl):
+        _now = time.time()
+
+        def _acquire(db):
+            # expired entries are removed whenever a lease is renewed, which happens every few seconds
+            db.execute('DELETE FROM entries WHERE expires <= ?', (_now,))
+
+            row = db.execute('SELECT value FROM entries WHERE key = ?', ('lease/' + name,)).fetchone()
+
+            if row is not None and json.loads(row[0]) != holder:
+                return False
+
+            db.execute('INSERT OR REPLACE INTO entries (key, value, expires) VALUES (?, ?, ?)',
+                       ('lease/' + name, json.dumps(holder), _now + ttl))
+
+            return True
+
+        return self._transaction(_acquire)
+
+    @blocking
+    def release(self, name, holder):
+        self._connection().execute('DELETE FROM entries WHERE key = ? AND value = ?',
+                                   ('lease/' + name, json.dumps(holder)))
+
+
+def store_from_url(url=STORE_URL):
+    """Create a Store from an URL like memory:// or sqlite:////var/lib/thoth/store.sqlite"""
+    if url == 'memory://':
+        return InProcessStore()
+    elif url.startswith('sqlite:///'):
+        return SQLiteStore(url[len('sqlite:///'):])
+
+    raise ValueError('unsupported store {}'.format(url))
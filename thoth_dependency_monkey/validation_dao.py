@@ -19,25 +19,39 @@
 """Thoth: Dependency Monkey API"""
 
 import os
+import math
+import time
 import logging
 import uuid
 
-from werkzeug.exceptions import BadRequest, ServiceUnavailable, NotImplemented
-from tempfile import NamedTemporaryFile
-from kubernetes import client, config
-from kubernetes.client import api_client
-from kubernetes.client.apis import batch_v1_api
+from werkzeug.exceptions import BadRequest, NotImplemented
 
 
+from .cache import LRUCache
 from .ecosystem import ECOSYSTEM, EcosystemNotSupportedError
+from .exploration import STRATEGIES, EXPLORATION_MAX_COMBINATIONS, EXPLORATION_MAX_VERSIONS, EXPLORATION_SHARD_SIZE, \
+    EXPLORATION_CACHE_SIZE, EXPLORATION_TTL, EXPLORATION_POLL_INTERVAL, EXPLORATION_STREAM_TIMEOUT, ReleaseIndex, \
+    explored_requirements, candidate_versions, count_combinations, combinations, pinned_requirement
+from .notification import FINISHED_PHASES, NOTIFICATION_MAX_WAIT, EVENT_STREAM_TIMEOUT, EVENT_HEARTBEAT_INTERVAL, \
+    Notifier, check_callback_url
+from .specification import SpecificationSyntaxError, check_specification, specification_hash, canonical_name
+from .scheduler import PRIORITIES
+from .store import store_from_url
+from .kubernetes_client import KubernetesClientManager
+from .kubernetes_executor import KUBERNETES_API_URL, KubernetesExecutor
+from .executor import WorkQueueExecutor, LocalExecutor
+from .work_queue import work_queue_from_url
 
 DEBUG = bool(os.getenv('DEBUG', False))
 
-KUBERNETES_API_URL = os.getenv(
-    'KUBERNETES_API_URL', 'https://kubernetes.default.svc.cluster.local:443')
-THOTH_DEPENDENCY_MONKEY_NAMESPACE = os.getenv(
-    'THOTH_DEPENDENCY_MONKEY_NAMESPACE', 'thoth-dev')
-VALIDATION_JOB_PREFIX = 'validation-job-'
+DEDUPLICATION_TTL = int(os.getenv('THOTH_DEPENDENCY_MONKEY_DEDUPLICATION_TTL', 3600))
+# the Validation of a stack is claimed in the store shared by all replicas, by spec hash
+DEDUPLICATION_KEY = 'deduplication/{}'
+EXPLORATION_KEY = 'exploration/{}'
+# job: each Validation is carried out by a Kubernetes Job, queue: by a pool of validator workers,
+# local: by a pool of processes of the API Service itself
+EXECUTION_MODE = os.getenv('THOTH_DEPENDENCY_MONKEY_EXECUTION_MODE', 'job')
+BATCH_MAX_SIZE = int(os.getenv('THOTH_DEPENDENCY_MONKEY_BATCH_MAX_SIZE', 100))
 
 logging.basicConfig()
 logger = logging.getLogger(__file__)
@@ -58,293 +72,555 @@ class NotFoundError(BadRequest):
         self.message = "Validation {} doesn't exist".format(id)
 
 
+def executor_for_mode(mode=EXECUTION_MODE, store=None):
+    if mode == 'queue':
+        return WorkQueueExecutor(work_queue_from_url())
+    elif mode == 'local':
+        return LocalExecutor()
+
+    return KubernetesExecutor(KubernetesClientManager(KUBERNETES_API_URL), store=store)
+
+
 class ValidationDAO():
-    def __init__(self):
-        self.BEARER_TOKEN = None
+    def __init__(self, executor=None, releases=None, store=None):
+        # shared by all replicas of the API Service, if it is not kept in memory
+        self._store = store if store is not None else store_from_url()
 
-        # if we can read bearer token from /var/run/secrets/kubernetes.io/serviceaccount/token use it,
-        # otherwise use the one from env
-        try:
-            logger.debug(
-                'trying to get bearer token from secrets file within pod...')
-            with open('/var/run/secrets/kubernetes.io/serviceaccount/token') as f:
-                self.BEARER_TOKEN = f.read()
+        if executor is None:
+            executor = executor_for_mode(store=self._store)
 
-            self.SSL_CA_CERT_FILENAME = '/var/run/secrets/kubernetes.io/serviceaccount/ca.crt'
+        self._executor = executor
+        self._releases = releases or ReleaseIndex()
 
-        except:
-            logger.info("not running within an OpenShift cluster...")
+        # explorations are kept in memory, and for EXPLORATION_TTL in a shared store; their Validations outlive them
+        self._explorations = LRUCache(EXPLORATION_CACHE_SIZE, size_func=lambda exploration: 1)
 
-    def get(self, id):
-        v = {}
+        # transitions are told by the executor if it can, e.g. by its watch of Validation jobs
+        self._notifier = Notifier(self._phase, self._describe)
+        self._notifier.listen(executor)
 
-        v['id'] = id
+    def get(self, id, raw_log=False, wait=None):
+        """Get a Validation, the raw log of the validator is only included if asked for. If `wait` is given, wait
+        that many seconds (at most NOTIFICATION_MAX_WAIT) for it to finish first."""
+        if wait:
+            self._wait(str(id), min(wait, NOTIFICATION_MAX_WAIT))
 
-        _job = self._get_scheduled_validation_job(id)
+        v = self._executor.get(str(id))
 
-        # if we didnt get back anything from OpenShift, we let it 404
-        if _job is None:
+        if v is None:
             raise NotFoundError(id)
 
-        # lets copy the Validation information from the Kubernetes Job
-        for container in _job.spec.template.spec.containers:
-            if container.name.endswith(str(id)):
-                for env in container.env:
-                    v[env.name.lower()] = env.value
+        v['id'] = id
+        v['stack_specification'] = v['stack_specification'].replace('\n', '\\n')
 
-        if _job.status.succeeded is not None:
-            v['phase'] = 'succeeded'
+        _result = v.pop('result', None)
 
-            log = self._get_job_log(id)
+        if _result is not None:
+            v['valid'] = _result['valid']
+            v['failure'] = _result.get('failure')
+            v['pins'] = _result.get('pins')
+            v['timings'] = _result.get('timings')
 
-            if log is not None:
-                v['raw_log'] = log
+        if raw_log:
+            v['raw_log'] = self._executor.log(str(id))
 
-                # TODO pretty sure we can do this better
-                if 'No matching distribution found' in log:
-                    v['valid'] = False
-                if 'The Software Stack Specification could not be validated, most probably a syntax error in the spec!' in log:
-                    v['valid'] = False
-                else:
-                    v['valid'] = True
+        return v
 
-        elif _job.status.failed is not None:
-            v['phase'] = 'failed'
-        elif _job.status.active is not None:
-            v['phase'] = 'running'
+    def version(self, id):
+        """Return a string that changes whenever the Validation, apart from its log, changes. None if that cannot be
+        told without reading the Validation."""
+        return self._executor.version(str(id))
 
-        return v
+    def get_raw_log(self, id):
+        """Get the raw log of the validator of a Validation, empty as long as there is none."""
+        _log = self._executor.log(str(id))
+
+        if _log is None:
+            if self._executor.get(str(id)) is None:
+                raise NotFoundError(id)
+
+            return ''
+
+        return _log
+
+    def _wait(self, id, timeout):
+        """Wait at most `timeout` seconds for a Validation to finish."""
+        _deadline = time.time() + timeout
+
+        # subscribed first, so that no transition is missed
+        with self._notifier.subscribe([id]) as subscription:
+            v = self._executor.get(id)
+
+            while v is not None and v['phase'] not in FINISHED_PHASES:
+                _remaining = _deadline - time.time()
+
+                if _remaining <= 0 or subscription.get(_remaining) is None:
+                    return
+
+                v = self._executor.get(id)
+
+    def _phase(self, id):
+        v = self._executor.get(id)
+
+        return None if v is None else v['phase']
+
+    def _describe(self, id):
+        try:
+            return self.get(id)
+        except NotFoundError:
+            return {'id': id, 'phase': 'unknown'}
+
+    def events(self, ids=None, timeout=EVENT_STREAM_TIMEOUT, heartbeat=EVENT_HEARTBEAT_INTERVAL):
+        """Return a generator of the phase transitions of the Validations with the given ids, of all Validations if
+        None, as dicts with id and phase; None after each `heartbeat` seconds without a transition.
+
+        The current phase of each of the given Validations comes first, the generator stops once all of them
+        finished, or after `timeout` seconds. Transitions of all Validations can only be told if the executor tells
+        them.
+        """
+        if ids is None and not self._notifier.listening:
+            raise NotImplemented('events of all Validations are not told in this mode')  # pylint: disable=E0711
+
+        _subscription = self._notifier.subscribe(ids)
+        _phases = {}
+
+        try:
+            for id in ids or ():
+                _phases[id] = self._phase(id)
 
-    def get_all(self):
-        jobs = self._get_all_scheduled_validation_job()
+                if _phases[id] is None:
+                    raise NotFoundError(id)
+        except Exception:
+            _subscription.close()
+            raise
 
-        if len(jobs) > 0:
-            result = []
+        def _events():
+            _deadline = time.time() + timeout
+            _pending = {id for id, phase in _phases.items() if phase not in FINISHED_PHASES}
 
-            for job in jobs:
-                if job.metadata.name.startswith(VALIDATION_JOB_PREFIX):
-                    v = {}
-                    v['id'] = str(job.metadata.labels['validation-id'])
+            with _subscription:
+                for id, phase in _phases.items():
+                    yield {'id': id, 'phase': phase}
 
-                    result.append(
-                        {'id': str(job.metadata.labels['validation-id'])})
+                while ids is None or _pending:
+                    _remaining = _deadline - time.time()
 
-            logger.debug('found the following validations: {}'.format(result))
-            return result
-        else:
-            return []
+                    if _remaining <= 0:
+                        return
 
-    def create(self, data):
-        v = data
+                    _transition = _subscription.get(min(heartbeat, _remaining))
 
-        if v['ecosystem'] not in ECOSYSTEM:
-            raise EcosystemNotSupportedError(v['ecosystem'])
+                    if _transition is None:
+                        yield None
+                        continue
 
-        # check if stack_specification is valid
-        if not self._validate_requirements(v['stack_specification']):
-            raise BadRequest(
-                'specification is not valid within Ecosystem {}'.format(v['ecosystem']))
+                    id, phase = _transition
 
-        v['phase'] = 'pending'
-        v['id'] = str(uuid.uuid4())
+                    # polling executors tell the current phase of a Validation once more
+                    if ids is not None and _phases.get(id) == phase:
+                        continue
 
-        self._schedule_validation_job(
-            v['id'], v['stack_specification'], v['ecosystem'])
+                    _phases[id] = phase
+
+                    if phase in FINISHED_PHASES:
+                        _pending.discard(id)
+
+                    yield {'id': id, 'phase': phase}
+
+        return _events()
+
+    def _add_webhook(self, v, url, attached):
+        """Call `url` once the Validation finished, right away if it was attached to one that finished already."""
+        self._notifier.add_webhook(v['id'], url)
+
+        if attached:
+            # it may have finished before the webhook was added, the webhook is called once anyway
+            _phase = self._phase(v['id'])
+
+            if _phase in FINISHED_PHASES:
+                self._notifier.publish(v['id'], _phase)
+
+    def get_all(self, limit=None, continue_token=None, **filters):
+        """List Validations, a page at a time if `limit` is given. Returns the list and the continue token of the
+        next page, None if there is none.
+
+        Filters are phase, valid (True or False), ecosystem, created_after and created_before (datetimes).
+        """
+        for name in ('created_after', 'created_before'):
+            if filters.get(name) is not None:
+                filters[name] = filters[name].timestamp()
+
+        return self._executor.list(limit, continue_token, **filters)
+
+    def create(self, data, client=None):
+        """Request a Validation, on behalf of `client`. Interactive ones are scheduled before bulk ones. If a
+        callback_url is given the Validation is posted to it once it finished."""
+        _callback_url = check_callback_url(data.get('callback_url'))
+        v = self._prepare_validation(data['stack_specification'], data['ecosystem'],
+                                     data.get('priority') or 'interactive', client)
+        _attached = self._attach_to_reusable_validation(v)
+
+        if not _attached:
+            v['id'] = str(uuid.uuid4())
+            _attached = not self._claim(v)
+
+        if not _attached:
+            self._executor.submit([v])
+
+        if _callback_url is not None:
+            self._add_webhook(v, _callback_url, _attached)
 
         return v
 
-    def delete(self, id):
-        # TODO add kubernetes job stuff
-        raise NotImplemented()  # pylint: disable=E0711
+    def create_batch(self, data, client=None):
+        """Request a Validation for each of the stack specifications, the executor may pack them together.
+        Batches are bulk Validations unless asked for otherwise. If a callback_url is given each Validation is
+        posted to it once it finished."""
+        if len(data['stack_specifications']) > BATCH_MAX_SIZE:
+            raise BadRequest('a batch may contain at most {} stack specifications'.format(BATCH_MAX_SIZE))
 
-    def _validate_requirements(self, spec):
-        """This function will check if the syntax of the provided specification is valid"""
-        from pip.req.req_file import parse_requirements
+        _callback_url = check_callback_url(data.get('callback_url'))
 
-        # create a temporary file and store the spec there since
-        # `parse_requirements` requires a file
-        with NamedTemporaryFile(mode='w+', suffix='pysolve') as f:
-            f.write(spec)
-            f.flush()
-            reqs = parse_requirements(f.name, session=f.name)
+        validations = []
+        _errors = []
 
-        if reqs:
-            return True
+        for index, spec in enumerate(data['stack_specifications']):
+            try:
+                validations.append(self._prepare_validation(spec, data['ecosystem'], data.get('priority') or 'bulk',
+                                                            client))
+            except SpecificationSyntaxError as e:
+                _errors.extend(dict(error, specification=index) for error in e.errors)
 
-        return False
+        if _errors:
+            raise SpecificationSyntaxError(_errors)
+
+        # stack specifications that need to be validated, by spec hash, so duplicates within the batch are validated
+        # once
+        _new = {}
+        _attached = {}
+
+        for v in validations:
+            if self._attach_to_reusable_validation(v):
+                _attached[v['id']] = v
+                continue
+
+            if v['spec_hash'] in _new:
+                v['id'] = _new[v['spec_hash']]['id']
+                continue
+
+            v['id'] = str(uuid.uuid4())
+
+            if not self._claim(v):
+                _attached[v['id']] = v
+                continue
+
+            _new[v['spec_hash']] = v
+
+        if _new:
+            self._executor.submit(list(_new.values()))
+
+        if _callback_url is not None:
+            for v in _new.values():
+                self._add_webhook(v, _callback_url, False)
+
+            for v in _attached.values():
+                self._add_webhook(v, _callback_url, True)
+
+        return validations
 
-    def _whats_my_name(self, id):
-        return VALIDATION_JOB_PREFIX + str(id)
-
-    def _schedule_validation_job(self, id, spec, ecosystem):  # pragma: no cover
-        logger.debug('scheduling validation id {}'.format(id))
-
-        _name = self._whats_my_name(id)
-        # TODO select validator image based on ecosystem
-        # _image = self._job_image_name(ecosystem)
-
-        _job_manifest = {
-            'kind': 'Job',
-            'spec': {
-                'template':
-                    {
-                        'metadata': {'labels': {'validation-id': str(id)}},
-                        'spec':
-                        {'serviceAccountName': 'validation-job-runner',
-                         'containers': [
-                             {
-                                 'image': 'pypi-validator',
-                                 'name': _name,
-                                 'env': [
-                                     {
-                                         'name': 'STACK_SPECIFICATION',
-                                         'value': spec.replace('\n', '\\n')
-                                     },
-                                     {
-                                         'name': 'ECOSYSTEM',
-                                         'value': ecosystem
-                                     },
-                                     {
-                                         'name': 'XDG_CACHE_HOME',
-                                         'value': '/tmp/.xdg-cache'
-                                     },
-                                     {
-                                         'name': 'DEBUG',
-                                         'value': 'YES'
-                                     }
-                                 ]
-                             }
-                         ],
-                            'restartPolicy': 'Never'},
-                        'metadata': {'name': _name}}},
-            'apiVersion': 'batch/v1',
-            'metadata': {'name': _name, 'labels': {'validation-id': str(id)}}
+    def create_exploration(self, data, client=None):
+        """Explore the combinations of candidate versions of the packages of a stack specification, a Validation
+        is requested for each of the combinations chosen by the strategy. Explorations are bulk Validations unless
+        asked for otherwise.
+
+        The candidate versions of a package are taken from `versions` (by package name) if given, from the package
+        index otherwise. Combinations found to be invalid before are not validated again, they are pruned.
+        """
+        _strategy = data.get('strategy') or 'exhaustive'
+        _limit = data.get('max_combinations') or EXPLORATION_MAX_COMBINATIONS
+        _max_versions = data.get('max_versions') or EXPLORATION_MAX_VERSIONS
+
+        if _strategy not in STRATEGIES:
+            raise BadRequest('strategy must be one of {}'.format(', '.join(STRATEGIES)))
+
+        if not 0 < _limit <= EXPLORATION_MAX_COMBINATIONS:
+            raise BadRequest('an exploration may contain at most {} combinations'.format(EXPLORATION_MAX_COMBINATIONS))
+
+        if data['ecosystem'] not in ECOSYSTEM:
+            raise EcosystemNotSupportedError(data['ecosystem'])
+
+        check_specification(data['stack_specification'])
+
+        _lines = explored_requirements(data['stack_specification'])
+        _explored = [(index, requirement) for index, (_, requirement) in enumerate(_lines) if requirement is not None]
+
+        if not _explored:
+            raise BadRequest('stack specification names no package to explore')
+
+        _versions = {canonical_name(name): versions for name, versions in (data.get('versions') or {}).items()}
+        _candidates = []
+
+        for _, requirement in _explored:
+            _released = _versions.get(canonical_name(requirement.project_name))
+
+            if _released is None:
+                _released = self._releases.versions(requirement.project_name)
+
+            # boundaries are the oldest and the newest of all matching versions
+            _candidates.append(candidate_versions(requirement, _released,
+                                                  None if _strategy == 'boundary' else _max_versions))
+
+            if not _candidates[-1]:
+                raise BadRequest('no version of {} matches {}'.format(requirement.project_name, requirement))
+
+        _total = count_combinations(_candidates, _strategy)
+
+        if _strategy != 'random' and _total > _limit:
+            raise BadRequest('{} combinations would be explored, at most {} are allowed; use the random strategy to '
+                             'sample them'.format(_total, _limit))
+
+        exploration = {
+            'id': str(uuid.uuid4()),
+            'stack_specification': data['stack_specification'],
+            'ecosystem': data['ecosystem'],
+            'strategy': _strategy,
+            'total': _total,
+            'combinations': []
         }
 
-        # if we got no BEARER_TOKEN, we use local config
-        if self.BEARER_TOKEN is None:
-            config.load_kube_config()
-        else:
-            config.load_incluster_config()
+        # stack specifications that need to be validated, by spec hash
+        _new = {}
 
-        _client = client.CoreV1Api()
-        _api = client.BatchV1Api()
+        for combination in combinations(_candidates, _strategy, _limit, data.get('seed')):
+            _pinned = [line for line, _ in _lines]
 
-        try:
-            _resp = _api.create_namespaced_job(
-                body=_job_manifest, namespace=THOTH_DEPENDENCY_MONKEY_NAMESPACE)
-        except client.rest.ApiException as e:
-            logger.error(e)
+            for (index, requirement), version in zip(_explored, combination):
+                _pinned[index] = pinned_requirement(requirement, version)
 
-            if e.status == 403:
-                raise ServiceUnavailable('OpenShift auth failed')
+            v = self._prepare_validation('\n'.join(_pinned), data['ecosystem'], data.get('priority') or 'bulk', client)
+            _combination = {
+                'pins': {requirement.project_name: version
+                         for (_, requirement), version in zip(_explored, combination)},
+                'pruned': self._attach_to_known_failure(v)
+            }
 
-            raise ServiceUnavailable('OpenShift')
+            if not _combination['pruned'] and not self._attach_to_reusable_validation(v):
+                if v['spec_hash'] in _new:
+                    v['id'] = _new[v['spec_hash']]['id']
+                else:
+                    v['id'] = str(uuid.uuid4())
 
-    def _get_all_scheduled_validation_job(self):  # pragma: no cover
-        logger.debug('looking for all validations')
+                    if self._claim(v):
+                        _new[v['spec_hash']] = v
 
-        result = []
+            _combination['id'] = v['id']
+            exploration['combinations'].append(_combination)
 
-        # if we got no BEARER_TOKEN, we use local config
-        if self.BEARER_TOKEN is None:
-            config.load_kube_config()
-        else:
-            config.load_incluster_config()
+        if _new:
+            # shards of combinations are validated by the same Job
+            self._executor.submit(list(_new.values()), jobs=math.ceil(len(_new) / EXPLORATION_SHARD_SIZE))
 
-        _client = client.CoreV1Api()
-        _api = client.BatchV1Api()
+        self._explorations.put(exploration['id'], exploration)
 
-        try:
-            _resp = _api.list_namespaced_job(
-                namespace=THOTH_DEPENDENCY_MONKEY_NAMESPACE)
+        if self._store.shared:
+            self._store.put(EXPLORATION_KEY.format(exploration['id']), exploration, ttl=EXPLORATION_TTL)
 
-            # if we got a none empty list of jobs, lets filter the ones out that belong to us...
-            if not _resp.items is None:
-                for job in _resp.items:
-                    if job.metadata.name.startswith(VALIDATION_JOB_PREFIX):
-                        result.append(job)
+        return self.get_exploration(exploration['id'])
 
-        except client.rest.ApiException as e:
-            logger.error(e)
+    def _exploration(self, id):
+        """Return an exploration as it was created, None if it is unknown or expired."""
+        exploration = self._explorations.get(id)
 
-            if e.status == 403:
-                raise ServiceUnavailable('OpenShift auth failed')
+        if exploration is None and self._store.shared:
+            # created by another replica
+            exploration = self._store.get(EXPLORATION_KEY.format(id))
 
-            raise ServiceUnavailable('OpenShift')
+            if exploration is not None:
+                self._explorations.put(id, exploration)
 
-        except IndexError as e:
-            logger.debug('we got no jobs...')
+        return exploration
 
-            return []
+    def get_exploration(self, id):
+        """Get an exploration with the state of each of its combinations, and how many of the combinations each
+        version of a package was part of were valid and invalid."""
+        exploration = self._exploration(str(id))
 
-        return result
+        if exploration is None:
+            raise NotFoundError(id)
 
-    def _get_scheduled_validation_job(self, id):  # pragma: no cover
-        logger.debug('looking for validation id {}'.format(id))
+        _combinations = [self._exploration_combination(c) for c in exploration['combinations']]
+        _versions = {}
+
+        for c in _combinations:
+            if c['valid'] is None:
+                continue
+
+            for name, version in c['pins'].items():
+                _counts = _versions.setdefault(name, {}).setdefault(version, {'valid': 0, 'invalid': 0})
+                _counts['valid' if c['valid'] else 'invalid'] += 1
+
+        return {
+            'id': exploration['id'],
+            'stack_specification': exploration['stack_specification'].replace('\n', '\\n'),
+            'ecosystem': exploration['ecosystem'],
+            'strategy': exploration['strategy'],
+            'total': exploration['total'],
+            'finished': all(c['phase'] not in ('pending', 'running') for c in _combinations),
+            'combinations': _combinations,
+            'versions': _versions
+        }
 
-        # if we got no BEARER_TOKEN, we use local config
-        if self.BEARER_TOKEN is None:
-            config.load_kube_config()
-        else:
-            config.load_incluster_config()
+    def get_exploration_results(self, id, timeout=EXPLORATION_STREAM_TIMEOUT, interval=EXPLORATION_POLL_INTERVAL):
+        """Return a generator of the combinations of an exploration, each as soon as its Validation finished; it
+        stops once all of them finished or after `timeout` seconds."""
+        exploration = self._exploration(str(id))
 
-        _client = client.CoreV1Api()
-        _api = client.BatchV1Api()
+        if exploration is None:
+            raise NotFoundError(id)
 
-        try:
-            _resp = _api.list_namespaced_job(
-                namespace=THOTH_DEPENDENCY_MONKEY_NAMESPACE, include_uninitialized=True, label_selector='validation-id='+str(id))
+        def _results():
+            _deadline = time.time() + timeout
+            _pending = exploration['combinations']
 
-            if not _resp.items is None:
-                return _resp.items[0]
-        except client.rest.ApiException as e:
-            logger.error(e)
+            while _pending:
+                _still_pending = []
 
-            if e.status == 403:
-                raise ServiceUnavailable('OpenShift auth failed')
+                for combination in _pending:
+                    c = self._exploration_combination(combination)
 
-            raise ServiceUnavailable('OpenShift')
+                    if c['phase'] in ('pending', 'running'):
+                        _still_pending.append(combination)
+                    else:
+                        yield c
 
-        except IndexError as e:
-            logger.debug('we got no jobs...')
+                _pending = _still_pending
 
-            return None
+                if _pending and time.time() + interval > _deadline:
+                    return
 
-        return None
+                if _pending:
+                    time.sleep(interval)
 
-    def _get_job_log(self, id):  # pragma: no cover
-        logger.debug('getting logs for validation id {}'.format(id))
+        return _results()
 
-        # if we got no BEARER_TOKEN, we use local config
-        if self.BEARER_TOKEN is None:
-            config.load_kube_config()
-        else:
-            config.load_incluster_config()
+    def _exploration_combination(self, combination):
+        v = self._executor.get(combination['id']) or {'phase': 'unknown'}
+        _result = v.get('result') or {}
 
-        _client = client.CoreV1Api()
+        return {
+            'id': combination['id'],
+            'pins': combination['pins'],
+            'pruned': combination['pruned'],
+            'phase': v['phase'],
+            'valid': _result.get('valid'),
+            'failure': _result.get('failure')
+        }
+
+    def delete(self, id):
+        v = self._executor.get(str(id))
 
         try:
-            # 1. lets get the pod that ran our job
-            _resp = _client.list_namespaced_pod(
-                namespace=THOTH_DEPENDENCY_MONKEY_NAMESPACE)  # , label_selector='job-name=validation-id-'+str(id))
+            if not self._executor.delete(str(id)):
+                raise NotFoundError(id)
+        except NotImplementedError:
+            raise NotImplemented()  # pylint: disable=E0711
+
+        if v is not None:
+            self._release_claim(specification_hash(v['stack_specification'], v['ecosystem']), str(id))
+
+    def _prepare_validation(self, spec, ecosystem, priority, client):
+        if ecosystem not in ECOSYSTEM:
+            raise EcosystemNotSupportedError(ecosystem)
+
+        if priority not in PRIORITIES:
+            raise BadRequest('priority must be one of {}'.format(', '.join(PRIORITIES)))
+
+        # malformed stack specifications are rejected before anything is scheduled
+        check_specification(spec)
+
+        return {
+            'stack_specification': spec,
+            'ecosystem': ecosystem,
+            'phase': 'pending',
+            'spec_hash': specification_hash(spec, ecosystem),
+            'priority': priority,
+            'client': client
+        }
+
+    def _attach_to_reusable_validation(self, v):
+        """If the same stack is being validated or was validated recently, attach `v` to that Validation."""
+        _reusable = self._find_reusable_validation(v['spec_hash'])
+
+        if _reusable is None:
+            return False
+
+        v['id'], v['phase'] = _reusable['id'], _reusable['phase']
+
+        logger.debug('reusing validation id {} for spec hash {}'.format(v['id'], v['spec_hash']))
+
+        return True
+
+    def _claim(self, v):
+        """Claim the validation of the stack of `v`, which has an id, so that a stack requested to be validated by
+        several clients at once, of any replica, is validated once. If another Validation claimed it first and can
+        be reused, attach `v` to that one and return False."""
+        if DEDUPLICATION_TTL <= 0:
+            return True
+
+        _key = DEDUPLICATION_KEY.format(v['spec_hash'])
+
+        if self._store.add(_key, v['id'], ttl=DEDUPLICATION_TTL):
+            return True
+
+        _claimed = self._store.get(_key)
+        _known = None if _claimed is None else self._executor.get(_claimed)
+
+        if _known is not None and _known['phase'] in ('pending', 'running', 'succeeded'):
+            v['id'], v['phase'] = _claimed, _known['phase']
 
-            for pod in _resp.items:
-                if 'job-name' in pod.metadata.labels.keys():
-                    logger.debug('found a Validation Job: {}'.format(
-                        pod.metadata.labels['job-name']))
+            logger.debug('reusing validation id {} claimed for spec hash {}'.format(v['id'], v['spec_hash']))
 
-                    # TODO this may be more than one Pod (because it failed or so...)
-                    if pod.metadata.labels['job-name'].endswith(str(id)):
-                        _log = _client.read_namespaced_pod_log(
-                            pod.metadata.name, namespace=THOTH_DEPENDENCY_MONKEY_NAMESPACE, pretty=True)
+            return False
 
-                        return _log
+        # the Validation that claimed it failed, or is gone
+        self._store.put(_key, v['id'], ttl=DEDUPLICATION_TTL)
 
-        except client.rest.ApiException as e:
-            logger.error(e)
+        return True
 
-            if e.status == 403:
-                raise ServiceUnavailable('OpenShift auth failed')
+    def _release_claim(self, spec_hash, id):
+        """Give up the claim of a deleted Validation, the stack is validated again when requested again."""
+        _key = DEDUPLICATION_KEY.format(spec_hash)
+
+        if self._store.get(_key) == id:
+            self._store.delete(_key)
+
+    def _attach_to_known_failure(self, v):
+        """If the same stack was found to be invalid before, however long ago, attach `v` to that Validation."""
+        for known in sorted(self._executor.find(v['spec_hash']), key=lambda known: known['created'], reverse=True):
+            if known['phase'] != 'succeeded':
+                continue
+
+            _known = self._executor.get(known['id'])
+
+            if _known is not None and (_known.get('result') or {}).get('valid') is False:
+                v['id'], v['phase'] = known['id'], known['phase']
+
+                return True
+
+        return False
+
+    def _find_reusable_validation(self, spec_hash):
+        """Find the latest Validation of a stack with the given hash that is in-flight or succeeded within the TTL."""
+        if DEDUPLICATION_TTL <= 0:
+            return None
+
+        _now = time.time()
+        _candidates = [v for v in self._executor.find(spec_hash)
+                       if v['phase'] in ('pending', 'running') or
+                       (v['phase'] == 'succeeded' and v['finished'] is not None and
+                        _now - v['finished'] <= DEDUPLICATION_TTL)]
+
+        if not _candidates:
+            return None
 
-            raise ServiceUnavailable('OpenShift')
+        return max(_candidates, key=lambda v: v['created'])
@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#   thoth-dependency-monkey
+#   Copyright(C) 2018 Christoph Görn
+#
+#   This program is free software: you can redistribute it and / or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Thoth: Dependency Monkey API"""
+
+import os
+import json
+
+from datetime import datetime, timedelta, timezone
+
+from .ecosystem import VALIDATORS
+from .specification import specification_size
+from .specification_config_maps import SPECIFICATION_CONFIG_MAP_PREFIX, SPECIFICATION_CONFIG_MAP_KEY, \
+    SPECIFICATIONS_MOUNT_PATH
+
+
+VALIDATION_JOB_PREFIX = 'validation-job-'
+
+# a PersistentVolumeClaim shared by all validator pods to cache package metadata, index pages and packages
+PACKAGE_CACHE_CLAIM = os.getenv('THOTH_DEPENDENCY_MONKEY_PACKAGE_CACHE_CLAIM', None)
+PACKAGE_CACHE_MOUNT_PATH = '/var/cache/thoth-dependency-monkey'
+PACKAGE_CACHE_MAX_SIZE = int(os.getenv('THOTH_DEPENDENCY_MONKEY_PACKAGE_CACHE_MAX_SIZE', 4 * 1024 ** 3))
+PACKAGE_CACHE_OFFLINE = os.getenv('THOTH_DEPENDENCY_MONKEY_PACKAGE_CACHE_OFFLINE', 'no').lower() in ('yes', 'true', '1')
+# seconds validators reuse the pins of stacks resolved before, while new releases may appear on PyPI
+RESOLUTION_GRAPH_TTL = int(os.getenv('THOTH_DEPENDENCY_MONKEY_RESOLUTION_GRAPH_TTL', 3600))
+
+# a batch Job lists its Validations within this annotation, as JSON: [{"id": ..., "spec_hash": ...}, ...]
+VALIDATIONS_ANNOTATION = 'thoth-station.ninja/validations'
+
+# a Validation created within this many days is selected by its created-day label, instead of its creation time
+CREATED_DAY_SELECTOR_MAX_DAYS = 31
+
+
+def job_name(id):
+    return VALIDATION_JOB_PREFIX + str(id)
+
+
+def validations_of_job(job):
+    """Return id and spec hash of each Validation carried out by a Job, a batch Job carries more than one."""
+    _annotations = job.metadata.annotations or {}
+
+    if VALIDATIONS_ANNOTATION in _annotations:
+        return json.loads(_annotations[VALIDATIONS_ANNOTATION])
+
+    return [{'id': job.metadata.labels['validation-id'], 'spec_hash': job.metadata.labels.get('spec-hash')}]
+
+
+def job_phase(job):
+    if job.status.succeeded is not None:
+        return 'succeeded'
+    elif job.status.failed is not None:
+        return 'failed'
+    elif job.status.active is not None:
+        return 'running'
+
+    return 'pending'
+
+
+def job_finished(job):
+    """Return when a Job succeeded or failed (seconds since the epoch), None if it has not finished."""
+    if job_phase(job) not in ('succeeded', 'failed'):
+        return None
+
+    _finished = job.status.completion_time
+
+    if _finished is None:
+        # a failed Job has no completion time, its Failed condition tells when it gave up
+        _finished = max((condition.last_transition_time for condition in job.status.conditions or []
+                         if condition.last_transition_time is not None),
+                        default=job.status.start_time or job.metadata.creation_timestamp)
+
+    return _finished.timestamp()
+
+
+def created_day(timestamp):
+    """Return the value of the created-day label of an object created at `timestamp` (a datetime)."""
+    return timestamp.astimezone(timezone.utc).strftime('%Y-%m-%d')
+
+
+def created_days(created_after, created_before):
+    """Return the created-day label values of the days within the range, None if the range is open or too long."""
+    if created_after is None or created_before is None:
+        return None
+
+    _day = datetime.fromtimestamp(created_after, timezone.utc).date()
+    _last = datetime.fromtimestamp(created_before, timezone.utc).date()
+
+    if (_last - _day).days >= CREATED_DAY_SELECTOR_MAX_DAYS:
+        return None
+
+    _days = []
+
+    while _day <= _last:
+        _days.append(_day.strftime('%Y-%m-%d'))
+        _day += timedelta(days=1)
+
+    return _days
+
+
+def validity_values(valid):
+    """Return the validity label values of Jobs carrying out a Validation with the given validity."""
+    # a batch Job whose Validations are not all valid or all invalid is labelled mixed
+    return ['valid', 'mixed'] if valid else ['invalid', 'mixed']
+
+
+def label_selector(filters):
+    """Translate the filters of listing Validations into a label selector of their Jobs."""
+    _selector = ['validation-id']
+
+    if filters.get('ecosystem') is not None:
+        _selector.append('ecosystem=' + filters['ecosystem'])
+    if filters.get('phase') is not None:
+        _selector.append('phase=' + filters['phase'])
+    if filters.get('valid') is not None:
+        _selector.append('validity in ({})'.format(','.join(validity_values(filters['valid']))))
+
+    _days = created_days(filters.get('created_after'), filters.get('created_before'))
+
+    if _days is not None:
+        _selector.append('created-day in ({})'.format(','.join(_days)))
+
+    return ','.join(_selector)
+
+
+def job_selected(job, filters):
+    """Evaluate the label selector of the filters against a Job."""
+    _labels = job.metadata.labels or {}
+
+    if filters.get('ecosystem') is not None and _labels.get('ecosystem') != filters['ecosystem']:
+        return False
+    if filters.get('phase') is not None and _labels.get('phase') != filters['phase']:
+        return False
+    if filters.get('valid') is not None and _labels.get('validity') not in validity_values(filters['valid']):
+        return False
+
+    _days = created_days(filters.get('created_after'), filters.get('created_before'))
+
+    if _days is not None and _labels.get('created-day') not in _days:
+        return False
+
+    return True
+
+
+def job_manifest(id, labels, annotations, ecosystem, env, specifications):
+    """Return the manifest of a Validation job, `specifications` are the stack specifications it validates by
+    spec hash, the Job mounts them from their ConfigMaps."""
+    _name = job_name(id)
+    _validator = VALIDATORS[ecosystem]
+    _resources, _deadline = _validator.resources(
+        [(specification_size(spec), spec_hash) for spec_hash, spec in sorted(specifications.items())])
+
+    _labels = {'validation-id': str(id), 'ecosystem': ecosystem, 'phase': 'pending',
+               'created-day': created_day(datetime.now(timezone.utc))}
+    _labels.update(labels)
+
+    _env, _volumes, _volume_mounts = package_cache_manifest()
+
+    _volumes = _volumes + [{'name': 'stack-specifications', 'projected': {'sources': [
+        {'configMap': {'name': SPECIFICATION_CONFIG_MAP_PREFIX + spec_hash,
+                       'items': [{'key': SPECIFICATION_CONFIG_MAP_KEY, 'path': spec_hash}]}}
+        for spec_hash in sorted(specifications)]}}]
+    _volume_mounts = _volume_mounts + [{'name': 'stack-specifications', 'mountPath': SPECIFICATIONS_MOUNT_PATH,
+                                        'readOnly': True}]
+
+    return {
+        'kind': 'Job',
+        'spec': {
+            'activeDeadlineSeconds': _deadline,
+            'template':
+                {
+                    'spec':
+                    {'serviceAccountName': 'validation-job-runner',
+                     'containers': [
+                         {
+                             'image': _validator.image,
+                             'name': _name,
+                             'resources': _resources,
+                             'env': env + _env + [
+                                 {
+                                     'name': 'ECOSYSTEM',
+                                     'value': ecosystem
+                                 },
+                                 {
+                                     'name': 'DEBUG',
+                                     'value': 'YES'
+                                 }
+                             ],
+                             'volumeMounts': _volume_mounts
+                         }
+                     ],
+                        'volumes': _volumes,
+                        'restartPolicy': 'Never'},
+                    'metadata': {'name': _name, 'labels': {'validation-id': str(id)}}}},
+        'apiVersion': 'batch/v1',
+        'metadata': {'name': _name, 'labels': _labels, 'annotations': annotations}
+    }
+
+
+def package_cache_manifest():
+    """Return env, volumes and volume mounts giving a validator pod its package cache."""
+    if PACKAGE_CACHE_CLAIM is None:
+        return [{'name': 'XDG_CACHE_HOME', 'value': '/tmp/.xdg-cache'}], [], []
+
+    _env = [
+        {'name': 'XDG_CACHE_HOME', 'value': PACKAGE_CACHE_MOUNT_PATH},
+        {'name': 'PACKAGE_CACHE_MAX_SIZE', 'value': str(PACKAGE_CACHE_MAX_SIZE)},
+        {'name': 'PACKAGE_CACHE_OFFLINE', 'value': 'yes' if PACKAGE_CACHE_OFFLINE else 'no'},
+        {'name': 'LOCAL_INDEX', 'value': os.path.join(PACKAGE_CACHE_MOUNT_PATH, 'index')},
+        {'name': 'RESOLUTION_GRAPH_TTL', 'value': str(RESOLUTION_GRAPH_TTL)}
+    ]
+    _volumes = [{'name': 'package-cache', 'persistentVolumeClaim': {'claimName': PACKAGE_CACHE_CLAIM}}]
+    _volume_mounts = [{'name': 'package-cache', 'mountPath': PACKAGE_CACHE_MOUNT_PATH}]
+
+    return _env, _volumes, _volume_mounts
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#   thoth-dependency-monkey
+#   Copyright(C) 2018 Christoph Görn
+#
+#   This program is free software: you can redistribute it and / or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Thoth: Dependency Monkey API"""
+
+import os
+import logging
+
+from werkzeug.exceptions import ServiceUnavailable
+from kubernetes import client
+
+from .informer import Informer, label_indexer
+from .cache import LRUCache
+from .result import parse_result, parse_termination_message
+from .metrics import CacheStats, kubernetes_api_call
+
+
+LOG_CACHE_SIZE = int(os.getenv('THOTH_DEPENDENCY_MONKEY_LOG_CACHE_SIZE', 64 * 1024 * 1024))
+RESULT_CACHE_SIZE = int(os.getenv('THOTH_DEPENDENCY_MONKEY_RESULT_CACHE_SIZE', 100000))
+TERMINATED_POD_PHASES = ('Succeeded', 'Failed')
+
+# the validator delimits the output of each Validation of a batch Job by these lines
+VALIDATION_LOG_BEGIN = '### thoth-dependency-monkey validation {} begin'
+VALIDATION_LOG_END = '### thoth-dependency-monkey validation {} end'
+
+logger = logging.getLogger(__file__)
+
+
+def validation_log(log, id):
+    """Cut the output of one Validation out of the log of a batch Job."""
+    _begin = VALIDATION_LOG_BEGIN.format(id)
+    _end = VALIDATION_LOG_END.format(id)
+
+    if _begin not in log:
+        return None
+
+    return log.split(_begin, 1)[1].split(_end, 1)[0].strip('\n')
+
+
+def _termination_message(pod, container_name):
+    for status in pod.status.container_statuses or []:
+        if status.name == container_name and status.state.terminated is not None:
+            return status.state.terminated.message
+
+    return None
+
+
+class ValidationPods():
+    """The Pods of Validation jobs in a namespace, and the logs and result records of the Validations they carry out.
+
+    Pods are read from `informer` while `cache_synced_func` tells it is in sync, from the Kubernetes API otherwise.
+    Logs and result records of terminated Pods never change, they are kept around.
+    """
+
+    def __init__(self, kubernetes_client, namespace, cache_synced_func, log_cache_size=LOG_CACHE_SIZE,
+                 result_cache_size=RESULT_CACHE_SIZE):
+        self.namespace = namespace
+
+        self._kube = kubernetes_client
+        self._cache_synced_func = cache_synced_func
+
+        # Pods of Jobs, indexed by the name of the Job they belong to
+        self.informer = Informer('pods', self._list_pods, 'V1Pod',
+                                 key_func=lambda pod: pod.metadata.name,
+                                 label_selector='job-name',
+                                 indexers={'job-name': label_indexer('job-name')})
+
+        # logs of terminated Pods, keyed by Pod uid
+        self._logs = LRUCache(log_cache_size)
+
+        # result records of Validations carried out by terminated Pods, keyed by Pod uid and Validation id
+        self._results = LRUCache(result_cache_size, size_func=lambda record: 1)
+
+        self._pod_stats = CacheStats('pods')
+        self._log_stats = CacheStats('logs')
+        self._result_stats = CacheStats('results')
+
+    def pod(self, job):
+        """Return the Pod to get the result of a Job from: the latest terminated Pod or, if none terminated yet, the
+        latest Pod. A Job that was retried has more than one."""
+        _pods = self.find(job.metadata.name)
+
+        if not _pods:
+            return None
+
+        def _age(pod):
+            return pod.status.start_time or pod.metadata.creation_timestamp
+
+        _terminated = [pod for pod in _pods if pod.status.phase in TERMINATED_POD_PHASES]
+
+        return max(_terminated or _pods, key=_age)
+
+    def find(self, job_name):  # pragma: no cover
+        if self._pod_stats.record(self._cache_synced_func(self.informer)):
+            return self.informer.by_index('job-name', job_name)
+
+        with kubernetes_api_call('list_pods'):
+            _resp = self._kube.core_v1.list_namespaced_pod(
+                namespace=self.namespace, label_selector='job-name=' + job_name,
+                _request_timeout=self._kube.request_timeout)
+
+        return _resp.items or []
+
+    def result(self, job, id, batch):  # pragma: no cover
+        """Get the result record of a Validation, from the termination message of the Pod if it is complete there,
+        from the tagged line of its log otherwise."""
+        _pod = self.pod(job)
+
+        if _pod is None:
+            return None
+
+        _terminated = _pod.status.phase in TERMINATED_POD_PHASES
+        _key = (_pod.metadata.uid, str(id))
+
+        if _terminated:
+            record = self._results.get(_key)
+
+            if self._result_stats.record(record is not None):
+                return record
+
+        record = parse_termination_message(_termination_message(_pod, job.metadata.name), id if batch else None)
+
+        if record is None:
+            log = self.log(job)
+
+            if log is not None and batch:
+                log = validation_log(log, id)
+
+            if log is not None:
+                record = parse_result(log)
+
+        if _terminated and record is not None:
+            self._results.put(_key, record)
+
+        return record
+
+    def log(self, job):  # pragma: no cover
+        """Get the log of a Job, of its latest terminated Pod if it was retried."""
+        logger.debug('getting logs for job {}'.format(job.metadata.name))
+
+        try:
+            _pod = self.pod(job)
+
+            if _pod is None:
+                return None
+
+            _terminated = _pod.status.phase in TERMINATED_POD_PHASES
+
+            if _terminated:
+                _log = self._logs.get(_pod.metadata.uid)
+
+                if self._log_stats.record(_log is not None):
+                    return _log
+
+            with kubernetes_api_call('read_pod_log'):
+                _log = self._kube.core_v1.read_namespaced_pod_log(
+                    _pod.metadata.name, namespace=self.namespace, _request_timeout=self._kube.request_timeout)
+
+            if _terminated:
+                self._logs.put(_pod.metadata.uid, _log)
+
+            return _log
+
+        except client.rest.ApiException as e:
+            if e.status == 404:
+                # the Pod is gone, and so is its log
+                return None
+
+            logger.error(e)
+
+            if e.status == 403:
+                raise ServiceUnavailable('OpenShift auth failed')
+
+            raise ServiceUnavailable('OpenShift')
+
+    def _list_pods(self, **kwargs):  # pragma: no cover
+        if kwargs.get('watch'):
+            return self._kube.core_v1.list_namespaced_pod(self.namespace, **kwargs)
+
+        kwargs.setdefault('_request_timeout', self._kube.request_timeout)
+
+        with kubernetes_api_call('list_pods'):
+            return self._kube.core_v1.list_namespaced_pod(self.namespace, **kwargs)
@@ -0,0 +1,377 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#   thoth-dependency-monkey
+#   Copyright(C) 2018 Christoph Görn
+#
+#   This program is free software: you can redistribute it and / or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Thoth: Dependency Monkey API"""
+
+import os
+import time
+import logging
+import sqlite3
+import threading
+
+from collections import deque
+
+from .cooperative import blocking
+from .result import parse_result
+
+
+WORK_QUEUE_URL = os.getenv('THOTH_DEPENDENCY_MONKEY_WORK_QUEUE', 'sqlite:////tmp/thoth-dependency-monkey.sqlite')
+WORK_QUEUE_LEASE = int(os.getenv('THOTH_DEPENDENCY_MONKEY_WORK_QUEUE_LEASE', 600))
+WORK_QUEUE_POLL_INTERVAL = float(os.getenv('THOTH_DEPENDENCY_MONKEY_WORK_QUEUE_POLL_INTERVAL', 0.5))
+
+logger = logging.getLogger(__file__)
+
+
+class WorkQueue():
+    """A queue of Validations, taken from it by validator workers which post the results back.
+
+    A Validation is represented by a dict with the keys: id, stack_specification, ecosystem,
+    spec_hash, phase (pending, running, succeeded or failed), raw_log, valid, enqueued, started and finished.
+    Whether a succeeded Validation found its stack valid is taken from its result record once it is completed.
+    A Validation taken by a worker that does not complete it within `lease` seconds is handed out again.
+
+    A Validation deleted while running is cancelled: it is not shown any more, and is dropped once its worker
+    completes it or its lease expires.
+    """
+
+    def put(self, id, stack_specification, ecosystem, spec_hash):
+        raise NotImplementedError()
+
+    def take(self, worker, timeout=None):
+        """Take the oldest pending Validation, wait at most `timeout` seconds for one. Returns None on timeout."""
+        raise NotImplementedError()
+
+    def complete(self, id, phase, raw_log):
+        raise NotImplementedError()
+
+    def get(self, id):
+        raise NotImplementedError()
+
+    def delete(self, id):
+        """Drop a Validation, cancel it if it is running. Returns False if there is no such Validation."""
+        raise NotImplementedError()
+
+    def ids(self):
+        raise NotImplementedError()
+
+    def list(self, after=None, limit=None, phase=None, valid=None, ecosystem=None, created_after=None,
+             created_before=None):
+        """Return at most `limit` Validations matching all given filters, ordered by id, starting after id `after`."""
+        raise NotImplementedError()
+
+    def find(self, spec_hash):
+        """Return all Validations of stacks with the given spec hash."""
+        raise NotImplementedError()
+
+
+class InProcessWorkQueue(WorkQueue):
+    """A WorkQueue for workers running as threads of this process."""
+
+    def __init__(self, lease=WORK_QUEUE_LEASE):
+        self.lease = lease
+
+        self._validations = {}
+        self._pending = deque()
+        self._condition = threading.Condition()
+
+    def put(self, id, stack_specification, ecosystem, spec_hash):
+        with self._condition:
+            self._validations[id] = {
+                'id': id,
+                'stack_specification': stack_specification,
+                'ecosystem': ecosystem,
+                'spec_hash': spec_hash,
+                'phase': 'pending',
+                'raw_log': None,
+                'valid': None,
+                'enqueued': time.time(),
+                'started': None,
+                'finished': None
+            }
+            self._pending.append(id)
+            self._condition.notify()
+
+    def take(self, worker, timeout=None):
+        _deadline = None if timeout is None else time.time() + timeout
+
+        with self._condition:
+            while True:
+                self._reclaim_expired()
+
+                if self._pending:
+                    v = self._validations[self._pending.popleft()]
+                    v['phase'] = 'running'
+                    v['started'] = time.time()
+
+                    return dict(v)
+
+                _remaining = None if _deadline is None else _deadline - time.time()
+
+                if _remaining is not None and _remaining <= 0:
+                    return None
+
+                self._condition.wait(min(_remaining or self.lease, self.lease))
+
+    def complete(self, id, phase, raw_log):
+        with self._condition:
+            v = self._validations.get(id)
+
+            if v is None:
+                return
+
+            if v['phase'] == 'cancelled':
+                del self._validations[id]
+
+                return
+
+            v['phase'] = phase
+            v['raw_log'] = raw_log
+            v['valid'] = _valid(phase, raw_log)
+            v['finished'] = time.time()
+
+    def get(self, id):
+        with self._condition:
+            v = self._validations.get(id)
+
+            return None if v is None or v['phase'] == 'cancelled' else dict(v)
+
+    def delete(self, id):
+        with self._condition:
+            v = self._validations.get(id)
+
+            if v is None or v['phase'] == 'cancelled':
+                return False
+
+            if v['phase'] == 'running':
+                v['phase'] = 'cancelled'
+            else:
+                del self._validations[id]
+
+                if v['phase'] == 'pending':
+                    self._pending.remove(id)
+
+            return True
+
+    def ids(self):
+        with self._condition:
+            return [id for id, v in self._validations.items() if v['phase'] != 'cancelled']
+
+    def list(self, after=None, limit=None, phase=None, valid=None, ecosystem=None, created_after=None,
+             created_before=None):
+        with self._condition:
+            _validations = sorted((v for v in self._validations.values()
+                                   if v['phase'] != 'cancelled' and
+                                   (after is None or v['id'] > after) and
+                                   (phase is None or v['phase'] == phase) and
+                                   (valid is None or v['valid'] == valid) and
+                                   (ecosystem is None or v['ecosystem'] == ecosystem) and
+                                   (created_after is None or v['enqueued'] >= created_after) and
+                                   (created_before is None or v['enqueued'] < created_before)),
+                                  key=lambda v: v['id'])
+
+            return [dict(v) for v in _validations[:limit]]
+
+    def find(self, spec_hash):
+        with self._condition:
+            return [dict(v) for v in self._validations.values()
+                    if v['spec_hash'] == spec_hash and v['phase'] != 'cancelled']
+
+    def _reclaim_expired(self):
+        _expired = time.time() - self.lease
+
+        for v in list(self._validations.values()):
+            if v['phase'] == 'running' and v['started'] < _expired:
+                logger.info('lease of validation id {} expired, handing it out again'.format(v['id']))
+
+                v['phase'] = 'pending'
+                self._pending.append(v['id'])
+            elif v['phase'] == 'cancelled' and v['started'] < _expired:
+                del self._validations[v['id']]
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """A WorkQueue kept in an SQLite database, shared by all processes that can open the file."""
+
+    COLUMNS = ['id', 'stack_specification', 'ecosystem', 'spec_hash', 'phase', 'raw_log', 'valid',
+               'enqueued', 'started', 'finished']
+
+    def __init__(self, path, lease=WORK_QUEUE_LEASE, poll_interval=WORK_QUEUE_POLL_INTERVAL):
+        self.path = path
+        self.lease = lease
+        self.poll_interval = poll_interval
+
+        self._local = threading.local()
+
+        with self._connection() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS validations ('
+                       'id TEXT PRIMARY KEY, stack_specification TEXT, ecosystem TEXT, spec_hash TEXT, '
+                       'phase TEXT, raw_log TEXT, valid INTEGER, enqueued REAL, started REAL, finished REAL)')
+            db.execute('CREATE INDEX IF NOT EXISTS validations_phase ON validations (phase, enqueued)')
+            db.execute('CREATE INDEX IF NOT EXISTS validations_spec_hash ON validations (spec_hash)')
+
+    def _connection(self):
+        # sqlite3 connections must not be shared between threads
+        db = getattr(self._local, 'db', None)
+
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            self._local.db = db
+
+        return db
+
+    def _row(self, row):
+        if row is None:
+            return None
+
+        v = dict(zip(self.COLUMNS, row))
+
+        if v['valid'] is not None:
+            v['valid'] = bool(v['valid'])
+
+        return v
+
+    @blocking
+    def put(self, id, stack_specification, ecosystem, spec_hash):
+        self._connection().execute(
+            'INSERT INTO validations (id, stack_specification, ecosystem, spec_hash, phase, enqueued) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (id, stack_specification, ecosystem, spec_hash, 'pending', time.time()))
+
+    def take(self, worker, timeout=None):
+        _deadline = None if timeout is None else time.time() + timeout
+
+        while True:
+            v = self._take()
+
+            if v is not None:
+                return v
+
+            if _deadline is not None and time.time() >= _deadline:
+                return None
+
+            time.sleep(self.poll_interval)
+
+    @blocking
+    def _take(self):
+        db = self._connection()
+        _now = time.time()
+
+        # an IMMEDIATE transaction holds the write lock, so no two workers take the same Validation
+        db.execute('BEGIN IMMEDIATE')
+
+        try:
+            db.execute("UPDATE validations SET phase = 'pending' WHERE phase = 'running' AND started < ?",
+                       (_now - self.lease,))
+            db.execute("DELETE FROM validations WHERE phase = 'cancelled' AND started < ?", (_now - self.lease,))
+
+            row = db.execute("SELECT {} FROM validations WHERE phase = 'pending' ORDER BY enqueued LIMIT 1".format(
+                ', '.join(self.COLUMNS))).fetchone()
+
+            if row is not None:
+                db.execute("UPDATE validations SET phase = 'running', started = ? WHERE id = ?", (_now, row[0]))
+
+            db.execute('COMMIT')
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+
+        v = self._row(row)
+
+        if v is not None:
+            v['phase'] = 'running'
+            v['started'] = _now
+
+        return v
+
+    @blocking
+    def complete(self, id, phase, raw_log):
+        db = self._connection()
+
+        db.execute("DELETE FROM validations WHERE id = ? AND phase = 'cancelled'", (id,))
+        db.execute('UPDATE validations SET phase = ?, raw_log = ?, valid = ?, finished = ? WHERE id = ?',
+                   (phase, raw_log, _valid(phase, raw_log), time.time(), id))
+
+    @blocking
+    def get(self, id):
+        return self._row(self._connection().execute(
+            "SELECT {} FROM validations WHERE id = ? AND phase != 'cancelled'".format(', '.join(self.COLUMNS)),
+            (id,)).fetchone())
+
+    @blocking
+    def delete(self, id):
+        db = self._connection()
+
+        # a running Validation is kept until its worker completes it, so that it is not handed out again
+        _cancelled = db.execute("UPDATE validations SET phase = 'cancelled' WHERE id = ? AND phase = 'running'",
+                                (id,)).rowcount
+
+        return bool(_cancelled or db.execute("DELETE FROM validations WHERE id = ? AND phase != 'cancelled'",
+                                             (id,)).rowcount)
+
+    @blocking
+    def ids(self):
+        return [row[0] for row in self._connection().execute(
+            "SELECT id FROM validations WHERE phase != 'cancelled' ORDER BY enqueued")]
+
+    @blocking
+    def list(self, after=None, limit=None, phase=None, valid=None, ecosystem=None, created_after=None,
+             created_before=None):
+        _where, _params = ["phase != 'cancelled'"], []
+
+        for clause, value in (('id > ?', after), ('phase = ?', phase), ('valid = ?', valid),
+                              ('ecosystem = ?', ecosystem), ('enqueued >= ?', created_after),
+                              ('enqueued < ?', created_before)):
+            if value is not None:
+                _where.append(clause)
+                _params.append(value)
+
+        _query = 'SELECT {} FROM validations WHERE {} ORDER BY id'.format(', '.join(self.COLUMNS),
+                                                                          ' AND '.join(_where))
+
+        if limit is not None:
+            _query += ' LIMIT ?'
+            _params.append(limit)
+
+        return [self._row(row) for row in self._connection().execute(_query, _params)]
+
+    @blocking
+    def find(self, spec_hash):
+        return [self._row(row) for row in self._connection().execute(
+            "SELECT {} FROM validations WHERE spec_hash = ? AND phase != 'cancelled'".format(', '.join(self.COLUMNS)),
+            (spec_hash,))]
+
+
+def _valid(phase, raw_log):
+    """Return whether a Validation completed with `phase` and `raw_log` found its stack valid, None if unknown."""
+    if phase != 'succeeded' or raw_log is None:
+        return None
+
+    _result = parse_result(raw_log)
+
+    return None if _result is None else _result['valid']
+
+
+def work_queue_from_url(url=WORK_QUEUE_URL):
+    """Create a WorkQueue from an URL like memory:// or sqlite:////var/lib/thoth/queue.sqlite"""
+    if url == 'memory://':
+        return InProcessWorkQueue()
+    elif url.startswith('sqlite:///'):
+        return SQLiteWorkQueue(url[len('sqlite:///'):])
+
+    raise ValueError('unsupported work queue {}'.format(url))
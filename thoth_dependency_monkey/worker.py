@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#   thoth-dependency-monkey
+#   Copyright(C) 2018 Christoph Görn
+#
+#   This program is free software: you can redistribute it and / or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Thoth: Dependency Monkey Validator Worker"""
+
+import io
+import os
+import logging
+import threading
+import importlib.util
+import importlib.machinery
+import multiprocessing
+
+from contextlib import redirect_stdout
+
+from .work_queue import WORK_QUEUE_URL, work_queue_from_url
+
+
+DEBUG = bool(os.getenv('DEBUG', False))
+
+VALIDATOR = os.getenv('THOTH_DEPENDENCY_MONKEY_VALIDATOR', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'images', 'pypi-validator', 'validate'))
+WORKERS = int(os.getenv('THOTH_DEPENDENCY_MONKEY_WORKERS', 2))
+# validate each stack specification within a child forked off the worker, which has imported the validator already
+WORKER_FORK = os.getenv('THOTH_DEPENDENCY_MONKEY_WORKER_FORK', 'no').lower() in ('yes', 'true', '1')
+
+logger = logging.getLogger(__file__)
+
+
+def load_validator(path=VALIDATOR):
+    """Import the `validate` entrypoint of a validator image as a module, this imports pip and pip-tools once."""
+    loader = importlib.machinery.SourceFileLoader('thoth_dependency_monkey_validator', path)
+    module = importlib.util.module_from_spec(importlib.util.spec_from_loader(loader.name, loader))
+    loader.exec_module(module)
+
+    return module
+
+
+class ValidatorWorker():
+    """Takes Validations from a WorkQueue, validates them using an already loaded validator and posts the results back.
+
+    If `fork`, each Validation is carried out by a child forked off the worker, see the validator's validate_forked().
+    """
+
+    def __init__(self, queue, validator, name, fork=WORKER_FORK):
+        self.name = name
+
+        self._queue = queue
+        self._validator = validator
+        self._validate = validator.validate_forked if fork else validator.validate
+
+    def run_once(self, timeout=None):
+        """Carry out one Validation, returns False if there was none within `timeout` seconds."""
+        v = self._queue.take(self.name, timeout)
+
+        if v is None:
+            return False
+
+        logger.debug('{} validating validation id {}'.format(self.name, v['id']))
+
+        _output = io.StringIO()
+
+        try:
+            with redirect_stdout(_output):
+                self._validate(v['stack_specification'])
+
+            _phase = 'succeeded'
+        except Exception as e:
+            logger.error('{} failed validation id {}: {}'.format(self.name, v['id'], e))
+
+            _output.write(str(e))
+            _phase = 'failed'
+
+        self._queue.complete(v['id'], _phase, _output.getvalue())
+
+        return True
+
+    def run(self, stopped):
+        while not stopped.is_set():
+            self.run_once(timeout=1)
+
+
+def _work(name, queue_url, validator_path):  # pragma: no cover
+    worker = ValidatorWorker(work_queue_from_url(queue_url), load_validator(validator_path), name)
+    worker.run(threading.Event())
+
+
+def run_worker_pool(size=WORKERS, queue_url=WORK_QUEUE_URL, validator_path=VALIDATOR):  # pragma: no cover
+    """Run `size` worker processes, each of them imports the validator once and then takes Validations from the
+    queue."""
+    _processes = []
+
+    for i in range(size):
+        _process = multiprocessing.Process(
+            target=_work, args=('worker-{}-{}'.format(os.getpid(), i), queue_url, validator_path), daemon=True)
+        _process.start()
+        _processes.append(_process)
+
+    logger.info('started {} validator workers on {}'.format(size, queue_url))
+
+    for _process in _processes:
+        _process.join()
+
+
+if __name__ == '__main__':  # pragma: no cover
+    logging.basicConfig(level=logging.DEBUG if DEBUG else logging.INFO)
+
+    run_worker_pool()